@@ -1,17 +1,58 @@
-import json
+import time
+START_TIME = time.perf_counter()
+
+import importlib
 import os
+import sys
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import networkx as nx
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import math
-import textwrap
-from PIL import Image
-import time
-import threading
+from concept_store import open_store
+from search_index import SearchIndex
+from render_scheduler import RenderScheduler
+from virtual_tree import VirtualTree
+from level_of_detail import LevelOfDetail, collapse
+from instrumentation import METRICS, ProfileCapture, instrument
+from diagnostics_panel import DiagnosticsPanel
+from review_panel import ReviewPanel
+
+# matplotlib, networkx and numpy are only imported, and the first render only
+# run, once the Mind Map tab is opened. REVISION_STARTUP=eager builds the mind
+# map during startup as before.
+LAZY_STARTUP = os.environ.get("REVISION_STARTUP", "lazy") != "eager"
+
+# Seconds from process start to an interactive Tree View. Slower starts are
+# reported on stderr, REVISION_STARTUP_TIMING=1 reports every start.
+STARTUP_TARGET = 1.0
+REPORT_STARTUP = os.environ.get("REVISION_STARTUP_TIMING") == "1"
+
+# Delay after first paint before the mind map modules are imported in the background
+PRELOAD_DELAY_MS = 500
+MIND_MAP_MODULES = ("matplotlib.pyplot", "matplotlib.backends.backend_tkagg", "matplotlib.widgets",
+                    "mind_map_renderer", "layout_cache", "tile_view")
+
+# Mind maps with more concepts than this are shown as zoomable image tiles
+# instead of one figure
+TILED_MIN_NODES = 300
+
+# Ctrl+Shift+D shows the Diagnostics tab. "Profile next render" there writes
+# PROFILE_PATH; with REVISION_METRICS=<file.json|file.csv> the latency
+# metrics are also written on exit.
+PROFILE_PATH = "mind_map_render.prof"
+METRICS_PATH = os.environ.get("REVISION_METRICS")
+
+# Longest prerequisite list shown in the concept details, and the number of
+# concepts the Central button lists
+PREREQUISITES_SHOWN = 10
+CENTRAL_SHOWN = 25
+
+
+def preload_mind_map_modules():
+    # Only warms sys.modules, the view itself is built on the Tk thread
+    for name in MIND_MAP_MODULES:
+        importlib.import_module(name)
 
-FILENAME = "nested_dictionary.json"
 
 class RevisionApp:
     def __init__(self, master):
@@ -20,30 +61,95 @@ class RevisionApp:
         self.master.geometry("1000x700")
 
         self.is_rendering = False
+        self.render_pending = False
         self.export_after_render = False
         self.export_format = None
 
-        self.data = self.load_data()
+        self.store = open_store()
+        # The snapshot is streamed in chunk by chunk once the window is up,
+        # text bodies stay in a memory map until they are shown
+        self.loader = self.store.load_iter(lazy_text=True)
+        self.load_timer = METRICS.timed("load_data").start()
+        self.profile_capture = ProfileCapture()
+        self.loading = True
+        self.data = self.store.data
+        self.search_index = SearchIndex(self.data)
+        # Components, prerequisites and centrality, built on a worker on
+        # first use; edits made meanwhile wait in analytics_edits
+        self.analytics = None
+        self.analytics_scheduler = None
+        self.analytics_edits = None
+        self.analytics_waiting = []
+        self.mind_map_ready = False
+        # REVISION_LOD=1 starts with large subtrees collapsed
+        self.level_of_detail = LevelOfDetail(enabled=os.environ.get("REVISION_LOD") == "1")
         self.create_widgets()
         self.add_search_functionality()
-        self.create_mind_map_view()
-
-
-    # ... (load_data and save_data methods remain the same)
-    def load_data(self):
-        if os.path.exists(FILENAME):
-            with open(FILENAME, 'r') as file:
-                return json.load(file)
-        return {}
+        self.load_progress = ttk.Progressbar(self.search_frame, maximum=1.0, length=150)
+        self.load_progress.pack(side=tk.RIGHT, padx=(5, 0))
+        self.master.after(0, self.load_step)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        if not LAZY_STARTUP:
+            self.create_mind_map_view()
+        self.master.after_idle(self.on_first_paint)
+
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def load_step(self):
+        # One chunk of the streaming load per turn of the Tk loop
+        try:
+            progress, batch = next(self.loader)
+        except StopIteration:
+            self.finish_loading()
+            return
+        if batch is None:
+            # Journal records changed concepts in place
+            self.search_index = SearchIndex(self.data)
+            self.analytics = None
+            self.refresh_tree()
+        else:
+            for key, value in batch:
+                self.search_index.add_value(key, value)
+            self.tree.add_roots(key for key, _ in batch)
+        self.load_progress['value'] = progress
+        self.master.after(0, self.load_step)
+
+    def finish_loading(self):
+        # The streaming load is timed from start to end as one load_data call
+        self.load_timer.stop()
+        self.loading = False
+        self.load_progress.destroy()
+        self.update_mind_map()
+        if self.notebook.select() == str(self.review_panel):
+            self.review_panel.start()
+
+    def still_loading(self):
+        # Edits wait for the load, the journal is replayed at its very end
+        if self.loading:
+            messagebox.showinfo("Loading", "Concepts are still loading, please wait.")
+        return self.loading
+
+    def on_first_paint(self):
+        self.master.update_idletasks()
+        self.startup_time = time.perf_counter() - START_TIME
+        if REPORT_STARTUP or self.startup_time > STARTUP_TARGET:
+            print(f"Tree View ready in {self.startup_time:.2f}s (target {STARTUP_TARGET:.2f}s)", file=sys.stderr)
+        if not self.mind_map_ready:
+            self.master.after(PRELOAD_DELAY_MS, lambda: threading.Thread(
+                target=preload_mind_map_modules, daemon=True).start())
+
+    def on_tab_changed(self, event):
+        selected = self.notebook.select()
+        if not self.mind_map_ready and selected == str(self.mind_map_tab):
+            self.create_mind_map_view()
+        elif selected == str(self.review_panel) and not self.loading:
+            self.review_panel.start()
 
-    def save_data(self):
-        with open(FILENAME, 'w') as file:
-            json.dump(self.data, file, indent=2)
 
     def on_tree_double_click(self, event):
-        item = self.tree.selection()[0]
-        key = self.tree.item(item, "text")
-        self.show_concept_details(key)
+        key = self.tree.selected_key()
+        if key is not None:
+            self.show_concept_details(key)
 
     def create_widgets(self):
         # Main frame to hold everything
@@ -64,6 +170,16 @@ class RevisionApp:
 
         self.notebook.add(self.tree_frame, text="Tree View")
         self.notebook.add(self.mind_map_frame, text="Mind Map")
+        self.mind_map_tab = self.mind_map_frame
+
+        # Spaced-repetition review of the due concepts
+        self.review_panel = ReviewPanel(self.notebook, self.store)
+        self.notebook.add(self.review_panel, text="Review")
+
+        # Latency histograms and render profiles, hidden until Ctrl+Shift+D
+        self.diagnostics = DiagnosticsPanel(self.notebook, METRICS, self.profile_next_render)
+        self.notebook.add(self.diagnostics, text="Diagnostics", state="hidden")
+        self.master.bind("<Control-D>", self.toggle_diagnostics)
 
         # Paned window to split the UI in Tree View
         self.paned_window = ttk.PanedWindow(self.tree_frame, orient=tk.HORIZONTAL)
@@ -73,15 +189,12 @@ class RevisionApp:
         left_frame = ttk.Frame(self.paned_window)
         self.paned_window.add(left_frame, weight=1)
 
-        # Tree view for displaying the nested structure
-        self.tree = ttk.Treeview(left_frame)
+        # Tree view for displaying the nested structure, only the visible rows
+        # are materialized and related concepts are expanded on demand
+        self.tree = VirtualTree(left_frame, self.data)
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.tree.bind("<Double-1>", self.on_tree_double_click)
-
-        # Scrollbar for the tree view
-        scrollbar = ttk.Scrollbar(left_frame, orient="vertical", command=self.tree.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.view.bind("<Double-1>", self.on_tree_double_click)
+        self.tree.view.bind("<Return>", self.on_tree_double_click)
 
         # Right frame for concept details
         self.right_frame = ttk.Frame(self.paned_window)
@@ -99,14 +212,42 @@ class RevisionApp:
 
         self.refresh_tree()
 
+    def toggle_diagnostics(self, event=None):
+        if self.notebook.tab(self.diagnostics, "state") == "hidden":
+            self.notebook.tab(self.diagnostics, state="normal")
+            self.notebook.select(self.diagnostics)
+            self.diagnostics.start()
+        else:
+            self.diagnostics.stop()
+            self.notebook.tab(self.diagnostics, state="hidden")
+
+    def profile_next_render(self):
+        # cProfile of one render cycle, worker and main thread together
+        self.profile_capture.arm()
+        if self.mind_map_ready:
+            self.update_mind_map()
+        else:
+            self.create_mind_map_view()
+
     def add_search_functionality(self):
         # Add search entry and button
         self.search_entry = ttk.Entry(self.search_frame)
         self.search_entry.pack(side=tk.LEFT, expand=True, fill=tk.X, padx=(0, 5))
         ttk.Button(self.search_frame, text="Search", command=self.perform_search).pack(side=tk.RIGHT)
+        ttk.Button(self.search_frame, text="Central", command=self.show_central_concepts).pack(side=tk.RIGHT, padx=(0, 5))
 
 
     def create_mind_map_view(self):
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        from matplotlib.widgets import RectangleSelector
+        from mind_map_renderer import MindMapRenderer, HighlightOverlay
+        from layout_cache import LayoutCache
+        from tile_view import TileView
+
+        self.mind_map_ready = True
+        self.layout_cache = LayoutCache()
+
         # Create a frame to hold the canvas and scrollbars
         self.mind_map_frame = ttk.Frame(self.mind_map_frame)
         self.mind_map_frame.pack(fill=tk.BOTH, expand=True)
@@ -137,11 +278,22 @@ class RevisionApp:
         self.mind_map_inner_frame.bind("<Configure>", self.on_frame_configure)
         self.mind_map_canvas.bind('<Configure>', self.on_canvas_configure)
 
+        # Large maps replace the figure window with tiles on the same canvas
+        self.tile_view = TileView(self.master, self.mind_map_canvas, self.canvas_window,
+                                  (self.x_scrollbar, self.y_scrollbar),
+                                  on_click=self.open_map_node, on_select=self.on_tile_select)
+
         # Create matplotlib figure and canvas
         self.figure, self.ax = plt.subplots(figsize=(16, 9))
+        self.renderer = MindMapRenderer(self.ax, instrument("layout_component")(self.layout_cache.layout_component),
+                                        instrument("layout_components")(self.layout_cache.layout_components))
+        self.spatial_index = self.renderer.frame.spatial_index
+        self.render_scheduler = RenderScheduler(self.master, self.profiled_render, self.profiled_finish,
+                                                self.on_render_error)
         self.mpl_canvas = FigureCanvasTkAgg(self.figure, master=self.mind_map_inner_frame)
         self.mpl_canvas.draw()
         self.mpl_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.highlight = HighlightOverlay(self.renderer, self.mpl_canvas)
 
         # Add matplotlib navigation toolbar
         toolbar = NavigationToolbar2Tk(self.mpl_canvas, self.mind_map_inner_frame)
@@ -151,13 +303,41 @@ class RevisionApp:
         # Connect the click event to the highlight function
         self.mpl_canvas.mpl_connect('button_press_event', self.on_node_click)
 
+        # Right-drag a rectangle to select every node inside it
+        self.selected_nodes = []
+        self.rect_selector = RectangleSelector(self.ax, self.on_rect_select, button=[3], useblit=True)
+
         # Add export button
         self.export_button = ttk.Button(self.mind_map_frame, text="Export Mind Map", command=self.show_export_options)
         self.export_button.grid(row=2, column=0, sticky="ew", padx=5, pady=5)
 
+        # Level of detail: deep or large subtrees become one clickable node
+        lod_frame = ttk.Frame(self.mind_map_frame)
+        lod_frame.grid(row=3, column=0, sticky="ew", padx=5, pady=(0, 5))
+        self.lod_enabled = tk.BooleanVar(value=self.level_of_detail.enabled)
+        ttk.Checkbutton(lod_frame, text="Collapse large subtrees", variable=self.lod_enabled,
+                        command=self.on_level_of_detail_changed).pack(side=tk.LEFT)
+        ttk.Label(lod_frame, text="Depth:").pack(side=tk.LEFT, padx=(10, 2))
+        self.lod_depth = tk.StringVar(value=str(self.level_of_detail.max_depth))
+        ttk.Spinbox(lod_frame, from_=1, to=50, width=4, textvariable=self.lod_depth,
+                    command=self.on_level_of_detail_changed).pack(side=tk.LEFT)
+
+        self.update_mind_map()
+
+    def on_level_of_detail_changed(self):
+        try:
+            max_depth = int(self.lod_depth.get())
+        except ValueError:
+            return
+        # New limits start from a fully collapsed view again
+        self.level_of_detail.enabled = self.lod_enabled.get()
+        self.level_of_detail.max_depth = max(1, max_depth)
+        self.level_of_detail.expanded.clear()
         self.update_mind_map()
 
     def on_frame_configure(self, event):
+        if self.tile_view.active:
+            return
         self.mind_map_canvas.configure(scrollregion=self.mind_map_canvas.bbox("all"))
 
     def on_canvas_configure(self, event):
@@ -167,58 +347,50 @@ class RevisionApp:
 
 
     def on_canvas_configure(self, event):
+        # The tile view owns the scroll region while it is shown
+        if self.tile_view.active:
+            return
         self.mind_map_canvas.configure(scrollregion=self.mind_map_canvas.bbox("all"))
 
     
     def on_node_click(self, event):
-        if event.xdata is None or event.ydata is None:
+        if event.button != 1 or event.xdata is None or event.ydata is None:
             return
 
         # Find the closest node to the click
-        clicked_node = min(self.pos, key=lambda n: (self.pos[n][0] - event.xdata)**2 + (self.pos[n][1] - event.ydata)**2)
+        clicked_node = self.spatial_index.nearest(event.xdata, event.ydata)
+        if clicked_node is None:
+            return
 
+        self.open_map_node(clicked_node)
+
+    def open_map_node(self, node):
+        # An aggregate node expands the subtree it stands for, only that part
+        # of the map is laid out and drawn again
+        if self.level_of_detail.expand(node):
+            self.update_mind_map()
+            return
         # Highlight the clicked node and its neighbors
-        self.highlight_node_and_neighbors(clicked_node)
+        self.highlight_node_and_neighbors(node)
 
     def highlight_node_and_neighbors(self, node):
-        # Reset all nodes and edges to their original appearance
-        nx.draw_networkx_nodes(self.G, self.pos, ax=self.ax, node_color='lightblue', 
-                               node_size=3000, alpha=0.8)
-        nx.draw_networkx_edges(self.G, self.pos, ax=self.ax, edge_color='gray', 
-                               width=1, alpha=0.7, arrows=True, arrowsize=10)
-
-        # Highlight the clicked node
-        nx.draw_networkx_nodes(self.G, self.pos, nodelist=[node], ax=self.ax, 
-                               node_color='red', node_size=3000, alpha=0.8)
-
-        # Highlight the neighboring nodes
-        neighbors = list(self.G.neighbors(node))
-        nx.draw_networkx_nodes(self.G, self.pos, nodelist=neighbors, ax=self.ax, 
-                               node_color='yellow', node_size=3000, alpha=0.8)
-
-        # Highlight the edges connected to the clicked node
-        edge_list = [(node, neighbor) for neighbor in neighbors]
-        nx.draw_networkx_edges(self.G, self.pos, edgelist=edge_list, ax=self.ax, 
-                               edge_color='red', width=2, alpha=1, arrows=True, arrowsize=15)
-
-        # Redraw the canvas
-        self.mpl_canvas.draw()
-
-
+        # Only the clicked node, its neighbours and their edges are redrawn
+        if self.tile_view.active:
+            self.tile_view.show_node(node)
+        else:
+            self.highlight.show(node)
 
+    def on_rect_select(self, eclick, erelease):
+        if eclick.xdata is None or erelease.xdata is None:
+            return
+        self.selected_nodes = self.spatial_index.in_rect(eclick.xdata, eclick.ydata, erelease.xdata, erelease.ydata)
+        self.highlight.show_selection(self.selected_nodes)
 
-    def enter_key(self):
-        key = self.key_entry.get()
-        if key:
-            if key not in self.data:
-                self.data[key] = {'next': [], 'text': []}
-                self.save_data()
-                self.refresh_tree()
-                self.update_mind_map()
-            self.show_concept_details(key)
-        else:
-            messagebox.showwarning("Input Error", "Please enter a key.")
+    def on_tile_select(self, nodes):
+        self.selected_nodes = nodes
+        self.tile_view.show_selection(nodes)
 
+    @instrument("show_concept_details")
     def show_concept_details(self, key):
         # Clear previous widgets in right frame
         for widget in self.right_frame.winfo_children():
@@ -233,6 +405,13 @@ class RevisionApp:
 
         ttk.Button(self.right_frame, text="Add Related Concept", command=lambda: self.add_related_concept(key)).pack(anchor='w', padx=10, pady=5)
 
+        # Everything that leads to this concept, nearest first
+        if not self.loading:
+            label = ttk.Label(self.right_frame, text="Prerequisites: ...", wraplength=350)
+            label.pack(anchor='w', padx=10, pady=5)
+            if self.graph_analytics(lambda: self.show_prerequisites(key, label)) is not None:
+                self.show_prerequisites(key, label)
+
         # Text information
         ttk.Label(self.right_frame, text="Information:").pack(anchor='w', padx=10, pady=5)
         text_widget = tk.Text(self.right_frame, height=10, width=40)
@@ -244,33 +423,10 @@ class RevisionApp:
 
 
 
-    def add_related_concept(self, key):
-        dialog = tk.Toplevel(self.master)
-        dialog.title("Add Related Concept")
-        dialog.geometry("300x100")
-
-        ttk.Label(dialog, text="Related Concept:").pack(pady=5)
-        entry = ttk.Entry(dialog, width=40)
-        entry.pack(pady=5)
-
-        def submit():
-            related_concept = entry.get()
-            if related_concept:
-                if related_concept not in self.data:
-                    self.data[related_concept] = {'next': [], 'text': []}
-                self.data[key]['next'].append(related_concept)
-                self.save_data()
-                self.refresh_tree()
-                self.update_mind_map()
-                self.show_concept_details(key)
-                dialog.destroy()
-            else:
-                messagebox.showwarning("Input Error", "Please enter a related concept.")
-
-        ttk.Button(dialog, text="Add", command=submit).pack(pady=10)
-
     # ... (other methods remain the same)
     def add_information(self, key):
+        if self.still_loading():
+            return
         dialog = tk.Toplevel(self.master)
         dialog.title("Add Information")
         dialog.geometry("400x200")
@@ -282,8 +438,9 @@ class RevisionApp:
         def submit():
             info = text_widget.get("1.0", tk.END).strip()
             if info:
-                self.data[key]['text'].append(info)
-                self.save_data()
+                self.store.add_text(key, info)
+                self.search_index.add_text(key, info)
+                self.review_panel.concept_changed(key)
                 self.show_concept_details(key)
                 dialog.destroy()
             else:
@@ -291,16 +448,67 @@ class RevisionApp:
 
         ttk.Button(dialog, text="Add", command=submit).pack(pady=10)
 
+    def show_prerequisites(self, key, label):
+        if not label.winfo_exists():
+            # Another concept was opened meanwhile
+            return
+        prerequisites = self.analytics.ancestors(key)
+        if not prerequisites:
+            label.destroy()
+            return
+        text = ", ".join(prerequisites[:PREREQUISITES_SHOWN])
+        if len(prerequisites) > PREREQUISITES_SHOWN:
+            text += f" (+{len(prerequisites) - PREREQUISITES_SHOWN} more)"
+        label.config(text=f"Prerequisites: {text}")
+
+    def graph_analytics(self, when_ready):
+        # The analytics, or None while they are built on a worker from a
+        # snapshot of the data (the same as graph_snapshot()), so a large
+        # deck does not stall the click that first needs them; when_ready
+        # is called once they are in
+        if self.analytics is not None:
+            return self.analytics
+        self.analytics_waiting.append(when_ready)
+        if self.analytics_edits is None:
+            from graph_analytics import build_analytics
+            if self.analytics_scheduler is None:
+                self.analytics_scheduler = RenderScheduler(self.master, instrument("graph_analytics")(build_analytics),
+                                                           self.finish_analytics, self.on_analytics_error)
+            self.analytics_edits = []
+            self.analytics_scheduler.request({key: tuple(value['next']) for key, value in self.data.items()})
+        return None
+
+    def finish_analytics(self, analytics):
+        for method, args in self.analytics_edits:
+            getattr(analytics, method)(*args)
+        self.analytics_edits = None
+        self.analytics = analytics
+        waiting, self.analytics_waiting = self.analytics_waiting, []
+        for when_ready in waiting:
+            when_ready()
+
+    def on_analytics_error(self, error):
+        # The next use tries again
+        self.analytics_edits = None
+        self.analytics_waiting = []
+        messagebox.showerror("Analytics Error", f"Could not analyse the concept graph: {error}")
+
+    def update_analytics(self, method, *args):
+        # Edits go to the analytics, or wait for the build in flight
+        if self.analytics is not None:
+            getattr(self.analytics, method)(*args)
+        elif self.analytics_edits is not None:
+            self.analytics_edits.append((method, args))
+
+    @instrument("refresh_tree")
     def refresh_tree(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for key in self.data:
-            self.tree.insert("", "end", text=key)
+        # Applies only the rows that changed since the last refresh
+        self.tree.refresh()
 
     def on_tree_double_click(self, event):
-        item = self.tree.selection()[0]
-        key = self.tree.item(item, "text")
-        self.show_concept_details(key)
+        key = self.tree.selected_key()
+        if key is not None:
+            self.show_concept_details(key)
 
     def perform_search(self):
         query = self.search_entry.get().lower()
@@ -311,18 +519,19 @@ class RevisionApp:
         results = self.search_data(query)
         self.display_search_results(results)
 
+    def show_central_concepts(self):
+        # Highest PageRank over the related-concept links
+        if self.still_loading():
+            return
+        analytics = self.graph_analytics(self.show_central_concepts)
+        if analytics is None:
+            return
+        self.display_search_results([(key, "Central", f"importance {analytics.importance(key):.4f}")
+                                     for key in analytics.most_central(CENTRAL_SHOWN)])
+
+    @instrument("search_data")
     def search_data(self, query):
-        results = []
-        for key, value in self.data.items():
-            if query in key.lower():
-                results.append((key, "Key", key))
-            for next_item in value['next']:
-                if query in next_item.lower():
-                    results.append((key, "Next", next_item))
-            for text_item in value['text']:
-                if query in text_item.lower():
-                    results.append((key, "Text", text_item))
-        return results
+        return self.search_index.search(query)
 
     def display_search_results(self, results):
         result_window = tk.Toplevel(self.master)
@@ -359,26 +568,67 @@ class RevisionApp:
 
 
     def update_mind_map(self):
-        if self.is_rendering:
+        # Nothing to draw into yet, the first render happens when the tab opens
+        if not self.mind_map_ready:
+            return
+        # Edits made before the Tk loop is idle again share one snapshot
+        if self.render_pending:
+            return
+        self.render_pending = True
+        if not self.is_rendering:
+            self.is_rendering = True
+            self.show_loading_indicator()
+        self.master.after_idle(self._request_render)
+
+    def _request_render(self):
+        from mind_map_renderer import graph_snapshot
+
+        self.render_pending = False
+        self.render_scheduler.request((graph_snapshot(self.data), self.level_of_detail.settings()))
+
+    def profiled_render(self, request, cancelled):
+        return self.profile_capture.run(self._render_mind_map, request, cancelled)
+
+    def profiled_finish(self, result):
+        self.profile_capture.run(self._finish_rendering, result)
+        summary = self.profile_capture.finish(PROFILE_PATH)
+        if summary is not None:
+            self.diagnostics.show_profile(summary, PROFILE_PATH)
+
+    @instrument("_finish_rendering")
+    def _finish_rendering(self, result):
+        # Main thread, only ever called with the frame of the latest snapshot
+        from tile_pyramid import TilePyramid
+
+        frame, self.level_of_detail.aggregates = result
+        if self.renderer.apply(frame):
+            self.spatial_index = frame.spatial_index
+            if len(frame.node_order) > TILED_MIN_NODES:
+                # Tiles are rendered as they come into view, the figure is
+                # only drawn again for an export
+                self.tile_view.show(TilePyramid(frame))
+            else:
+                self.tile_view.hide()
+        if not self.tile_view.active:
+            self.highlight.refresh()
+            self.mpl_canvas.draw()
+            self.mind_map_inner_frame.update_idletasks()
+            self.mind_map_canvas.configure(scrollregion=self.mind_map_canvas.bbox("all"))
+
+        if self.render_pending:
             return
-
-        self.is_rendering = True
-        self.show_loading_indicator()
-
-        # Run the rendering in a separate thread
-        threading.Thread(target=self._render_mind_map, daemon=True).start()
-
-    def _finish_rendering(self):
-        self.mpl_canvas.draw()
-        self.mind_map_inner_frame.update_idletasks()
-        self.mind_map_canvas.configure(scrollregion=self.mind_map_canvas.bbox("all"))
-        
         self.is_rendering = False
         self.hide_loading_indicator()
 
         if self.export_after_render:
             self.export_mind_map()
 
+    def on_render_error(self, error):
+        self.is_rendering = False
+        self.export_after_render = False
+        self.hide_loading_indicator()
+        messagebox.showerror("Render Error", f"Could not render the mind map: {error}")
+
     def show_loading_indicator(self):
         self.loading_window = tk.Toplevel(self.master)
         self.loading_window.title("Loading")
@@ -407,24 +657,34 @@ class RevisionApp:
 
     # ... (rest of the code remains the same)
 
-    def load_data(self):
-        if os.path.exists(FILENAME):
-            with open(FILENAME, 'r') as file:
-                return json.load(file)
-        return {}
-
-    def save_data(self):
-        with open(FILENAME, 'w') as file:
-            json.dump(self.data, file, indent=2)
+    def on_close(self):
+        # Fold the journal into nested_dictionary.json and keep the layouts
+        # for the next start before exiting
+        self.review_panel.close()
+        self.store.close()
+        if self.analytics_scheduler is not None:
+            self.analytics_scheduler.close()
+        if self.mind_map_ready:
+            self.render_scheduler.close()
+            self.tile_view.close()
+            self.layout_cache.save()
+            from tree_layout import close_pool
+            close_pool()
+        if METRICS_PATH:
+            METRICS.dump(METRICS_PATH)
+        self.master.destroy()
 
     # ... (other methods remain the same)
 
     def enter_key(self):
+        if self.still_loading():
+            return
         key = self.key_entry.get()
         if key:
-            if key not in self.data:
-                self.data[key] = {'next': [], 'text': []}
-                self.save_data()
+            if self.store.add_concept(key):
+                self.search_index.add_concept(key)
+                self.review_panel.add_concept(key)
+                self.update_analytics('add_concept', key)
                 self.refresh_tree()
                 self.update_mind_map()
             self.show_concept_details(key)
@@ -432,6 +692,8 @@ class RevisionApp:
             messagebox.showwarning("Input Error", "Please enter a key.")
 
     def add_related_concept(self, key):
+        if self.still_loading():
+            return
         dialog = tk.Toplevel(self.master)
         dialog.title("Add Related Concept")
         dialog.geometry("300x100")
@@ -443,11 +705,14 @@ class RevisionApp:
         def submit():
             related_concept = entry.get()
             if related_concept:
-                if related_concept not in self.data:
-                    self.data[related_concept] = {'next': [], 'text': []}
+                if self.store.add_concept(related_concept):
+                    self.search_index.add_concept(related_concept)
+                    self.review_panel.add_concept(related_concept)
                 if related_concept not in self.data[key]['next']:
-                    self.data[key]['next'].append(related_concept)
-                self.save_data()
+                    self.store.add_edge(key, related_concept)
+                    self.search_index.add_next(key, related_concept)
+                    self.review_panel.concept_changed(key)
+                    self.update_analytics('add_next', key, related_concept)
                 self.refresh_tree()
                 self.update_mind_map()
                 self.show_concept_details(key)
@@ -457,133 +722,18 @@ class RevisionApp:
 
         ttk.Button(dialog, text="Add", command=submit).pack(pady=10)
 
-    def update_mind_map(self):
-        if self.is_rendering:
-            return
-
-        self.is_rendering = True
-        self.show_loading_indicator()
-
-        # Run the rendering in a separate thread
-        threading.Thread(target=self._render_mind_map, daemon=True).start()
-
     
-    def custom_tree_layout(self, G):
-        if not G.nodes():
-            return {}
-
-        def bfs_tree(root):
-            tree = nx.bfs_tree(G, root)
-            return tree
-
-        def assign_positions(tree, root):
-            pos = {}
-            level_width = {}
-            max_depth = 0
-
-            def dfs(node, depth, order):
-                nonlocal max_depth
-                max_depth = max(max_depth, depth)
-                if depth not in level_width:
-                    level_width[depth] = 0
-                level_width[depth] += 1
-                children = list(tree.successors(node))
-                if not children:
-                    pos[node] = (order, -depth)
-                    return order + 1
-                
-                start = order
-                for child in children:
-                    order = dfs(child, depth + 1, order)
-                pos[node] = (start + (order - start - 1) / 2, -depth)
-                return order
-
-            dfs(root, 0, 0)
-
-            # Normalize positions
-            max_width = max(level_width.values()) if level_width else 1
-            for node in pos:
-                x, y = pos[node]
-                pos[node] = (x / max_width, y / max_depth if max_depth != 0 else 0)
-
-            return pos
-
-        # Handle disconnected components
-        components = list(nx.connected_components(G))
-        if not components:
-            return {}
-
-        pos = {}
-        y_offset = 0
-        for component in components:
-            subgraph = G.subgraph(component)
-            root = max(subgraph.nodes(), key=lambda n: subgraph.degree(n))
-            tree = bfs_tree(root)
-            component_pos = assign_positions(tree, root)
-            
-            # Adjust y-positions for each component
-            for node, (x, y) in component_pos.items():
-                pos[node] = (x, y + y_offset)
-            
-            y_offset -= 1.5  # Increase vertical separation between components
-
-        return pos
-
-    def _render_mind_map(self):
-        self.G = nx.Graph()
-        for key, value in self.data.items():
-            self.G.add_node(key)
-            for next_item in value['next']:
-                if next_item in self.data:  # Only add edges for existing nodes
-                    self.G.add_edge(key, next_item)
-
-        self.ax.clear()
-        self.pos = self.custom_tree_layout(self.G)
-        
-        # Dynamically adjust figure size based on number of nodes
-        node_count = len(self.G.nodes())
-        figsize = (max(8, min(20, node_count)), max(6, min(15, node_count * 0.75)))
-        self.figure.set_size_inches(figsize)
-
-        # Adjust node size and font size based on number of nodes
-        node_size = max(1000, min(3000, 20000 / node_count)) if node_count > 0 else 3000
-        font_size = max(6, min(10, 100 / node_count)) if node_count > 0 else 10
-
-        if self.G.nodes():  # Only draw if there are nodes
-            self.nodes = nx.draw_networkx_nodes(self.G, self.pos, ax=self.ax, node_color='lightblue', 
-                                                node_size=node_size, alpha=0.8)
-            self.edges = nx.draw_networkx_edges(self.G, self.pos, ax=self.ax, edge_color='gray', 
-                                                width=1, alpha=0.7, arrows=True, arrowsize=10)
-
-            # Custom label drawing with adjusted font size
-            for node, (x, y) in self.pos.items():
-                lines = textwrap.wrap(node, width=10)
-                line_height = 0.03 * (font_size / 8)  # Adjust line height based on font size
-                start_y = y + (len(lines) - 1) * line_height / 2
-
-                for i, line in enumerate(lines):
-                    self.ax.text(x, start_y - i * line_height, line, 
-                                 horizontalalignment='center', verticalalignment='center',
-                                 fontsize=font_size, fontweight='bold')
-
-            # Adjust plot limits to ensure all nodes are visible
-            x_values, y_values = zip(*self.pos.values())
-            x_margin = (max(x_values) - min(x_values)) * 0.1
-            y_margin = (max(y_values) - min(y_values)) * 0.1
-            self.ax.set_xlim(min(x_values) - x_margin, max(x_values) + x_margin)
-            self.ax.set_ylim(min(y_values) - y_margin, max(y_values) + y_margin)
-        else:
-            self.ax.text(0.5, 0.5, "No data to display", 
-                         horizontalalignment='center', verticalalignment='center',
-                         fontsize=12, fontweight='bold')
-            self.ax.set_xlim(0, 1)
-            self.ax.set_ylim(0, 1)
-
-        self.ax.axis('off')
-
-        self.master.after(0, self._finish_rendering)
+    @instrument("_render_mind_map")
+    def _render_mind_map(self, request, cancelled):
+        # Render worker: only the nodes, edges and components that changed are
+        # laid out again, the artists are swapped in by _finish_rendering
+        snapshot, settings = request
+        view, aggregates = collapse(snapshot, settings)
+        frame = self.renderer.render(view, cancelled)
+        if frame is None:
+            return None
+        return frame, aggregates
 
-  
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,307 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Headless: no display needed for anything but the tree view benchmark
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from concept_store import JournalStore
+from mind_map_renderer import MindMapModel, MindMapRenderer, graph_snapshot
+from search_index import SearchIndex
+from tree_layout import layout_component, layout_components, layout_pool, tree_layout
+
+# Times the hot paths of the apps on synthetic nested_dictionary.json files:
+#   python benchmark.py --sizes 100 1000 100000 --shapes wide deep -o results.json
+#   python benchmark.py --baseline results.json   # exit 1 on a regression
+# Each benchmark runs --repeat times on a fresh copy of its inputs and the
+# fastest run is the reported time; results are written as JSON or CSV.
+
+SHAPES = ("wide", "deep", "components", "text")
+DEFAULT_SIZES = (100, 1000, 10000)
+BENCHMARKS = ("load", "layout", "layout_parallel", "render", "render_incremental", "draw", "search_index",
+              "search", "refresh_tree", "save", "edit")
+
+# Children per concept in the wide trees, concepts per disconnected component
+FANOUT = 20
+COMPONENT_SIZE = 10
+
+# Text bodies of the "text" shape: TEXT_ITEMS entries of TEXT_WORDS words
+TEXT_ITEMS = 5
+TEXT_WORDS = 200
+WORDS = ("memory", "graph", "layout", "concept", "revision", "network", "cache", "vector", "matrix",
+         "entropy", "gradient", "protein", "theorem", "syntax", "history", "market", "neuron", "orbit")
+QUERIES = ("concept 42", "graph", "entro", "theorem matrix", "zzz")
+
+# Edits timed by the edit benchmark
+EDITS = 100
+
+# A result this much slower than the baseline counts as a regression, unless
+# it is within timer noise of it
+DEFAULT_TOLERANCE = 1.25
+MIN_REGRESSION_SECONDS = 0.001
+
+
+def generate(shape, count, seed=0):
+    # Concept i hangs below parent(i); every shape is a forest of 'next' links
+    rng = random.Random(seed)
+    names = [f"concept {i}" for i in range(count)]
+    data = {name: {'next': [], 'text': []} for name in names}
+    for i in range(1, count):
+        if shape == "deep":
+            parent = i - 1
+        elif shape == "components":
+            offset = i % COMPONENT_SIZE
+            parent = i - offset + (offset - 1) // 2 if offset else None
+        elif shape == "text":
+            parent = (i - 1) // 4
+        else:
+            parent = (i - 1) // FANOUT
+        if parent is not None:
+            data[names[parent]]['next'].append(names[i])
+    for name in names:
+        if shape == "text":
+            data[name]['text'] = [" ".join(rng.choice(WORDS) for _ in range(TEXT_WORDS))
+                                  for _ in range(TEXT_ITEMS)]
+        else:
+            data[name]['text'] = [" ".join(rng.choice(WORDS) for _ in range(5))]
+    return data
+
+
+def write_dataset(data_dir, shape, count):
+    path = os.path.join(data_dir, f"{shape}-{count}.json")
+    if not os.path.exists(path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(generate(shape, count), file)
+    return path
+
+
+def timed(run, setup=None, repeat=3, teardown=None):
+    # (fastest, median) seconds of run(setup()), setup and teardown are not timed
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+        if teardown is not None:
+            teardown(state)
+    return min(times), statistics.median(times)
+
+
+def graph_of(snapshot):
+    # Same graph as the renderer's model builds
+    model = MindMapModel(layout_component)
+    model.sync(snapshot)
+    return model.G
+
+
+def serial_layouts(G, jobs):
+    return layout_components(G, jobs, workers=1)
+
+
+def parallel_layouts(G, jobs):
+    return layout_components(G, jobs, min_nodes=0)
+
+
+def new_renderer():
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    return MindMapRenderer(figure.add_subplot(), layout_component)
+
+
+def copy_store(path, work_dir):
+    # Every run gets its own snapshot, the apps' store writes next to it
+    target = os.path.join(work_dir, f"run-{time.perf_counter_ns()}.json")
+    shutil.copyfile(path, target)
+    return JournalStore(target)
+
+
+def run_benchmarks(path, names, repeat, work_dir, tk_root=None):
+    # Yields (benchmark, fastest, median) or (benchmark, None, reason) when skipped
+    with open(path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    snapshot = graph_snapshot(data)
+    keys = list(data)
+
+    for name in names:
+        if name == "load":
+            yield name, *timed(lambda store: store.load(), lambda: copy_store(path, work_dir), repeat,
+                               lambda store: store.close())
+        elif name == "layout":
+            G = graph_of(snapshot)
+            yield name, *timed(lambda _: tree_layout(G, serial_layouts), repeat=repeat)
+        elif name == "layout_parallel":
+            # Every component batch on the process pool, started before timing
+            G = graph_of(snapshot)
+            layout_pool().submit(int).result()
+            yield name, *timed(lambda _: tree_layout(G, parallel_layouts), repeat=repeat)
+        elif name == "render":
+            yield name, *timed(lambda renderer: renderer.render(snapshot), new_renderer, repeat)
+        elif name == "render_incremental":
+            # One new related concept on an already rendered map
+            def setup():
+                renderer = new_renderer()
+                renderer.render(snapshot)
+                return renderer
+            changed = dict(snapshot)
+            changed[keys[0]] = snapshot[keys[0]] + ("benchmark concept",)
+            changed["benchmark concept"] = ()
+            yield name, *timed(lambda renderer: renderer.render(changed), setup, repeat)
+        elif name == "draw":
+            def setup():
+                renderer = new_renderer()
+                return renderer, renderer.render(snapshot)
+            def draw(state):
+                renderer, frame = state
+                renderer.apply(frame)
+                renderer.ax.figure.canvas.draw()
+            yield name, *timed(draw, setup, repeat)
+        elif name == "search_index":
+            yield name, *timed(lambda _: SearchIndex(data), repeat=repeat)
+        elif name == "search":
+            index = SearchIndex(data)
+            yield name, *timed(lambda _: [index.search(query) for query in QUERIES], repeat=repeat)
+        elif name == "refresh_tree":
+            if tk_root is None:
+                yield name, None, "no display"
+                continue
+            from virtual_tree import VirtualTree
+
+            def setup():
+                tree = VirtualTree(tk_root, dict(data))
+                tree.data["benchmark concept"] = {'next': [], 'text': []}
+                return tree
+            yield name, *timed(lambda tree: tree.refresh(), setup, repeat, lambda tree: tree.destroy())
+        elif name == "save":
+            def setup():
+                store = copy_store(path, work_dir)
+                return store, store.load()
+            yield name, *timed(lambda state: state[0].write_snapshot(state[1]), setup, repeat,
+                               lambda state: state[0].close())
+        elif name == "edit":
+            def setup():
+                store = copy_store(path, work_dir)
+                store.load()
+                return store
+            def edit(store):
+                for i in range(EDITS):
+                    store.add_edge(keys[i % len(keys)], f"benchmark concept {i}")
+                store.journal_file.flush()
+            yield name, *timed(edit, setup, repeat, lambda store: store.close())
+
+
+def open_tk():
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+    return root
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path, tolerance):
+    # Results more than tolerance times slower than the same entry in the baseline
+    with open(baseline_path, 'r', encoding='utf-8') as file:
+        baseline = {(r['shape'], r['concepts'], r['benchmark']): r['seconds']
+                    for r in json.load(file)['results'] if r['seconds'] is not None}
+    regressions = []
+    for result in results:
+        before = baseline.get((result['shape'], result['concepts'], result['benchmark']))
+        if before is None or result['seconds'] is None:
+            continue
+        if result['seconds'] > before * tolerance and result['seconds'] - before > MIN_REGRESSION_SECONDS:
+            regressions.append((result, before))
+    return regressions
+
+
+def write_results(path, report, fmt):
+    if fmt == "csv":
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=["shape", "concepts", "benchmark", "seconds", "median", "note"])
+            writer.writeheader()
+            writer.writerows(report['results'])
+    else:
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark layout, rendering, search, tree refresh and saving")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="concept counts, e.g. 100 1000 1000000")
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--data-dir", help="keep the generated datasets here and reuse them")
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--format", choices=("json", "csv"), default=None,
+                        help="default: from the output file extension")
+    parser.add_argument("--baseline", help="earlier JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+    fmt = args.format or ("csv" if args.output.endswith(".csv") else "json")
+
+    work_dir = tempfile.mkdtemp(prefix="revision-benchmark-")
+    data_dir = args.data_dir or work_dir
+    os.makedirs(data_dir, exist_ok=True)
+    tk_root = open_tk() if "refresh_tree" in args.benchmarks else None
+    results = []
+    try:
+        for shape in args.shapes:
+            for count in args.sizes:
+                path = write_dataset(data_dir, shape, count)
+                for name, fastest, median in run_benchmarks(path, args.benchmarks, args.repeat, work_dir, tk_root):
+                    skipped = fastest is None
+                    results.append({"shape": shape, "concepts": count, "benchmark": name,
+                                    "seconds": fastest, "median": None if skipped else median,
+                                    "note": median if skipped else ""})
+                    timing = f"skipped ({median})" if skipped else f"{fastest:.4f}s"
+                    print(f"{shape:>10} {count:>8} {name:<18} {timing}", flush=True)
+    finally:
+        if tk_root is not None:
+            tk_root.destroy()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    write_results(args.output, report, fmt)
+    print(f"Wrote {len(results)} result(s) to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for result, before in regressions:
+            print(f"REGRESSION {result['shape']} {result['concepts']} {result['benchmark']}: "
+                  f"{before:.4f}s -> {result['seconds']:.4f}s", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
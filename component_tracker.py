@@ -0,0 +1,133 @@
+from array import array
+
+
+class UnionFind:
+    # Disjoint sets over dense integer ids, union by size with path halving
+
+    def __init__(self):
+        self.parent = array('i')
+        self.size = array('i')
+
+    def __len__(self):
+        return len(self.parent)
+
+    def add(self):
+        node = len(self.parent)
+        self.parent.append(node)
+        self.size.append(1)
+        return node
+
+    def find(self, node):
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(self, a, b):
+        # Returns (root, absorbed root), absorbed is None if a and b were joined already
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return a, None
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a, b
+
+
+class ComponentTracker:
+    # Connected components of the undirected concept graph, grown one edge
+    # at a time. Every component has a stable id: a merge keeps the id (and
+    # the member list) of the larger side and retires the other id. The ids
+    # changed or retired since the last take_changes() tell a layout which
+    # components it can skip. Union-find cannot split a component, so
+    # remove_component() takes a whole one out and the caller adds back what
+    # is left of it. Degrees are tracked too, for the layout root.
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.sets = UnionFind()
+        self.degree = array('i')
+        self.cid_of_root = {}
+        self.members = {}
+        # Highest-degree node of every component, by component id
+        self.best = {}
+        self.next_cid = 0
+        self.changed = set()
+        self.retired = set()
+
+    def __contains__(self, key):
+        return key in self.ids
+
+    def __len__(self):
+        return len(self.members)
+
+    def add(self, key):
+        node = self.ids.get(key)
+        if node is None:
+            node = self.sets.add()
+            self.ids[key] = node
+            self.names.append(key)
+            self.degree.append(0)
+            cid = self.next_cid
+            self.next_cid += 1
+            self.cid_of_root[node] = cid
+            self.members[cid] = [key]
+            self.best[cid] = node
+            self.changed.add(cid)
+        return node
+
+    def connect(self, key, item):
+        # One new edge of the undirected graph, a self-loop counts twice
+        u = self.add(key)
+        v = self.add(item)
+        self.degree[u] += 1
+        self.degree[v] += 1
+        root, absorbed = self.sets.union(u, v)
+        cid = self.cid_of_root[root]
+        if absorbed is not None:
+            # The larger component is the new root and keeps its id
+            gone = self.cid_of_root.pop(absorbed)
+            self.members[cid].extend(self.members.pop(gone))
+            self.best[cid] = max(self.best[cid], self.best.pop(gone), key=self.root_key)
+            self.changed.discard(gone)
+            self.retired.add(gone)
+        self.best[cid] = max(self.best[cid], u, v, key=self.root_key)
+        self.changed.add(cid)
+        return cid
+
+    def root_key(self, node):
+        # Highest degree, on a tie the name sorting last, so the root only
+        # depends on the component and not on the order it was built in
+        return self.degree[node], self.names[node]
+
+    def component_id(self, key):
+        return self.cid_of_root[self.sets.find(self.ids[key])]
+
+    def component(self, cid):
+        return self.members[cid]
+
+    def root(self, cid):
+        return self.names[self.best[cid]]
+
+    def remove_component(self, cid):
+        # Forgets the component and returns its members, their old slots in
+        # the arrays are simply left unused
+        members = self.members.pop(cid)
+        del self.best[cid]
+        del self.cid_of_root[self.sets.find(self.ids[members[0]])]
+        for key in members:
+            del self.ids[key]
+        self.changed.discard(cid)
+        self.retired.add(cid)
+        return members
+
+    def take_changes(self):
+        # (changed ids, retired ids) since the last call
+        changes = self.changed, self.retired
+        self.changed = set()
+        self.retired = set()
+        return changes
@@ -0,0 +1,199 @@
+import sys
+from array import array
+from collections.abc import Mapping, MutableMapping, MutableSequence
+
+# Adjacency arrays up to this length are scanned for edge checks, longer ones
+# get a set of target ids the first time they are checked
+SCAN_LIMIT = 16
+
+
+class Concept:
+    __slots__ = ("next_ids", "text", "lookup", "review")
+
+    def __init__(self):
+        self.next_ids = array('i')
+        self.text = []
+        self.lookup = None
+        # Spaced-repetition state, None until the concept is first reviewed
+        self.review = None
+
+
+class ConceptGraph(MutableMapping):
+    # Compact replacement for the {key: {'next': [...], 'text': [...]}} dict.
+    # Every name is interned once and given an integer id, a concept's
+    # related concepts are an array of ids instead of a list of duplicated
+    # strings, and edge checks use a per-concept id set once the array is
+    # long. Indexing returns a dict-like ConceptEntry, so code written
+    # against the plain dict keeps working unchanged.
+
+    def __init__(self, data=None):
+        self.names = []
+        self.ids = {}
+        # Indexed by id, None for names only used as an edge target
+        self.records = []
+        # Concept ids in insertion order
+        self.order = array('i')
+        self.edge_count = 0
+        if data:
+            self.update(data)
+
+    def intern(self, name):
+        node = self.ids.get(name)
+        if node is None:
+            node = len(self.names)
+            name = sys.intern(name)
+            self.names.append(name)
+            self.ids[name] = node
+            self.records.append(None)
+        return node
+
+    def record(self, key):
+        node = self.ids.get(key)
+        record = self.records[node] if node is not None else None
+        if record is None:
+            raise KeyError(key)
+        return record
+
+    def __getitem__(self, key):
+        return ConceptEntry(self, self.record(key))
+
+    def __setitem__(self, key, value):
+        node = self.intern(key)
+        old = self.records[node]
+        if old is None:
+            self.order.append(node)
+        else:
+            self.edge_count -= len(old.next_ids)
+        record = Concept()
+        self.records[node] = record
+        for item in value['next']:
+            self.add_edge_id(record, self.intern(item))
+        text = value['text']
+        # Lists and lazy lists are kept as they are
+        record.text = text if isinstance(text, MutableSequence) else list(text)
+        record.review = value.get('review')
+
+    def __delitem__(self, key):
+        record = self.record(key)
+        node = self.ids[key]
+        self.edge_count -= len(record.next_ids)
+        self.records[node] = None
+        self.order.remove(node)
+
+    def __contains__(self, key):
+        node = self.ids.get(key)
+        return node is not None and self.records[node] is not None
+
+    def __iter__(self):
+        names = self.names
+        return (names[node] for node in self.order)
+
+    def __len__(self):
+        return len(self.order)
+
+    def add_edge_id(self, record, target):
+        record.next_ids.append(target)
+        if record.lookup is not None:
+            record.lookup.add(target)
+        self.edge_count += 1
+
+    def has_edge(self, key, item):
+        target = self.ids.get(item)
+        if target is None:
+            return False
+        return self.has_edge_id(self.record(key), target)
+
+    def has_edge_id(self, record, target):
+        if record.lookup is None:
+            if len(record.next_ids) <= SCAN_LIMIT:
+                return target in record.next_ids
+            record.lookup = set(record.next_ids)
+        return target in record.lookup
+
+
+class ConceptEntry(Mapping):
+    # {'next': ..., 'text': ...} view of one concept, plus 'review' once the
+    # concept has been reviewed. 'next' and 'text' are changed in place,
+    # 'review' is the only key that can be assigned.
+
+    __slots__ = ("graph", "record")
+
+    def __init__(self, graph, record):
+        self.graph = graph
+        self.record = record
+
+    def __getitem__(self, name):
+        if name == 'next':
+            return NextList(self.graph, self.record)
+        if name == 'text':
+            return self.record.text
+        if name == 'review' and self.record.review is not None:
+            return self.record.review
+        raise KeyError(name)
+
+    def __setitem__(self, name, value):
+        if name != 'review':
+            raise KeyError(name)
+        self.record.review = value
+
+    def __iter__(self):
+        if self.record.review is None:
+            return iter(('next', 'text'))
+        return iter(('next', 'text', 'review'))
+
+    def __len__(self):
+        return 2 if self.record.review is None else 3
+
+
+class NextList(MutableSequence):
+    # A concept's related concepts as names, backed by its id array.
+    # Membership is an edge check rather than a list scan.
+
+    __slots__ = ("graph", "record")
+
+    def __init__(self, graph, record):
+        self.graph = graph
+        self.record = record
+
+    def __getitem__(self, index):
+        names = self.graph.names
+        if isinstance(index, slice):
+            return [names[node] for node in self.record.next_ids[index]]
+        return names[self.record.next_ids[index]]
+
+    def __len__(self):
+        return len(self.record.next_ids)
+
+    def __iter__(self):
+        names = self.graph.names
+        return (names[node] for node in self.record.next_ids)
+
+    def __contains__(self, item):
+        target = self.graph.ids.get(item)
+        return target is not None and self.graph.has_edge_id(self.record, target)
+
+    def append(self, item):
+        self.graph.add_edge_id(self.record, self.graph.intern(item))
+
+    def __setitem__(self, index, item):
+        if isinstance(index, slice):
+            raise TypeError("slice assignment is not supported")
+        self.record.next_ids[index] = self.graph.intern(item)
+        self.record.lookup = None
+
+    def __delitem__(self, index):
+        count = len(self.record.next_ids)
+        del self.record.next_ids[index]
+        self.graph.edge_count -= count - len(self.record.next_ids)
+        self.record.lookup = None
+
+    def insert(self, index, item):
+        self.record.next_ids.insert(index, self.graph.intern(item))
+        self.graph.edge_count += 1
+        self.record.lookup = None
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return repr(list(self))
@@ -0,0 +1,699 @@
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from concept_graph import ConceptGraph
+from instrumentation import METRICS, instrument
+from json_stream import ConceptStream
+
+FILENAME = "nested_dictionary.json"
+
+# Set REVISION_STORE to a .db/.sqlite path to switch the apps to SQLite
+STORE_PATH = os.environ.get("REVISION_STORE", FILENAME)
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+# Compact the journal into the snapshot once it holds this many records
+COMPACT_THRESHOLD = 1000
+
+# Concepts handed to the caller per step of a streaming load
+LOAD_CHUNK = 2000
+
+# Connections a StorePool opens per process, and how many owners' stores
+# (with their cached data) it keeps before evicting the least recently used
+POOL_SIZE = 4
+MAX_CACHED_OWNERS = 256
+
+# How long a connection waits for another process's write lock, in ms
+BUSY_TIMEOUT = 5000
+
+# PBKDF2 rounds for the stored hash of an account's access key
+KEY_ITERATIONS = 200000
+
+
+class JournalStore:
+    # Keeps nested_dictionary.json as a snapshot and appends one record per
+    # mutation to a journal next to it, so an edit costs the same no matter
+    # how big the data set is. Compaction folds the journal back into the
+    # snapshot on a background thread. The loaded data is a ConceptGraph.
+
+    def __init__(self, path=FILENAME, compact_threshold=COMPACT_THRESHOLD):
+        self.path = path
+        base = os.path.splitext(path)[0]
+        self.journal_path = base + ".journal"
+        self.pending_path = base + ".journal.pending"
+        self.tmp_path = path + ".tmp"
+        self.compact_threshold = compact_threshold
+
+        self.data = ConceptGraph()
+        self.lock = threading.Lock()
+        self.journal_file = None
+        self.journal_records = 0
+        self.compaction_thread = None
+        self.stream = None
+
+    def load(self):
+        self.recover()
+        self.data = ConceptGraph(self.read_snapshot(self.path))
+        for path in (self.pending_path, self.journal_path):
+            self.journal_records += self.replay(self.data, path)
+        self.journal_file = open(self.journal_path, 'a', encoding='utf-8')
+        self.maybe_compact()
+        return self.data
+
+    def peek(self):
+        # Read-only load() for other processes: no recovery, no journal
+        # opened and no compaction, the files are left exactly as they are
+        path = self.path
+        if os.path.exists(self.tmp_path) and not os.path.exists(self.pending_path):
+            # A finished compaction that was not renamed yet
+            path = self.tmp_path
+        data = ConceptGraph(self.read_snapshot(path))
+        for journal in (self.pending_path, self.journal_path):
+            self.replay(data, journal)
+        return data
+
+    def load_iter(self, lazy_text=False, chunk_size=LOAD_CHUNK):
+        # Streaming load(): self.data starts empty and is filled concept by
+        # concept. The returned generator yields (progress, batch) where batch
+        # lists the (key, value) pairs just added, or is None once journal
+        # records have changed self.data in place. With lazy_text the text
+        # bodies stay in a memory map of the snapshot until they are read.
+        self.recover()
+        self.close_stream()
+        self.data = ConceptGraph()
+        return self.stream_snapshot(lazy_text, chunk_size)
+
+    def stream_snapshot(self, lazy_text, chunk_size):
+        if os.path.exists(self.path):
+            self.stream = ConceptStream(self.path, lazy_text=lazy_text)
+            batch = []
+            for key, value in self.stream:
+                self.data[key] = value
+                batch.append((key, value))
+                if len(batch) >= chunk_size:
+                    yield self.stream.progress, batch
+                    batch = []
+            if batch:
+                yield self.stream.progress, batch
+            if not lazy_text:
+                self.close_stream()
+
+        replayed = 0
+        for path in (self.pending_path, self.journal_path):
+            replayed += self.replay(self.data, path)
+        self.journal_records += replayed
+        self.journal_file = open(self.journal_path, 'a', encoding='utf-8')
+        self.maybe_compact()
+        if replayed:
+            yield 1.0, None
+
+    def close_stream(self):
+        # Also called from the compaction thread, see release_snapshot()
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            stream.close()
+
+    def release_snapshot(self):
+        # Windows cannot replace a file that is still memory-mapped, so lazy
+        # texts are read into memory before the snapshot is rewritten
+        if os.name == 'nt':
+            self.close_stream()
+
+    def add_concept(self, key):
+        if key in self.data:
+            return False
+        self.data[key] = {'next': [], 'text': []}
+        self.append({'op': 'concept', 'key': key})
+        return True
+
+    def add_edge(self, key, item):
+        apply_record(self.data, {'op': 'next', 'key': key, 'item': item})
+        self.append({'op': 'next', 'key': key, 'item': item})
+
+    def add_text(self, key, text):
+        apply_record(self.data, {'op': 'text', 'key': key, 'item': text})
+        self.append({'op': 'text', 'key': key, 'item': text})
+
+    def set_review(self, key, state):
+        apply_record(self.data, {'op': 'review', 'key': key, 'item': state})
+        self.append({'op': 'review', 'key': key, 'item': state})
+
+    def write_snapshot(self, data):
+        # Full rewrite, used by callers that edit the dict directly
+        self.wait_for_compaction()
+        with self.lock:
+            self.data = data
+            self.release_snapshot()
+            write_json_atomic(self.tmp_path, self.path, data)
+            for path in (self.pending_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            if self.journal_file is not None:
+                self.journal_file.close()
+                self.journal_file = open(self.journal_path, 'a', encoding='utf-8')
+            self.journal_records = 0
+
+    def close(self):
+        self.wait_for_compaction()
+        if self.journal_records:
+            self.compact(background=False)
+            self.wait_for_compaction()
+        if self.journal_file is not None:
+            self.journal_file.close()
+            self.journal_file = None
+        self.close_stream()
+
+    @instrument("journal_append")
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        with self.lock:
+            if self.journal_file is None:
+                self.journal_file = open(self.journal_path, 'a', encoding='utf-8')
+            self.journal_file.write(line + "\n")
+            self.journal_file.flush()
+            os.fsync(self.journal_file.fileno())
+            self.journal_records += 1
+        self.maybe_compact()
+
+    def maybe_compact(self):
+        if self.journal_records >= self.compact_threshold:
+            self.compact()
+
+    def compact(self, background=True):
+        if self.compaction_thread is not None and self.compaction_thread.is_alive():
+            return
+        with self.lock:
+            # Move the live journal aside so new records keep appending to a
+            # fresh file while the old one is folded into the snapshot
+            if os.path.exists(self.pending_path):
+                if self.journal_file is not None:
+                    self.journal_file.close()
+                with open(self.journal_path, 'r', encoding='utf-8') as src, \
+                        open(self.pending_path, 'a', encoding='utf-8') as dst:
+                    dst.write(src.read())
+                os.remove(self.journal_path)
+            elif os.path.exists(self.journal_path):
+                if self.journal_file is not None:
+                    self.journal_file.close()
+                os.replace(self.journal_path, self.pending_path)
+            self.journal_file = open(self.journal_path, 'a', encoding='utf-8')
+            self.journal_records = 0
+
+        self.compaction_thread = threading.Thread(target=self.fold_pending, daemon=True)
+        self.compaction_thread.start()
+        if not background:
+            self.compaction_thread.join()
+
+    def wait_for_compaction(self):
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+            self.compaction_thread = None
+
+    @instrument("journal_compact")
+    def fold_pending(self):
+        # Works only from the files on disk, never from self.data, so the UI
+        # thread can keep mutating while this runs. The snapshot is streamed
+        # concept by concept, only the pending journal is held in memory.
+        changes = OrderedDict()
+        self.replay(changes, self.pending_path, apply=group_record)
+        if os.path.exists(self.path):
+            stream = ConceptStream(self.path)
+            try:
+                write_json_stream(self.tmp_path, fold_changes(stream, changes))
+            finally:
+                stream.close()
+        else:
+            write_json_stream(self.tmp_path, fold_changes((), changes))
+        # Once the pending journal is gone the tmp snapshot is authoritative,
+        # recover() finishes the rename if we die in between
+        os.remove(self.pending_path)
+        self.release_snapshot()
+        os.replace(self.tmp_path, self.path)
+
+    def recover(self):
+        if os.path.exists(self.tmp_path):
+            if os.path.exists(self.pending_path):
+                # Compaction was interrupted before it committed
+                os.remove(self.tmp_path)
+            else:
+                os.replace(self.tmp_path, self.path)
+
+    @staticmethod
+    def read_snapshot(path):
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        return {}
+
+    @staticmethod
+    def replay(data, path, apply=None):
+        apply = apply or apply_record
+        count = 0
+        if not os.path.exists(path):
+            return count
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-append
+                    continue
+                apply(data, record)
+                count += 1
+        return count
+
+
+def apply_record(data, record):
+    key = record['key']
+    if key not in data:
+        data[key] = {'next': [], 'text': []}
+    if record['op'] == 'next':
+        data[key]['next'].append(record['item'])
+        if record['item'] not in data:
+            data[record['item']] = {'next': [], 'text': []}
+    elif record['op'] == 'text':
+        data[key]['text'].append(record['item'])
+    elif record['op'] == 'review':
+        data[key]['review'] = record['item']
+
+
+def group_record(changes, record):
+    # Journal records by the concept they change, in the order apply_record()
+    # would create the concepts
+    changes.setdefault(record['key'], []).append(record)
+    if record['op'] == 'next':
+        changes.setdefault(record['item'], [])
+
+
+def fold_changes(items, changes):
+    # (key, value) pairs of a snapshot with grouped journal records applied,
+    # concepts the journal created follow in the order it created them
+    seen = set()
+    for key, value in items:
+        seen.add(key)
+        for record in changes.get(key, ()):
+            apply_record({key: value}, record)
+        yield key, value
+    for key, records in changes.items():
+        if key not in seen:
+            value = {'next': [], 'text': []}
+            for record in records:
+                apply_record({key: value}, record)
+            yield key, value
+
+
+def to_json(value):
+    # ConceptGraph entries and lazy text lists are written as dicts and lists
+    if isinstance(value, Mapping):
+        return dict(value)
+    return list(value)
+
+
+def write_json_atomic(tmp_path, path, data):
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2, default=to_json)
+        file.flush()
+        os.fsync(file.fileno())
+    if path is not None:
+        os.replace(tmp_path, path)
+
+
+def write_json_stream(path, items):
+    # Same file as write_json_atomic() would write for dict(items), one
+    # concept at a time
+    with open(path, 'w', encoding='utf-8') as file:
+        separator = "{\n  "
+        for key, value in items:
+            body = json.dumps(value, indent=2, default=to_json).replace("\n", "\n  ")
+            file.write(f"{separator}{json.dumps(key)}: {body}")
+            separator = ",\n  "
+        file.write("{}" if separator == "{\n  " else "\n}")
+        file.flush()
+        os.fsync(file.fileno())
+
+
+class SQLiteStore:
+    # Same interface as JournalStore, backed by an indexed SQLite database in
+    # WAL mode. load() returns a read-only mapping view, so lookups such as
+    # data[key]['next'] become indexed queries instead of an in-memory dict.
+    # owner namespaces the rows so several users can share one file. A
+    # connection and its lock can be passed in to share them (see StorePool).
+
+    def __init__(self, path, owner='', conn=None, lock=None):
+        self.path = path
+        self.owner = owner
+        self.shared = conn is not None
+        self.lock = lock if lock is not None else threading.RLock()
+        self.conn = conn if conn is not None else connect(path)
+        self.data = ConceptView(self)
+        self.cache = None
+
+    def load(self):
+        return self.data
+
+    def load_iter(self, lazy_text=False, chunk_size=LOAD_CHUNK):
+        # Rows are already read on demand, there is nothing to stream
+        return iter([(1.0, None)])
+
+    def cached_data(self):
+        # Plain dict copy of the owner's concepts, re-read only after a write
+        # from any connection or process has bumped the owner's revision
+        with self.lock:
+            revision = self.revision()
+            if self.cache is None or self.cache[0] != revision:
+                self.cache = (revision, dict(self.data.items()))
+            return self.cache[1]
+
+    def revision(self):
+        row = self.conn.execute("SELECT revision FROM revisions WHERE owner = ?",
+                                (self.owner,)).fetchone()
+        return row[0] if row else 0
+
+    def bump_revision(self):
+        self.conn.execute("INSERT INTO revisions (owner, revision) VALUES (?, 1) "
+                          "ON CONFLICT (owner) DO UPDATE SET revision = revision + 1", (self.owner,))
+
+    def add_concept(self, key):
+        with self.lock, self.transaction():
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO concepts (owner, name) VALUES (?, ?)", (self.owner, key))
+            if cursor.rowcount != 1:
+                return False
+            self.bump_revision()
+            return True
+
+    def add_edge(self, key, item):
+        with self.lock, self.transaction():
+            self.add_concept(key)
+            self.add_concept(item)
+            self.conn.execute("INSERT INTO edges (concept_id, item) VALUES (?, ?)",
+                              (self.concept_id(key), item))
+            self.bump_revision()
+
+    def add_text(self, key, text):
+        with self.lock, self.transaction():
+            self.add_concept(key)
+            self.conn.execute("INSERT INTO texts (concept_id, body) VALUES (?, ?)",
+                              (self.concept_id(key), text))
+            self.bump_revision()
+
+    def set_review(self, key, state):
+        with self.lock, self.transaction():
+            # A review is the most frequent write, so a cache that was
+            # current is patched instead of being read again in full
+            current = self.cache is not None and self.cache[0] == self.revision()
+            if self.add_concept(key):
+                current = False
+            self.conn.execute("INSERT INTO reviews (concept_id, state) VALUES (?, ?) "
+                              "ON CONFLICT (concept_id) DO UPDATE SET state = excluded.state",
+                              (self.concept_id(key), json.dumps(state)))
+            self.bump_revision()
+            if current:
+                self.cache[1][key]['review'] = state
+                self.cache = (self.revision(), self.cache[1])
+
+    def write_snapshot(self, data):
+        if isinstance(data, ConceptView):
+            data = dict(data.items())
+        with self.lock, self.transaction():
+            for table in ("edges", "texts", "reviews"):
+                self.conn.execute(f"DELETE FROM {table} WHERE concept_id IN "
+                                  "(SELECT id FROM concepts WHERE owner = ?)", (self.owner,))
+            self.conn.execute("DELETE FROM concepts WHERE owner = ?", (self.owner,))
+            self.conn.executemany("INSERT INTO concepts (owner, name) VALUES (?, ?)",
+                                  ((self.owner, key) for key in data))
+            ids = self.concept_ids()
+            self.conn.executemany("INSERT INTO edges (concept_id, item) VALUES (?, ?)",
+                                  ((ids[key], item) for key, value in data.items()
+                                   for item in value['next']))
+            self.conn.executemany("INSERT INTO texts (concept_id, body) VALUES (?, ?)",
+                                  ((ids[key], text) for key, value in data.items()
+                                   for text in value['text']))
+            self.conn.executemany("INSERT INTO reviews (concept_id, state) VALUES (?, ?)",
+                                  ((ids[key], json.dumps(value['review'])) for key, value in data.items()
+                                   if value.get('review') is not None))
+            self.bump_revision()
+
+    def close(self):
+        # A pooled connection belongs to the pool
+        if self.shared:
+            return
+        with self.lock:
+            self.conn.close()
+
+    def transaction(self):
+        return Transaction(self.conn)
+
+    def concept_id(self, key):
+        row = self.conn.execute("SELECT id FROM concepts WHERE owner = ? AND name = ?",
+                                (self.owner, key)).fetchone()
+        return row[0] if row else None
+
+    def concept_ids(self):
+        return dict(self.conn.execute("SELECT name, id FROM concepts WHERE owner = ?",
+                                      (self.owner,)))
+
+    def next_items(self, concept_id):
+        return [row[0] for row in self.conn.execute(
+            "SELECT item FROM edges WHERE concept_id = ? ORDER BY id", (concept_id,))]
+
+    def text_items(self, concept_id):
+        return [row[0] for row in self.conn.execute(
+            "SELECT body FROM texts WHERE concept_id = ? ORDER BY id", (concept_id,))]
+
+    def review_state(self, concept_id):
+        row = self.conn.execute("SELECT state FROM reviews WHERE concept_id = ?", (concept_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS concepts (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL,
+    UNIQUE (owner, name)
+);
+CREATE TABLE IF NOT EXISTS edges (
+    id INTEGER PRIMARY KEY,
+    concept_id INTEGER NOT NULL REFERENCES concepts (id),
+    item TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS edges_by_concept ON edges (concept_id, id);
+CREATE TABLE IF NOT EXISTS texts (
+    id INTEGER PRIMARY KEY,
+    concept_id INTEGER NOT NULL REFERENCES concepts (id),
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS texts_by_concept ON texts (concept_id, id);
+CREATE TABLE IF NOT EXISTS reviews (
+    concept_id INTEGER PRIMARY KEY REFERENCES concepts (id),
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS revisions (
+    owner TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL UNIQUE,
+    salt BLOB NOT NULL,
+    key_hash BLOB NOT NULL
+);
+"""
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class Transaction:
+    # BEGIN/COMMIT around a block, nested blocks join the outer transaction.
+    # Every SQLite write is one outer transaction, timed as sqlite_write
+    # including the wait for another process's write lock.
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.outer = False
+        self.timer = None
+
+    def __enter__(self):
+        if not self.conn.in_transaction:
+            self.timer = METRICS.timed("sqlite_write").start()
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.outer = True
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.outer:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+            self.timer.stop()
+        return False
+
+
+class ConceptView(Mapping):
+    # Read-only {'next': [...], 'text': [...]} view over a SQLiteStore, with
+    # 'review' for reviewed concepts. The returned lists are copies, mutate
+    # through the store's add_* and set_review methods.
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, key):
+        with self.store.lock:
+            concept_id = self.store.concept_id(key)
+            if concept_id is None:
+                raise KeyError(key)
+            value = {'next': self.store.next_items(concept_id),
+                     'text': self.store.text_items(concept_id)}
+            review = self.store.review_state(concept_id)
+            if review is not None:
+                value['review'] = review
+            return value
+
+    def __contains__(self, key):
+        with self.store.lock:
+            return self.store.concept_id(key) is not None
+
+    def __iter__(self):
+        with self.store.lock:
+            rows = self.store.conn.execute(
+                "SELECT name FROM concepts WHERE owner = ? ORDER BY id",
+                (self.store.owner,)).fetchall()
+        return (row[0] for row in rows)
+
+    def __len__(self):
+        with self.store.lock:
+            return self.store.conn.execute("SELECT COUNT(*) FROM concepts WHERE owner = ?",
+                                           (self.store.owner,)).fetchone()[0]
+
+    def items(self):
+        # Three ordered scans instead of two queries per concept
+        store = self.store
+        with store.lock:
+            concepts = {}
+            for concept_id, name in store.conn.execute(
+                    "SELECT id, name FROM concepts WHERE owner = ? ORDER BY id", (store.owner,)):
+                concepts[concept_id] = (name, {'next': [], 'text': []})
+            for concept_id, item in store.conn.execute(
+                    "SELECT e.concept_id, e.item FROM edges e JOIN concepts c ON c.id = e.concept_id "
+                    "WHERE c.owner = ? ORDER BY e.id", (store.owner,)):
+                concepts[concept_id][1]['next'].append(item)
+            for concept_id, body in store.conn.execute(
+                    "SELECT t.concept_id, t.body FROM texts t JOIN concepts c ON c.id = t.concept_id "
+                    "WHERE c.owner = ? ORDER BY t.id", (store.owner,)):
+                concepts[concept_id][1]['text'].append(body)
+            for concept_id, state in store.conn.execute(
+                    "SELECT r.concept_id, r.state FROM reviews r JOIN concepts c ON c.id = r.concept_id "
+                    "WHERE c.owner = ?", (store.owner,)):
+                concepts[concept_id][1]['review'] = json.loads(state)
+        return list(concepts.values())
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+
+class StorePool:
+    # Process-wide access to one SQLite file shared by many users and by
+    # several server processes. A fixed set of connections is opened once and
+    # every owner is pinned to one of them, so an owner's writes serialize on
+    # its connection lock while different owners spread over the pool. The
+    # owners' stores, each holding its cached data, are kept in an LRU.
+
+    def __init__(self, path, size=POOL_SIZE, max_owners=MAX_CACHED_OWNERS):
+        if path == ':memory:':
+            size = 1  # Every in-memory connection would be a separate database
+        self.path = path
+        self.max_owners = max_owners
+        self.lock = threading.Lock()
+        self.connections = [(connect(path), threading.RLock()) for _ in range(size)]
+        self.stores = OrderedDict()
+
+    def store(self, owner):
+        with self.lock:
+            store = self.stores.get(owner)
+            if store is not None:
+                self.stores.move_to_end(owner)
+                return store
+            conn, lock = self.connections[hash(owner) % len(self.connections)]
+            store = SQLiteStore(self.path, owner=owner, conn=conn, lock=lock)
+            self.stores[owner] = store
+            if len(self.stores) > self.max_owners:
+                self.stores.popitem(last=False)
+            return store
+
+    def create_account(self, name):
+        # Returns (owner, access key) for a new account, None if the name is
+        # taken. Only a salted hash of the key is stored, the user keeps the
+        # key itself and needs it for every later sign_in().
+        key = secrets.token_urlsafe(24)
+        salt = os.urandom(16)
+        owner = f"{name}_{uuid.uuid4()}"
+        conn, lock = self.connections[0]
+        with lock, Transaction(conn):
+            try:
+                conn.execute("INSERT INTO accounts (name, owner, salt, key_hash) VALUES (?, ?, ?, ?)",
+                             (name, owner, salt, hash_key(key, salt)))
+            except sqlite3.IntegrityError:
+                return None
+        return owner, key
+
+    def sign_in(self, name, key):
+        # The account's owner key, None unless key is the one create_account() gave out
+        conn, lock = self.connections[0]
+        with lock:
+            row = conn.execute("SELECT owner, salt, key_hash FROM accounts WHERE name = ?", (name,)).fetchone()
+        if row is None or not hmac.compare_digest(hash_key(key, row[1]), row[2]):
+            return None
+        return row[0]
+
+    def close(self):
+        with self.lock:
+            self.stores.clear()
+            for conn, lock in self.connections:
+                with lock:
+                    conn.close()
+
+
+def hash_key(key, salt):
+    return hashlib.pbkdf2_hmac('sha256', key.encode('utf-8'), salt, KEY_ITERATIONS)
+
+
+def open_store(path=STORE_PATH, owner=''):
+    # Picks the backend from the file extension
+    if path == ':memory:' or os.path.splitext(path)[1] in SQLITE_EXTENSIONS:
+        return SQLiteStore(path, owner=owner)
+    return JournalStore(path)
+
+
+def migrate_json(json_path, db_path, owner=''):
+    # One-shot import of nested_dictionary.json (plus any unfolded journal).
+    # peek() leaves the source exactly as it is, load()/close() would fold
+    # its journal into the snapshot
+    data = JournalStore(json_path).peek()
+    target = SQLiteStore(db_path, owner=owner)
+    target.write_snapshot(data)
+    target.close()
+    return len(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate a nested_dictionary.json file to SQLite")
+    parser.add_argument("json_path", nargs="?", default=FILENAME)
+    parser.add_argument("db_path", nargs="?", default=os.path.splitext(FILENAME)[0] + ".db")
+    parser.add_argument("--owner", default='')
+    args = parser.parse_args()
+    count = migrate_json(args.json_path, args.db_path, args.owner)
+    print(f"Migrated {count} concept(s) from {args.json_path} to {args.db_path}")
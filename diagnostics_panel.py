@@ -0,0 +1,69 @@
+import os
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+COLUMNS = ("calls", "mean_ms", "p50_ms", "p95_ms", "max_ms", "blocks_per_call")
+HEADINGS = ("Calls", "Mean ms", "p50 ms", "p95 ms", "Max ms", "Blocks/call")
+
+# The table follows the metrics while the tab is shown
+REFRESH_MS = 1000
+
+
+class DiagnosticsPanel(ttk.Frame):
+    # Contents of the hidden Diagnostics tab: one row per instrumented path,
+    # buttons to reset and dump the metrics, and the summary of the last
+    # profiled render cycle. on_profile arms the capture and starts a render.
+
+    def __init__(self, master, metrics, on_profile, **kwargs):
+        super().__init__(master, **kwargs)
+        self.metrics = metrics
+        self.on_profile = on_profile
+        self.refresh_job = None
+
+        self.table = ttk.Treeview(self, columns=COLUMNS, selectmode="none")
+        self.table.heading("#0", text="Path")
+        self.table.column("#0", width=180)
+        for column, heading in zip(COLUMNS, HEADINGS):
+            self.table.heading(column, text=heading)
+            self.table.column(column, width=80, anchor=tk.E)
+        self.table.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        buttons = ttk.Frame(self)
+        buttons.pack(side=tk.TOP, fill=tk.X, padx=5)
+        ttk.Button(buttons, text="Reset", command=self.reset).pack(side=tk.LEFT)
+        ttk.Button(buttons, text="Dump...", command=self.dump).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Profile next render", command=self.on_profile).pack(side=tk.LEFT)
+
+        self.profile_text = tk.Text(self, height=12, wrap=tk.NONE, font=("Courier", 9))
+        self.profile_text.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+    def refresh(self):
+        self.table.delete(*self.table.get_children())
+        for summary in self.metrics.summaries():
+            values = [summary["calls"]] + [f"{summary[column]:.2f}" for column in COLUMNS[1:-1]]
+            values.append(f"{summary['blocks_per_call']:.0f}")
+            self.table.insert("", "end", text=summary["name"], values=values)
+
+    def start(self):
+        self.refresh()
+        self.refresh_job = self.after(REFRESH_MS, self.start)
+
+    def stop(self):
+        if self.refresh_job is not None:
+            self.after_cancel(self.refresh_job)
+            self.refresh_job = None
+
+    def reset(self):
+        self.metrics.reset()
+        self.refresh()
+
+    def dump(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json",
+                                            filetypes=[("JSON files", "*.json"), ("CSV files", "*.csv")])
+        if path:
+            self.metrics.dump(path)
+            messagebox.showinfo("Diagnostics", f"Metrics written to {os.path.abspath(path)}")
+
+    def show_profile(self, summary, path):
+        self.profile_text.delete("1.0", tk.END)
+        self.profile_text.insert(tk.END, f"Profile saved to {os.path.abspath(path)}\n\n{summary}")
@@ -0,0 +1,175 @@
+import argparse
+import functools
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Headless: no display needed, pyplot is never imported
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from concept_store import JournalStore
+from mind_map_renderer import MindMapRenderer, graph_snapshot
+from tree_layout import LAYOUT_WORKERS, PARALLEL_MIN_NODES, layout_component, layout_components
+
+# Nightly export of mind maps without the Tk app:
+#   python export_mind_maps.py decks/*.json -o exports --split component -f png pdf
+# Every deck is read without touching its files (see JournalStore.peek), split
+# into one map per connected component or per root subtree, and the maps are
+# laid out and drawn with the app's tree layout and renderer on the Agg
+# backend, spread over a process pool. A single map (e.g. --split whole) is
+# drawn here instead and its components are laid out on the pool.
+
+FORMATS = ("png", "pdf", "svg")
+SPLITS = ("whole", "component", "root")
+
+# Same resolution as the interactive export
+DEFAULT_DPI = 300
+
+# Longest concept name kept in an output file name
+MAX_SLUG = 40
+
+
+def deck_units(data, split):
+    # (name, snapshot) per map to draw, snapshot as taken by graph_snapshot
+    snapshot = graph_snapshot(data)
+    if split == "whole":
+        return [("mind_map", snapshot)]
+    if split == "component":
+        groups = components(snapshot)
+    else:
+        groups = root_subtrees(snapshot)
+    width = len(str(len(groups)))
+    return [(f"{split}-{i + 1:0{width}d}-{slug(group[0])}", {key: snapshot[key] for key in group})
+            for i, group in enumerate(groups)]
+
+
+def components(snapshot):
+    # Connected components with 'next' taken as undirected, nodes in data order
+    adj = {key: [] for key in snapshot}
+    for key, next_items in snapshot.items():
+        for item in next_items:
+            if item in adj and item != key:
+                adj[key].append(item)
+                adj[item].append(key)
+    seen = set()
+    groups = []
+    for start in snapshot:
+        if start in seen:
+            continue
+        seen.add(start)
+        group = [start]
+        for node in group:
+            for neighbor in adj[node]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    group.append(neighbor)
+        groups.append(group)
+    return groups
+
+
+def root_subtrees(snapshot):
+    # Everything reachable through 'next' from each concept nothing points
+    # to. Concepts only reachable through a cycle start subtrees of their own.
+    referenced = {item for key, next_items in snapshot.items() for item in next_items if item != key}
+    starts = [key for key in snapshot if key not in referenced]
+    covered = set()
+    groups = []
+    for start in starts + list(snapshot):
+        if start in covered:
+            continue
+        group = [start]
+        reached = {start}
+        for node in group:
+            for item in snapshot[node]:
+                if item in snapshot and item not in reached:
+                    reached.add(item)
+                    group.append(item)
+        covered.update(reached)
+        groups.append(group)
+    return groups
+
+
+def slug(name):
+    text = re.sub(r"[^\w-]+", "_", name).strip("_")[:MAX_SLUG]
+    return text or "concept"
+
+
+def render_unit(snapshot, base, formats, dpi, layout_workers=None):
+    # Runs in a pool worker: one figure per map, saved once per format. With
+    # layout_workers the components are laid out on that many processes.
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    batch = functools.partial(layout_components, workers=layout_workers) if layout_workers else None
+    renderer = MindMapRenderer(ax, layout_component, batch)
+    renderer.apply(renderer.render(snapshot))
+    paths = []
+    for fmt in formats:
+        path = f"{base}.{fmt}"
+        figure.savefig(path, format=fmt, dpi=dpi, bbox_inches="tight")
+        paths.append(path)
+    return paths
+
+
+def export_decks(deck_paths, output_dir, formats=("png",), split="component", dpi=DEFAULT_DPI, workers=None):
+    # Returns (written paths, [(deck, map name, error)])
+    jobs = []
+    for deck_path in deck_paths:
+        data = JournalStore(deck_path).peek()
+        deck_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(deck_path))[0])
+        os.makedirs(deck_dir, exist_ok=True)
+        for name, snapshot in deck_units(data, split):
+            jobs.append((deck_path, name, snapshot, os.path.join(deck_dir, name)))
+
+    written = []
+    failures = []
+    if len(jobs) == 1 and workers != 1:
+        deck_path, name, snapshot, base = jobs[0]
+        try:
+            written.extend(render_unit(snapshot, base, formats, dpi, workers or LAYOUT_WORKERS))
+        except Exception as e:
+            failures.append((deck_path, name, e))
+        return written, failures
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_unit, snapshot, base, formats, dpi): (deck_path, name)
+                   for deck_path, name, snapshot, base in jobs}
+        for future in as_completed(futures):
+            deck_path, name = futures[future]
+            try:
+                written.extend(future.result())
+            except Exception as e:
+                # One broken map does not stop the rest of the batch
+                failures.append((deck_path, name, e))
+    return written, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export mind maps of nested_dictionary.json decks without a display")
+    parser.add_argument("decks", nargs="+", help="nested_dictionary.json files to export")
+    parser.add_argument("-o", "--output", default="exports", help="output directory, one subdirectory per deck")
+    parser.add_argument("-f", "--format", nargs="+", choices=FORMATS, default=["png"], dest="formats")
+    parser.add_argument("--split", choices=SPLITS, default="component",
+                        help="one map per deck, per connected component or per root subtree")
+    parser.add_argument("--dpi", type=int, default=DEFAULT_DPI)
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="worker processes (default: CPU count); a single map is laid out on them only when "
+                             f"its components hold at least {PARALLEL_MIN_NODES} concepts in total")
+    args = parser.parse_args(argv)
+
+    missing = [path for path in args.decks if not os.path.exists(path)]
+    if missing:
+        parser.error(f"no such deck: {', '.join(missing)}")
+
+    written, failures = export_decks(args.decks, args.output, args.formats, args.split, args.dpi, args.workers)
+    for deck_path, name, error in failures:
+        print(f"{deck_path}: {name} failed: {error}", file=sys.stderr)
+    print(f"Exported {len(written)} file(s) from {len(args.decks)} deck(s) to {args.output}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
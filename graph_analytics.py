@@ -0,0 +1,219 @@
+from array import array
+
+import numpy as np
+
+from component_tracker import ComponentTracker
+
+# PageRank of the 'next' graph: damping, convergence threshold (L1 change
+# of the whole vector) and iteration cap
+DAMPING = 0.85
+TOLERANCE = 1e-6
+MAX_ITERATIONS = 100
+
+
+class GraphAnalytics:
+    # Structure of the concept graph on integer ids, kept up to date with
+    # add_concept()/add_next() like the SearchIndex. Components, degrees and
+    # each component's highest-degree concept (the layout root) are updated
+    # per edge in near-constant time by a ComponentTracker. Depths, PageRank
+    # and ancestor sets are recomputed lazily after a change, so reading
+    # them is a lookup.
+
+    def __init__(self, data=None):
+        self.names = []
+        self.ids = {}
+        self.next_ids = []
+        self.parent_ids = []
+        self.edges = set()
+        self.components = ComponentTracker()
+
+        self.depth = None
+        self.rooted = None
+        self.rank = None
+        self.ranking = None
+        self.ancestor_sets = {}
+        if data:
+            for key, value in data.items():
+                self.add_concept(key)
+                for next_item in value['next']:
+                    self.add_next(key, next_item)
+
+    def __contains__(self, key):
+        return key in self.ids
+
+    def __len__(self):
+        return len(self.names)
+
+    def node(self, key):
+        node = self.ids.get(key)
+        if node is None:
+            node = len(self.names)
+            self.names.append(key)
+            self.ids[key] = node
+            self.next_ids.append([])
+            self.parent_ids.append([])
+            self.components.add(key)
+            self.rank = self.ranking = None
+            if self.depth is not None:
+                self.depth.append(0)
+                self.rooted.append(1)
+        return node
+
+    def add_concept(self, key):
+        self.node(key)
+
+    def add_next(self, key, next_item):
+        u = self.node(key)
+        v = self.node(next_item)
+        if (u, v) in self.edges:
+            return
+        self.edges.add((u, v))
+        self.next_ids[u].append(v)
+        self.parent_ids[v].append(u)
+        self.rank = self.ranking = None
+        self.ancestor_sets.clear()
+        self.update_depth(u, v)
+        # The mind map's graph is undirected, a->b plus b->a is one edge there
+        if (v, u) not in self.edges or u == v:
+            self.components.connect(key, next_item)
+
+    def update_depth(self, u, v):
+        # Depths are only patched while both ends hang below a real root;
+        # a self-loop changes nothing, anything involving a cycle start
+        # (whose depth depends on the order compute_depth() met it) is
+        # recomputed on next use
+        if self.depth is None or u == v:
+            return
+        if self.parent_count(v) == 1:
+            # v stopped being a root. A new leaf just goes below u, anything
+            # else moves a whole subtree down
+            if self.rooted[u] and not any(child != v for child in self.next_ids[v]):
+                self.depth[v] = self.depth[u] + 1
+            else:
+                self.depth = None
+            return
+        if not self.rooted[v]:
+            self.depth = None
+            return
+        if not self.rooted[u]:
+            return
+        # Only shorter paths can appear, push them down from v
+        queue = [v] if self.depth[u] + 1 < self.depth[v] else []
+        if queue:
+            self.depth[v] = self.depth[u] + 1
+        for node in queue:
+            for child in self.next_ids[node]:
+                if self.depth[node] + 1 < self.depth[child]:
+                    self.depth[child] = self.depth[node] + 1
+                    queue.append(child)
+
+    def parent_count(self, node):
+        # Parents other than node itself, a self-loop does not stop a root
+        parents = self.parent_ids[node]
+        return len(parents) - (node in parents)
+
+    def compute_depth(self):
+        # 'next' steps from the nearest concept nothing else points to, one
+        # breadth-first pass from all of them at once; concepts only
+        # reachable through a cycle start counting from themselves and are
+        # not rooted
+        count = len(self.names)
+        depth = array('i', [-1]) * count
+        self.spread_depth(depth, [node for node in range(count) if not self.parent_count(node)])
+        rooted = bytearray(value != -1 for value in depth)
+        for start in range(count):
+            if depth[start] == -1:
+                self.spread_depth(depth, [start])
+        self.depth = depth
+        self.rooted = rooted
+
+    def spread_depth(self, depth, starts):
+        for start in starts:
+            depth[start] = 0
+        queue = list(starts)
+        for node in queue:
+            for child in self.next_ids[node]:
+                if depth[child] == -1:
+                    depth[child] = depth[node] + 1
+                    queue.append(child)
+
+    def compute_rank(self):
+        count = len(self.names)
+        if not count:
+            self.rank = np.empty(0)
+            self.ranking = []
+            return
+        sources = np.fromiter((u for u, _ in self.edges), dtype=np.int64, count=len(self.edges))
+        targets = np.fromiter((v for _, v in self.edges), dtype=np.int64, count=len(self.edges))
+        out_degree = np.bincount(sources, minlength=count).astype(float)
+        dangling = out_degree == 0
+        weights = 1.0 / out_degree[sources]
+        rank = np.full(count, 1.0 / count)
+        for _ in range(MAX_ITERATIONS):
+            spread = np.bincount(targets, weights=rank[sources] * weights, minlength=count)
+            new_rank = (1 - DAMPING) / count + DAMPING * (spread + rank[dangling].sum() / count)
+            change = np.abs(new_rank - rank).sum()
+            rank = new_rank
+            if change < TOLERANCE:
+                break
+        self.rank = rank
+        self.ranking = [int(node) for node in np.argsort(-rank, kind='stable')]
+
+    def component_of(self, key):
+        return self.components.component_id(key)
+
+    def component_size(self, key):
+        return len(self.components.component(self.component_of(key)))
+
+    def component_root(self, key):
+        # Highest-degree concept of key's component, where its layout starts
+        return self.components.root(self.component_of(key))
+
+    def depth_of(self, key):
+        if self.depth is None:
+            self.compute_depth()
+        return self.depth[self.ids[key]]
+
+    def importance(self, key):
+        if self.rank is None:
+            self.compute_rank()
+        return float(self.rank[self.ids[key]])
+
+    def most_central(self, count=10):
+        if self.ranking is None:
+            self.compute_rank()
+        return [self.names[node] for node in self.ranking[:count]]
+
+    def parents(self, key):
+        # Concepts listing key as related, its direct prerequisites
+        return [self.names[node] for node in self.parent_ids[self.ids[key]]]
+
+    def ancestors(self, key):
+        # Every concept key can be reached from, nearest first
+        node = self.ids[key]
+        result = self.ancestor_sets.get(node)
+        if result is None:
+            seen = {node}
+            queue = [node]
+            for current in queue:
+                for parent in self.parent_ids[current]:
+                    if parent not in seen:
+                        seen.add(parent)
+                        queue.append(parent)
+            result = self.ancestor_sets[node] = tuple(self.names[n] for n in queue[1:])
+        return result
+
+
+def build_analytics(snapshot, cancelled=None):
+    # GraphAnalytics of a graph_snapshot() ({key: next tuple}) with depths
+    # and PageRank already computed, for a worker thread
+    analytics = GraphAnalytics()
+    for key, next_items in snapshot.items():
+        if cancelled is not None and cancelled():
+            return None
+        analytics.add_concept(key)
+        for next_item in next_items:
+            analytics.add_next(key, next_item)
+    analytics.compute_depth()
+    analytics.compute_rank()
+    return analytics
@@ -0,0 +1,185 @@
+import bisect
+import cProfile
+import csv
+import functools
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+
+# Upper bounds of the latency buckets in milliseconds, the last bucket is open
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Functions listed in a profile summary
+PROFILE_LINES = 25
+
+
+class Histogram:
+    __slots__ = ("counts", "calls", "total", "max", "blocks")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.blocks = 0
+
+    def add(self, ms, blocks):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.calls += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+        self.blocks += blocks
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of the calls
+        target = fraction * self.calls
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max
+        return 0.0
+
+    def summary(self, name):
+        calls = self.calls or 1
+        return {
+            "name": name,
+            "calls": self.calls,
+            "mean_ms": self.total / calls,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": self.max,
+            "blocks_per_call": self.blocks / calls,
+        }
+
+
+class Metrics:
+    # Per-name latency histograms plus the net number of memory blocks each
+    # call left allocated (sys.getallocatedblocks, so other threads running
+    # at the same time are counted too). Recording is a dict lookup and a
+    # few additions under a lock, cheap enough to stay on in production.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def record(self, name, seconds, blocks=0):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds * 1000, blocks)
+
+    def timed(self, name):
+        return Timer(self, name)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+
+    def summaries(self):
+        with self.lock:
+            return [histogram.summary(name) for name, histogram in sorted(self.histograms.items())]
+
+    def dump(self, path):
+        # JSON with the raw buckets, or one CSV row per name for a .csv path
+        summaries = self.summaries()
+        if path.endswith(".csv"):
+            with open(path, 'w', newline='', encoding='utf-8') as file:
+                writer = csv.DictWriter(file, fieldnames=list(summaries[0]) if summaries else ["name"])
+                writer.writeheader()
+                writer.writerows(summaries)
+            return
+        with self.lock:
+            buckets = {name: histogram.counts[:] for name, histogram in self.histograms.items()}
+        for summary in summaries:
+            summary["buckets"] = buckets[summary["name"]]
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "bucket_ms": BUCKETS_MS,
+                       "metrics": summaries}, file, indent=2)
+
+
+class Timer:
+    __slots__ = ("metrics", "name", "started", "blocks")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def start(self):
+        # start()/stop() time work that spans several turns of the Tk loop
+        self.blocks = sys.getallocatedblocks()
+        self.started = time.perf_counter()
+        return self
+
+    def stop(self):
+        elapsed = time.perf_counter() - self.started
+        self.metrics.record(self.name, elapsed, sys.getallocatedblocks() - self.blocks)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class ProfileCapture:
+    # Opt-in cProfile of one render cycle. arm() before the render is
+    # requested; the worker and the main thread each profile their part
+    # (cProfile only sees the thread it runs on) and finish() merges both
+    # into one pstats file and a text summary.
+
+    def __init__(self):
+        self.armed = False
+        self.profiles = []
+
+    def arm(self):
+        self.armed = True
+        self.profiles = []
+
+    def run(self, function, *args):
+        if not self.armed:
+            return function(*args)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows a single active profiler per process
+            return function(*args)
+        try:
+            return function(*args)
+        finally:
+            profile.disable()
+            self.profiles.append(profile)
+
+    def finish(self, path):
+        # Returns the summary text, None if nothing was captured
+        if not self.armed or not self.profiles:
+            return None
+        self.armed = False
+        stats = pstats.Stats(self.profiles[0])
+        for profile in self.profiles[1:]:
+            stats.add(profile)
+        self.profiles = []
+        stats.dump_stats(path)
+        output = io.StringIO()
+        stats.stream = output
+        stats.sort_stats("cumulative").print_stats(PROFILE_LINES)
+        return output.getvalue()
+
+
+METRICS = Metrics()
+
+
+def instrument(name, metrics=METRICS):
+    # Decorator recording every call of the function under name
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with metrics.timed(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,185 @@
+import json
+import mmap
+import os
+import re
+import threading
+from collections.abc import MutableSequence
+
+# Strings (with escapes) and the structural characters between them. Numbers
+# and literals are not tokens: they only occur inside 'review' objects, and
+# those (like any member other than 'next' and 'text') are skipped as one
+# opaque span and decoded with json.loads.
+TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\],]')
+
+
+class ConceptStream:
+    # Iterates the concepts of a nested_dictionary.json file one at a time
+    # from a memory map, so neither the raw text nor the whole object tree has
+    # to be in memory before the first concept is available. progress is the
+    # fraction of the file parsed so far. With lazy_text the 'text' lists are
+    # LazyText views that decode their slice of the map when read.
+
+    def __init__(self, path, lazy_text=False):
+        self.path = path
+        self.lazy_text = lazy_text
+        self.lock = threading.Lock()
+        self.lazy = []
+        self.progress = 0.0
+        self.file = open(path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    def __iter__(self):
+        if self.map is None:
+            self.progress = 1.0
+            return
+        tokens = TOKEN.finditer(self.map)
+        for match in tokens:
+            if match.group() != b'{':
+                raise ValueError(f"{self.path}: expected a JSON object")
+            break
+        else:
+            self.progress = 1.0
+            return
+
+        key = None
+        for match in tokens:
+            token = match.group()
+            if token == b'}':
+                break
+            if token == b',':
+                continue
+            if key is None:
+                key = json.loads(token)
+                continue
+            value, end = self.read_value(match, tokens)
+            self.progress = end / self.size
+            yield key, value
+            key = None
+        self.progress = 1.0
+
+    def read_value(self, first, tokens):
+        # Walks the tokens of one concept, remembering where its member arrays
+        # start and end, and decodes 'next' now and 'text' now or lazily
+        if first.group() != b'{':
+            end = self.skip(first, tokens)
+            return json.loads(self.map[first.start():end]), end
+        spans = {}
+        member = None
+        depth = 1
+        end = None
+        for match in tokens:
+            token = match.group()
+            if token == b'{' or token == b'[':
+                if depth == 1:
+                    start = match.start()
+                depth += 1
+            elif token == b'}' or token == b']':
+                depth -= 1
+                if depth == 1:
+                    spans[member] = (start, match.end())
+                elif depth == 0:
+                    end = match.end()
+                    break
+            elif depth == 1 and token != b',':
+                member = json.loads(token)
+        if end is None:
+            raise ValueError(f"{self.path}: unterminated value")
+
+        value = {}
+        for name, (start, stop) in spans.items():
+            if name == 'text' and self.lazy_text:
+                value[name] = LazyText(self, start, stop)
+                self.lazy.append(value[name])
+            else:
+                value[name] = json.loads(self.map[start:stop])
+        value.setdefault('next', [])
+        value.setdefault('text', [])
+        return value, end
+
+    def skip(self, first, tokens):
+        if first.group() not in (b'{', b'['):
+            return first.end()
+        depth = 1
+        for match in tokens:
+            token = match.group()
+            if token == b'{' or token == b'[':
+                depth += 1
+            elif token == b'}' or token == b']':
+                depth -= 1
+                if depth == 0:
+                    return match.end()
+        raise ValueError(f"{self.path}: unterminated value")
+
+    def decode(self, start, stop):
+        # Caller holds self.lock
+        if self.map is None:
+            raise ValueError(f"{self.path} is closed")
+        return json.loads(self.map[start:stop])
+
+    def detach(self):
+        # Copies every lazy list into memory so the map can be closed
+        with self.lock:
+            lazy, self.lazy = self.lazy, []
+        for text in lazy:
+            text.materialize()
+
+    def close(self):
+        self.detach()
+        with self.lock:
+            if self.map is not None:
+                self.map.close()
+                self.map = None
+            self.file.close()
+
+
+class LazyText(MutableSequence):
+    # A concept's 'text' list that stays in the memory map until it is
+    # changed. Reads decode the slice every time instead of keeping a copy.
+    # The stream may be detached from another thread (the journal's
+    # compaction), so the check for a copy and the read of the map happen
+    # under the stream's lock.
+
+    def __init__(self, stream, start, stop):
+        self.stream = stream
+        self.start = start
+        self.stop = stop
+        self.items = None
+
+    def materialize(self):
+        if self.items is None:
+            with self.stream.lock:
+                if self.items is None:
+                    self.items = self.stream.decode(self.start, self.stop)
+        return self.items
+
+    def view(self):
+        items = self.items
+        if items is not None:
+            return items
+        with self.stream.lock:
+            return self.items if self.items is not None else self.stream.decode(self.start, self.stop)
+
+    def __getitem__(self, index):
+        return self.view()[index]
+
+    def __len__(self):
+        return len(self.view())
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def __setitem__(self, index, value):
+        self.materialize()[index] = value
+
+    def __delitem__(self, index):
+        del self.materialize()[index]
+
+    def insert(self, index, value):
+        self.materialize().insert(index, value)
+
+    def __eq__(self, other):
+        return list(self.view()) == list(other)
+
+    def __repr__(self):
+        return repr(self.view())
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from concept_store import STORE_PATH, write_json_atomic
+from render_cache import LRUCache
+from tree_layout import layout_component, layout_components, layout_root, tree_layout
+
+# Persisted next to nested_dictionary.json
+CACHE_PATH = os.path.splitext(STORE_PATH)[0] + ".layouts.json"
+
+# Component layouts kept in memory and on disk
+MAX_LAYOUTS = 2000
+
+# Smaller components are cheaper to lay out again than to hash and look up
+MIN_CACHED_NODES = 32
+
+
+class LayoutCache:
+    # Component layouts keyed by a canonical hash of the component's node and
+    # edge sets and its layout root, so an unchanged component is never laid
+    # out twice, not even across restarts. Entries are LRU-evicted; save()
+    # writes the survivors to CACHE_PATH, oldest first, and the next start
+    # loads them back.
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_LAYOUTS):
+        self.path = path
+        self.entries = LRUCache(max_entries)
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                saved = json.load(file)
+        except ValueError:
+            # A damaged cache is only a slower start
+            return
+        for digest, rows in saved.items():
+            self.entries.put(digest, {node: (x, y) for node, x, y in rows})
+
+    def save(self, min_interval=0):
+        # min_interval (seconds) throttles callers that save after every render
+        with self.lock:
+            if not self.dirty or not self.path:
+                return
+            if time.monotonic() - self.saved_at < min_interval:
+                return
+            with self.entries.lock:
+                saved = {digest: [[node, x, y] for node, (x, y) in pos.items()]
+                         for digest, pos in self.entries.entries.items()}
+            # Per-process tmp file, several server workers may save at once
+            write_json_atomic(f"{self.path}.{os.getpid()}.tmp", self.path, saved)
+            self.dirty = False
+            self.saved_at = time.monotonic()
+
+    def layout_component(self, G, component, root=None):
+        if len(component) < MIN_CACHED_NODES:
+            return layout_component(G, component, root)
+        root = root if root is not None else layout_root(G, component)
+        digest = component_digest(G, component, root)
+        pos = self.entries.get(digest)
+        if pos is None:
+            pos = layout_component(G, component, root)
+            self.entries.put(digest, pos)
+            self.dirty = True
+        return pos
+
+    def layout_components(self, G, jobs):
+        # Batch version of layout_component, only the misses are laid out and
+        # they may go to the process pool together
+        jobs = list(jobs)
+        layouts = [None] * len(jobs)
+        digests = {}
+        misses = []
+        for i, (component, root) in enumerate(jobs):
+            if len(component) >= MIN_CACHED_NODES:
+                if root is None:
+                    root = layout_root(G, component)
+                    jobs[i] = component, root
+                digests[i] = component_digest(G, component, root)
+                layouts[i] = self.entries.get(digests[i])
+            if layouts[i] is None:
+                misses.append(i)
+        for i, pos in zip(misses, layout_components(G, [jobs[i] for i in misses])):
+            layouts[i] = pos
+            if i in digests:
+                self.entries.put(digests[i], pos)
+                self.dirty = True
+        return layouts
+
+    def tree_layout(self, G):
+        return tree_layout(G, self.layout_components)
+
+
+def component_digest(G, component, root):
+    # Independent of insertion order: sorted nodes plus sorted edges, and
+    # the root the layout starts from
+    adj = G.adj
+    nodes = sorted(component)
+    edges = sorted((u, v) for u in component for v in adj[u] if u <= v)
+    return hashlib.sha256(json.dumps([nodes, edges, root]).encode('utf-8')).hexdigest()
@@ -0,0 +1,100 @@
+import os
+
+# Concepts this many 'next' steps below a root, or heading more than
+# MAX_SUBTREE descendants, show their subtree as one aggregate node
+MAX_DEPTH = int(os.environ.get("REVISION_LOD_DEPTH", 3))
+MAX_SUBTREE = int(os.environ.get("REVISION_LOD_SUBTREE", 50))
+
+
+class LevelOfDetail:
+    # Main-thread state of the level-of-detail mode: the limits, the concepts
+    # the user has expanded, and which aggregate node stands for which
+    # concept in the frame on screen. collapse() does the work on the render
+    # worker from an immutable settings() copy.
+
+    def __init__(self, enabled=False, max_depth=MAX_DEPTH, max_subtree=MAX_SUBTREE):
+        self.enabled = enabled
+        self.max_depth = max_depth
+        self.max_subtree = max_subtree
+        self.expanded = set()
+        self.aggregates = {}
+
+    def settings(self):
+        if not self.enabled:
+            return None
+        return self.max_depth, self.max_subtree, frozenset(self.expanded)
+
+    def is_aggregate(self, node):
+        return node in self.aggregates
+
+    def expand(self, node):
+        # Expands the concept behind an aggregate node, False for other nodes
+        concept = self.aggregates.get(node)
+        if concept is None:
+            return False
+        self.expanded.add(concept)
+        return True
+
+
+def collapse(snapshot, settings):
+    # Returns (view, aggregates): view is a snapshot holding only the visible
+    # concepts plus one aggregate node per collapsed concept, aggregates maps
+    # each aggregate node to its concept. The hierarchy is the BFS tree of
+    # 'next' from the concepts nothing points to; concepts only reachable
+    # through a cycle start trees of their own.
+    if settings is None:
+        return snapshot, {}
+    max_depth, max_subtree, expanded = settings
+
+    referenced = {item for key, next_items in snapshot.items() for item in next_items if item != key}
+    depth = {}
+    order = []
+    children = {}
+    for start in [key for key in snapshot if key not in referenced] + list(snapshot):
+        if start in depth:
+            continue
+        depth[start] = 0
+        queue = [start]
+        for node in queue:
+            order.append(node)
+            children[node] = []
+            for item in snapshot[node]:
+                if item in snapshot and item not in depth:
+                    depth[item] = depth[node] + 1
+                    children[node].append(item)
+                    queue.append(item)
+
+    size = {}
+    for node in reversed(order):
+        size[node] = 1 + sum(size[child] for child in children[node])
+
+    visible = set()
+    collapsed = {}
+    for node in order:
+        if depth[node] != 0 and node not in visible:
+            continue
+        visible.add(node)
+        if not children[node]:
+            continue
+        if node not in expanded and (depth[node] >= max_depth or size[node] - 1 > max_subtree):
+            collapsed[node] = size[node] - 1
+        else:
+            visible.update(children[node])
+
+    aggregates = {}
+    view = {}
+    for key, next_items in snapshot.items():
+        if key not in visible:
+            continue
+        next_items = tuple(item for item in next_items if item in visible)
+        if key in collapsed:
+            aggregate = f"+{collapsed[key]} ({key})"
+            # Never reuse the name of a real concept
+            while aggregate in snapshot or aggregate in aggregates:
+                aggregate += "\u200b"
+            aggregates[aggregate] = key
+            next_items += (aggregate,)
+        view[key] = next_items
+    for aggregate in aggregates:
+        view[aggregate] = ()
+    return view, aggregates
@@ -1,5 +1,3 @@
-import json
-import os
 import tkinter as tk
 from tkinter import ttk, messagebox
 import networkx as nx
@@ -7,8 +5,10 @@ import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import math
 import textwrap
-
-FILENAME = "nested_dictionary.json"
+from concept_store import open_store
+from search_index import SearchIndex
+from layout_cache import LayoutCache
+from virtual_tree import VirtualTree
 
 class RevisionApp:
     def __init__(self, master):
@@ -16,26 +16,35 @@ class RevisionApp:
         self.master.title("Concept Revision App")
         self.master.geometry("1000x700")
 
+        self.store = open_store()
         self.data = self.load_data()
+        self.layout_cache = LayoutCache()
+        self.search_index = SearchIndex(self.data)
         self.create_widgets()
         self.add_search_functionality()
         self.create_mind_map_view()
 
+        self.master.protocol("WM_DELETE_WINDOW", self.on_close)
+
     # ... (load_data and save_data methods remain the same)
     def load_data(self):
-        if os.path.exists(FILENAME):
-            with open(FILENAME, 'r') as file:
-                return json.load(file)
-        return {}
+        return self.store.load()
 
     def save_data(self):
-        with open(FILENAME, 'w') as file:
-            json.dump(self.data, file, indent=2)
+        # Full rewrite of the snapshot, edits go through self.store instead
+        self.store.write_snapshot(self.data)
+
+    def on_close(self):
+        # Fold the journal into nested_dictionary.json and keep the layouts
+        # for the next start before exiting
+        self.store.close()
+        self.layout_cache.save()
+        self.master.destroy()
 
     def on_tree_double_click(self, event):
-        item = self.tree.selection()[0]
-        key = self.tree.item(item, "text")
-        self.show_concept_details(key)
+        key = self.tree.selected_key()
+        if key is not None:
+            self.show_concept_details(key)
 
     def create_widgets(self):
         # Main frame to hold everything
@@ -65,15 +74,12 @@ class RevisionApp:
         left_frame = ttk.Frame(self.paned_window)
         self.paned_window.add(left_frame, weight=1)
 
-        # Tree view for displaying the nested structure
-        self.tree = ttk.Treeview(left_frame)
+        # Tree view for displaying the nested structure, only the visible rows
+        # are materialized and related concepts are expanded on demand
+        self.tree = VirtualTree(left_frame, self.data)
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.tree.bind("<Double-1>", self.on_tree_double_click)
-
-        # Scrollbar for the tree view
-        scrollbar = ttk.Scrollbar(left_frame, orient="vertical", command=self.tree.yview)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.view.bind("<Double-1>", self.on_tree_double_click)
+        self.tree.view.bind("<Return>", self.on_tree_double_click)
 
         # Right frame for concept details
         self.right_frame = ttk.Frame(self.paned_window)
@@ -137,46 +143,8 @@ class RevisionApp:
         self.mind_map_canvas.configure(scrollregion=self.mind_map_canvas.bbox("all"))
 
     def custom_tree_layout(self, G):
-        def bfs_tree(root):
-            tree = nx.bfs_tree(G, root)
-            return tree
-
-        def assign_positions(tree, root):
-            pos = {}
-            level_width = {}
-            max_depth = 0
-
-            def dfs(node, depth, order):
-                nonlocal max_depth
-                max_depth = max(max_depth, depth)
-                if depth not in level_width:
-                    level_width[depth] = 0
-                level_width[depth] += 1
-                children = list(tree.successors(node))
-                if not children:
-                    pos[node] = (order, -depth)
-                    return order + 1
-                
-                start = order
-                for child in children:
-                    order = dfs(child, depth + 1, order)
-                pos[node] = (start + (order - start - 1) / 2, -depth)
-                return order
-
-            dfs(root, 0, 0)
-
-            # Normalize positions
-            for node in pos:
-                x, y = pos[node]
-                pos[node] = (x / max(level_width.values()), y / max_depth)
-
-            return pos
-
-        root = max(G.nodes(), key=lambda n: G.degree(n))
-        tree = bfs_tree(root)
-        pos = assign_positions(tree, root)
-
-        return pos
+        # Unchanged components come from the layout cache
+        return self.layout_cache.tree_layout(G)
 
     def update_mind_map(self):
         G = nx.Graph()
@@ -208,7 +176,11 @@ class RevisionApp:
                              fontsize=8, fontweight='bold')
 
         self.ax.set_xlim(-0.05, 1.05)
-        self.ax.set_ylim(-1.05, 0.05)
+        if pos:
+            # Components are stacked below each other, so fit the lowest one
+            self.ax.set_ylim(min(y for _, y in pos.values()) - 0.05, 0.05)
+        else:
+            self.ax.set_ylim(-1.05, 0.05)
         self.ax.axis('off')
 
         self.mpl_canvas.draw()
@@ -221,9 +193,8 @@ class RevisionApp:
     def enter_key(self):
         key = self.key_entry.get()
         if key:
-            if key not in self.data:
-                self.data[key] = {'next': [], 'text': []}
-                self.save_data()
+            if self.store.add_concept(key):
+                self.search_index.add_concept(key)
                 self.refresh_tree()
                 self.update_mind_map()
             self.show_concept_details(key)
@@ -267,10 +238,10 @@ class RevisionApp:
         def submit():
             related_concept = entry.get()
             if related_concept:
-                if related_concept not in self.data:
-                    self.data[related_concept] = {'next': [], 'text': []}
-                self.data[key]['next'].append(related_concept)
-                self.save_data()
+                if self.store.add_concept(related_concept):
+                    self.search_index.add_concept(related_concept)
+                self.store.add_edge(key, related_concept)
+                self.search_index.add_next(key, related_concept)
                 self.refresh_tree()
                 self.update_mind_map()
                 self.show_concept_details(key)
@@ -293,8 +264,8 @@ class RevisionApp:
         def submit():
             info = text_widget.get("1.0", tk.END).strip()
             if info:
-                self.data[key]['text'].append(info)
-                self.save_data()
+                self.store.add_text(key, info)
+                self.search_index.add_text(key, info)
                 self.show_concept_details(key)
                 dialog.destroy()
             else:
@@ -303,15 +274,13 @@ class RevisionApp:
         ttk.Button(dialog, text="Add", command=submit).pack(pady=10)
 
     def refresh_tree(self):
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for key in self.data:
-            self.tree.insert("", "end", text=key)
+        # Applies only the rows that changed since the last refresh
+        self.tree.refresh()
 
     def on_tree_double_click(self, event):
-        item = self.tree.selection()[0]
-        key = self.tree.item(item, "text")
-        self.show_concept_details(key)
+        key = self.tree.selected_key()
+        if key is not None:
+            self.show_concept_details(key)
 
     def perform_search(self):
         query = self.search_entry.get().lower()
@@ -323,17 +292,7 @@ class RevisionApp:
         self.display_search_results(results)
 
     def search_data(self, query):
-        results = []
-        for key, value in self.data.items():
-            if query in key.lower():
-                results.append((key, "Key", key))
-            for next_item in value['next']:
-                if query in next_item.lower():
-                    results.append((key, "Next", next_item))
-            for text_item in value['text']:
-                if query in text_item.lower():
-                    results.append((key, "Text", text_item))
-        return results
+        return self.search_index.search(query)
 
     def display_search_results(self, results):
         result_window = tk.Toplevel(self.master)
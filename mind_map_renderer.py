@@ -0,0 +1,471 @@
+import heapq
+import textwrap
+from collections import namedtuple
+
+import networkx as nx
+import numpy as np
+from matplotlib.artist import Artist
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+from matplotlib.text import Text
+
+from component_tracker import ComponentTracker
+from spatial_index import SpatialIndex
+from tree_layout import COMPONENT_SPACING
+
+# Labels are skipped when their lines would be drawn closer than this many
+# pixels apart, or when more than MAX_VISIBLE_LABELS nodes are on screen
+MIN_LINE_PIXELS = 1.0
+MAX_VISIBLE_LABELS = 2000
+
+HIGHLIGHT_NODE = to_rgba('red')
+HIGHLIGHT_NEIGHBOR = to_rgba('yellow')
+
+
+class MindMapModel:
+    # Graph, layout and draw arrays of the mind map, kept alive between
+    # renders. Each sync() diffs a snapshot against the graph, adds or removes
+    # only the changed nodes and edges, and re-lays out only the components
+    # those changes touched. A ComponentTracker merges components as edges
+    # come in, so no traversal is needed to find them; only a removal
+    # rebuilds the components it broke. Every component keeps a vertical
+    # slot so the untouched ones never move. With layout_components given,
+    # several components waiting for a layout are handed over as one batch
+    # that can be spread over processes. It never touches matplotlib, so
+    # it can run on the render worker; the main thread only sees the frames
+    # it publishes.
+
+    def __init__(self, layout_component, layout_components=None):
+        self.layout_component = layout_component
+        self.layout_components = layout_components
+        self.G = nx.Graph()
+        self.pos = {}
+
+        self.components = ComponentTracker()
+        self.slot_of = {}
+        self.free_slots = []
+        self.slot_count = 0
+        # Components still waiting for a layout when the last sync was cancelled
+        self.pending = set()
+
+        self.node_order = []
+        self.node_index = {}
+        self.offsets = np.empty((0, 2))
+        self.edge_order = []
+        self.edge_index = {}
+        self.segments = np.empty((0, 2, 2))
+        self.label_lines = []
+
+        self.node_size = 3000
+        self.font_size = 10
+        self.figsize = (8, 6)
+        self.last_frame = None
+
+    def sync(self, snapshot, cancelled=None):
+        # Returns True if anything changed, None if cancelled before the end
+        G = self.G
+        # Dicts rather than sets so nodes and edges are added in the same
+        # order as a from-scratch build, which keeps the layout identical
+        seen = {}
+        wanted = {}
+        for key, next_items in snapshot.items():
+            seen[key] = None
+            for next_item in next_items:
+                if next_item in snapshot:  # Only add edges for existing nodes
+                    seen[next_item] = None
+                    wanted[edge_key(key, next_item)] = None
+
+        removed_nodes = [node for node in G if node not in snapshot]
+        added_nodes = [node for node in seen if node not in G]
+        removed_edges = [edge for edge in self.edge_index if edge not in wanted]
+        added_edges = [edge for edge in wanted if edge not in self.edge_index]
+        if not (removed_nodes or added_nodes or removed_edges or added_edges or self.pending):
+            return False
+        self.last_frame = None
+
+        # Components that lost anything are taken apart and built again from
+        # what is left of them, additions are merged in by the tracker
+        components = self.components
+        broken = set(removed_nodes)
+        for edge in removed_edges:
+            broken.update(edge)
+        survivors = []
+        for cid in {components.component_id(node) for node in broken}:
+            survivors.extend(components.remove_component(cid))
+
+        G.remove_edges_from(removed_edges)
+        G.remove_nodes_from(removed_nodes)
+        G.add_nodes_from(added_nodes)
+        G.add_edges_from(added_edges)
+
+        survivors = [node for node in survivors if node in G]
+        for node in survivors + added_nodes:
+            components.add(node)
+        added = set(added_edges)
+        for u, v in G.edges(survivors):
+            if edge_key(u, v) not in added:
+                components.connect(u, v)
+        for u, v in added_edges:
+            components.connect(u, v)
+        changed, retired = components.take_changes()
+        for cid in retired:
+            self.pending.discard(cid)
+            if cid in self.slot_of:
+                heapq.heappush(self.free_slots, self.slot_of.pop(cid))
+        self.pending.update(changed)
+
+        for edge in removed_edges:
+            self.drop_edge(edge)
+        for node in removed_nodes:
+            self.drop_node(node)
+            self.pos.pop(node, None)
+        self.append_nodes(added_nodes)
+        self.append_edges(added_edges)
+        self.restyle()
+
+        moved = []
+        if self.layout_components is not None and len(self.pending) > 1:
+            if cancelled is not None and cancelled():
+                return None
+            cids = self.pending_order()
+            components = self.components
+            layouts = self.layout_components(self.G, [(components.component(cid), components.root(cid))
+                                                      for cid in cids])
+            for cid, layout in zip(cids, layouts):
+                moved.extend(self.place_component(cid, layout))
+            self.pending.clear()
+        for cid in self.pending_order():
+            if cancelled is not None and cancelled():
+                # The graph is consistent, the rest is laid out by the next sync
+                self.move_nodes(moved)
+                return None
+            moved.extend(self.place_component(cid))
+            self.pending.discard(cid)
+
+        self.move_nodes(moved)
+        return True
+
+    def pending_order(self):
+        # Components by their earliest node, the order tree_layout() stacks
+        # them in, so a sync from scratch puts every node where it does
+        node_index = self.node_index
+        return sorted(self.pending, key=lambda cid: min(node_index[node] for node in self.components.component(cid)))
+
+    def place_component(self, cid, layout=None):
+        # A component that changed keeps its slot, a new one takes the lowest free slot
+        slot = self.slot_of.get(cid)
+        if slot is None:
+            if self.free_slots:
+                slot = heapq.heappop(self.free_slots)
+            else:
+                slot = self.slot_count
+                self.slot_count += 1
+            self.slot_of[cid] = slot
+
+        component = self.components.component(cid)
+        y_offset = -COMPONENT_SPACING * slot
+        if layout is None:
+            layout = self.layout_component(self.G, component, self.components.root(cid))
+        for node, (x, y) in layout.items():
+            self.pos[node] = (x, y + y_offset)
+        return component
+
+    def append_nodes(self, nodes):
+        if not nodes:
+            return
+        for node in nodes:
+            self.node_index[node] = len(self.node_order)
+            self.node_order.append(node)
+            self.label_lines.append(textwrap.wrap(node, width=10))
+        self.offsets = np.concatenate([self.offsets, np.zeros((len(nodes), 2))])
+
+    def drop_node(self, node):
+        index = self.node_index.pop(node)
+        last = self.node_order.pop()
+        if last != node:
+            self.node_order[index] = last
+            self.node_index[last] = index
+            self.offsets[index] = self.offsets[-1]
+            self.label_lines[index] = self.label_lines[-1]
+        self.offsets = self.offsets[:-1]
+        self.label_lines.pop()
+
+    def append_edges(self, edges):
+        if not edges:
+            return
+        start = len(self.edge_order)
+        for i, edge in enumerate(edges):
+            self.edge_index[edge] = start + i
+            self.edge_order.append(edge)
+        self.segments = np.concatenate([self.segments, np.zeros((len(edges), 2, 2))])
+        for edge in edges:
+            self.segments[self.edge_index[edge]] = (self.pos.get(edge[0], (0, 0)),
+                                                    self.pos.get(edge[1], (0, 0)))
+
+    def drop_edge(self, edge):
+        index = self.edge_index.pop(edge)
+        last = self.edge_order.pop()
+        if last != edge:
+            self.edge_order[index] = last
+            self.edge_index[last] = index
+            self.segments[index] = self.segments[-1]
+        self.segments = self.segments[:-1]
+
+    def move_nodes(self, nodes):
+        edges = set()
+        for node in nodes:
+            self.offsets[self.node_index[node]] = self.pos[node]
+            for neighbor in self.G[node]:
+                edges.add(edge_key(node, neighbor))
+        for u, v in edges:
+            self.segments[self.edge_index[(u, v)]] = (self.pos[u], self.pos[v])
+
+    def restyle(self):
+        # Dynamically adjust figure size based on number of nodes
+        node_count = len(self.node_order)
+        self.figsize = (max(8, min(20, node_count)), max(6, min(15, node_count * 0.75)))
+
+        # Adjust node size and font size based on number of nodes
+        self.node_size = max(1000, min(3000, 20000 / node_count)) if node_count > 0 else 3000
+        self.font_size = max(6, min(10, 100 / node_count)) if node_count > 0 else 10
+
+    def frame(self):
+        # Copies, so the worker can keep mutating while the main thread draws
+        if self.last_frame is None:
+            self.last_frame = RenderFrame(
+                G=nx.freeze(self.G.copy()),
+                pos=dict(self.pos),
+                node_order=tuple(self.node_order),
+                node_index=dict(self.node_index),
+                offsets=self.offsets.copy(),
+                segments=self.segments.copy(),
+                label_lines=tuple(self.label_lines),
+                node_size=self.node_size,
+                font_size=self.font_size,
+                figsize=self.figsize,
+                spatial_index=SpatialIndex(self.node_order, self.offsets),
+            )
+        return self.last_frame
+
+
+# Everything the main thread needs to draw one version of the map
+RenderFrame = namedtuple('RenderFrame', ['G', 'pos', 'node_order', 'node_index', 'offsets', 'segments',
+                                         'label_lines', 'node_size', 'font_size', 'figsize', 'spatial_index'])
+
+
+class MindMapRenderer:
+    # Owns the matplotlib artists of the mind map. render() runs on the render
+    # worker and only updates the model; apply() swaps the resulting frame
+    # into the artists on the main thread.
+
+    def __init__(self, ax, layout_component, layout_components=None):
+        self.ax = ax
+        self.model = MindMapModel(layout_component, layout_components)
+        self.frame = self.model.frame()
+
+        self.node_artist = ax.scatter([], [], s=self.frame.node_size, c='lightblue', alpha=0.8, zorder=2)
+        self.edge_artist = LineCollection([], colors='gray', linewidths=1, alpha=0.7, zorder=1)
+        ax.add_collection(self.edge_artist)
+        self.label_layer = LabelLayer(self)
+        ax.add_artist(self.label_layer)
+        self.empty_text = ax.text(0.5, 0.5, "No data to display",
+                                  horizontalalignment='center', verticalalignment='center',
+                                  fontsize=12, fontweight='bold', transform=ax.transAxes)
+        ax.axis('off')
+
+    def sync(self, data):
+        # Synchronous render on the calling thread
+        changed = self.model.sync(graph_snapshot(data))
+        self.apply(self.model.frame())
+        return changed
+
+    def render(self, snapshot, cancelled=None):
+        if self.model.sync(snapshot, cancelled) is None:
+            return None
+        return self.model.frame()
+
+    def apply(self, frame):
+        if frame is self.frame:
+            return False
+        self.frame = frame
+        self.ax.figure.set_size_inches(frame.figsize)
+        self.node_artist.set_sizes([frame.node_size])
+        self.node_artist.set_offsets(frame.offsets)
+        self.edge_artist.set_segments(frame.segments)
+
+        if frame.node_order:
+            self.empty_text.set_visible(False)
+            # Adjust plot limits to ensure all nodes are visible, a single
+            # node or a single level still gets a margin
+            x_min, y_min = frame.offsets.min(axis=0)
+            x_max, y_max = frame.offsets.max(axis=0)
+            x_margin = (x_max - x_min) * 0.1 or 0.5
+            y_margin = (y_max - y_min) * 0.1 or 0.5
+            self.ax.set_xlim(x_min - x_margin, x_max + x_margin)
+            self.ax.set_ylim(y_min - y_margin, y_max + y_margin)
+        else:
+            self.empty_text.set_visible(True)
+            self.ax.set_xlim(0, 1)
+            self.ax.set_ylim(0, 1)
+        return True
+
+    def line_height(self):
+        return 0.03 * (self.frame.font_size / 8)  # Adjust line height based on font size
+
+
+class LabelLayer(Artist):
+    # Draws every node label as one artist. A single Text is re-used as a
+    # stamp for each visible line, so there is no Text object per node, and
+    # labels outside the view or too small to read are never drawn at all.
+
+    def __init__(self, owner):
+        super().__init__()
+        self.owner = owner
+        self.stamp = Text(0, 0, '', horizontalalignment='center', verticalalignment='center',
+                          fontweight='bold')
+        self.set_zorder(3)
+
+    def draw(self, renderer):
+        owner = self.owner
+        frame = owner.frame
+        if not self.get_visible() or not frame.label_lines:
+            return
+        ax = self.axes
+        x0, x1 = sorted(ax.get_xlim())
+        y0, y1 = sorted(ax.get_ylim())
+        line_height = owner.line_height()
+        pixels_per_unit = ax.bbox.height / max(y1 - y0, 1e-12)
+        if line_height * pixels_per_unit < MIN_LINE_PIXELS:
+            return
+
+        # Keep labels whose centre is in view or close enough to overlap it
+        margin_x = (x1 - x0) * 0.05
+        margin_y = line_height * 4
+        offsets = frame.offsets
+        visible = np.flatnonzero((offsets[:, 0] >= x0 - margin_x) & (offsets[:, 0] <= x1 + margin_x) &
+                                 (offsets[:, 1] >= y0 - margin_y) & (offsets[:, 1] <= y1 + margin_y))
+        if len(visible) > MAX_VISIBLE_LABELS:
+            return
+        self.draw_labels(renderer, visible)
+        self.stale = False
+
+    def draw_labels(self, renderer, indices):
+        owner = self.owner
+        frame = owner.frame
+        line_height = owner.line_height()
+        stamp = self.stamp
+        stamp.set_figure(self.figure)
+        stamp.set_transform(self.axes.transData)
+        stamp.set_clip_path(self.axes.patch)
+        stamp.set_fontsize(frame.font_size)
+        for i in indices:
+            x, y = frame.offsets[i]
+            lines = frame.label_lines[i]
+            start_y = y + (len(lines) - 1) * line_height / 2
+            for j, line in enumerate(lines):
+                stamp.set_position((x, start_y - j * line_height))
+                stamp.set_text(line)
+                stamp.draw(renderer)
+
+
+class HighlightOverlay:
+    # Click highlight drawn with blitting. The map without the highlight is
+    # cached with copy_from_bbox after every full draw; a click restores that
+    # background and draws only the clicked node, its neighbours, their edges
+    # and their labels from two small animated collections whose buffers are
+    # reused between clicks. A rectangle selection is drawn the same way.
+
+    def __init__(self, owner, canvas):
+        self.owner = owner
+        self.canvas = canvas
+        self.node = None
+        self.selection = []
+        self.background = None
+        self.indices = []
+
+        ax = owner.ax
+        self.node_buffer = np.empty((0, 2))
+        self.color_buffer = np.empty((0, 4))
+        self.segment_buffer = np.empty((0, 2, 2))
+        self.nodes = ax.scatter([], [], s=owner.frame.node_size, alpha=0.8, zorder=2, animated=True)
+        self.edges = LineCollection([], colors='red', linewidths=2, alpha=1, zorder=1, animated=True)
+        ax.add_collection(self.edges)
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def show(self, node):
+        self.node = node
+        self.selection = []
+        self.refresh()
+        self.blit()
+
+    def show_selection(self, nodes):
+        self.node = None
+        self.selection = list(nodes)
+        self.refresh()
+        self.blit()
+
+    def refresh(self):
+        # Re-reads positions after a render, drops nodes that are gone
+        frame = self.owner.frame
+        if self.node is not None and self.node not in frame.node_index:
+            self.node = None
+        self.selection = [n for n in self.selection if n in frame.node_index]
+
+        if self.node is not None:
+            nodes = [self.node] + [n for n in frame.G[self.node] if n != self.node]
+        else:
+            nodes = self.selection
+        count = len(nodes)
+        if len(self.node_buffer) < count:
+            size = max(count, 2 * len(self.node_buffer))
+            self.node_buffer = np.empty((size, 2))
+            self.color_buffer = np.empty((size, 4))
+            self.segment_buffer = np.empty((size, 2, 2))
+
+        self.indices = [frame.node_index[n] for n in nodes]
+        for i, index in enumerate(self.indices):
+            self.node_buffer[i] = frame.offsets[index]
+        if self.node is not None:
+            self.color_buffer[:count] = HIGHLIGHT_NEIGHBOR
+            self.color_buffer[0] = HIGHLIGHT_NODE
+            self.segment_buffer[:count, 0] = self.node_buffer[0]
+            self.segment_buffer[:count, 1] = self.node_buffer[:count]
+            edge_count = count
+        else:
+            self.color_buffer[:count] = HIGHLIGHT_NODE
+            edge_count = 0
+
+        self.nodes.set_sizes([frame.node_size])
+        self.nodes.set_offsets(self.node_buffer[:count])
+        self.nodes.set_facecolors(self.color_buffer[:count])
+        self.edges.set_segments(self.segment_buffer[1:edge_count])
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.owner.ax.bbox)
+        self.draw_overlay()
+
+    def blit(self):
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_overlay()
+        self.canvas.blit(self.owner.ax.bbox)
+
+    def draw_overlay(self):
+        if not self.indices:
+            return
+        ax = self.owner.ax
+        ax.draw_artist(self.edges)
+        ax.draw_artist(self.nodes)
+        # The overlay covers the highlighted nodes' labels, draw them again on top
+        self.owner.label_layer.draw_labels(self.canvas.get_renderer(), self.indices)
+
+
+def graph_snapshot(data):
+    # Immutable copy of what the map is drawn from, taken on the main thread
+    return {key: tuple(value['next']) for key, value in data.items()}
+
+
+def edge_key(u, v):
+    return (u, v) if u <= v else (v, u)
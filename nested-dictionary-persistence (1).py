@@ -1,31 +1,42 @@
 import json
-import os
+from concept_store import open_store, to_json
+from component_tracker import ComponentTracker
 
-FILENAME = "nested_dictionary.json"
+# Same store as the Tk apps (journal or SQLite), every edit is saved as it is made
+store = open_store()
+
+# Connected components of the concepts, kept up to date as items are added
+components = ComponentTracker()
 
 def load_data():
-    if os.path.exists(FILENAME):
-        with open(FILENAME, 'r') as file:
-            return json.load(file)
-    return {}
+    data = store.load()
+    for key, value in data.items():
+        components.add(key)
+        for item in value['next']:
+            components.connect(key, item)
+    components.take_changes()
+    return data
 
-def save_data(data):
-    with open(FILENAME, 'w') as file:
-        json.dump(data, file, indent=2)
+def save_data():
+    store.close()
 
-def add_item(data, key):
-    if key not in data:
-        data[key] = {'next': [], 'text': []}
+def add_item(key):
+    store.add_concept(key)
+    components.add(key)
     
     choice = input(f"Add to 'next' or 'text' for key '{key}'? (n/t): ").lower()
     if choice == 'n':
         item = input("Enter item for 'next' list: ")
-        data[key]['next'].append(item)
-        if item not in data:
-            data[item] = {'next': [], 'text': []}
+        store.add_edge(key, item)
+        joined = item in components and components.component_id(item) != components.component_id(key)
+        cid = components.connect(key, item)
+        components.take_changes()
+        if joined:
+            print(f"Joined two components into component {cid}")
+        print(f"'{key}' is in component {cid} with {len(components.component(cid))} concept(s)")
     elif choice == 't':
         item = input("Enter item for 'text' list: ")
-        data[key]['text'].append(item)
+        store.add_text(key, item)
     else:
         print("Invalid choice. No item added.")
 
@@ -33,15 +44,15 @@ def show_key_info(data):
     key = input("Enter the key to display: ")
     if key in data:
         print(f"\nInformation for key '{key}':")
-        print(json.dumps(data[key], indent=2))
+        print(json.dumps(data[key], indent=2, default=to_json))
     else:
         print(f"Key '{key}' not found in the data structure.")
 
 def display_summary(data):
-    print("\nCurrent keys in the data structure:")
-    for key in data:
-        next_count = len(data[key]['next'])
-        text_count = len(data[key]['text'])
+    print(f"\nCurrent keys in the data structure ({len(components)} connected component(s)):")
+    for key, value in data.items():
+        next_count = len(value['next'])
+        text_count = len(value['text'])
         print(f"- {key}: {next_count} next item(s), {text_count} text item(s)")
 
 def main():
@@ -55,13 +66,13 @@ def main():
             break
         elif action == 'a':
             key = input("Enter the key: ")
-            add_item(data, key)
+            add_item(key)
         elif action == 's':
             show_key_info(data)
         else:
             print("Invalid action. Please try again.")
     
-    save_data(data)
+    save_data()
     print("Data saved. Goodbye!")
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+# Users whose mind maps are kept, and rendered versions kept per user
+MAX_CACHED_USERS = 64
+IMAGES_PER_USER = 4
+
+
+class LRUCache:
+    # Thread-safe mapping that evicts the least recently used entry
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                return default
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class RenderCache:
+    # Rendered mind maps per user, keyed on the content hash of the graph
+    # they were drawn from. Users and their versions are both LRU-evicted.
+
+    def __init__(self, max_users=MAX_CACHED_USERS, per_user=IMAGES_PER_USER):
+        self.per_user = per_user
+        self.users = LRUCache(max_users)
+        self.lock = threading.Lock()
+
+    def get(self, user, digest):
+        versions = self.users.get(user)
+        return versions.get(digest) if versions is not None else None
+
+    def put(self, user, digest, value):
+        with self.lock:
+            versions = self.users.get(user)
+            if versions is None:
+                versions = LRUCache(self.per_user)
+                self.users.put(user, versions)
+        versions.put(digest, value)
+
+
+def graph_digest(data):
+    # Hash of what the map is drawn from: concepts in order and their edges to
+    # existing concepts. Text items do not change the picture.
+    h = hashlib.sha256()
+    for key, value in data.items():
+        edges = [item for item in value['next'] if item in data]
+        h.update(json.dumps([key, edges]).encode('utf-8'))
+        h.update(b'\n')
+    return h.hexdigest()
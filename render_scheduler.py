@@ -0,0 +1,66 @@
+import threading
+import traceback
+
+
+class RenderScheduler:
+    # Runs renders on one worker thread. request() hands over an immutable
+    # snapshot of the data; if the worker is still busy only the newest
+    # snapshot is kept, so a burst of edits becomes a single render. Every
+    # request bumps a generation counter: a render whose generation is no
+    # longer the latest is cancelled (render() can poll cancelled() to stop
+    # early) and its result is never applied. The worker never touches Tk or
+    # the figure, apply() is called on the main thread through master.after.
+
+    def __init__(self, master, render, apply, on_error=None):
+        self.master = master
+        self.render = render
+        self.apply = apply
+        self.on_error = on_error
+        self.condition = threading.Condition()
+        self.pending = None
+        self.generation = 0
+        self.closed = False
+        self.worker = threading.Thread(target=self.run, daemon=True)
+        self.worker.start()
+
+    def request(self, snapshot):
+        with self.condition:
+            self.generation += 1
+            self.pending = (self.generation, snapshot)
+            self.condition.notify()
+        return self.generation
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.pending = None
+            self.condition.notify()
+
+    def is_stale(self, generation):
+        return self.closed or generation != self.generation
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                generation, snapshot = self.pending
+                self.pending = None
+
+            try:
+                result = self.render(snapshot, lambda: self.is_stale(generation))
+            except Exception as e:
+                traceback.print_exc()
+                if self.on_error is not None and not self.is_stale(generation):
+                    self.master.after(0, self.on_error, e)
+                continue
+            if result is None or self.is_stale(generation):
+                continue
+            self.master.after(0, self.deliver, generation, result)
+
+    def deliver(self, generation, result):
+        # A newer request may have arrived while this was queued on the Tk loop
+        if not self.is_stale(generation):
+            self.apply(result)
@@ -0,0 +1,112 @@
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from review_scheduler import GRADES, PREFETCH, Prefetcher, ReviewScheduler
+
+# How often the panel looks for concepts that have fallen due while it waits
+POLL_MS = 30000
+
+
+class ReviewPanel(ttk.Frame):
+    # Contents of the Review tab: the due concept, "Show answer" to flip it
+    # to its related concepts and information, and one button per grade.
+    # The scheduler is built the first time the tab is opened; the details
+    # of the next PREFETCH concepts are read in the background meanwhile.
+
+    def __init__(self, master, store, **kwargs):
+        super().__init__(master, **kwargs)
+        self.store = store
+        self.scheduler = None
+        self.prefetcher = None
+        self.current = None
+        self.poll_job = None
+
+        self.status = ttk.Label(self, anchor='w')
+        self.status.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+        self.front = ttk.Label(self, font=('Helvetica', 16, 'bold'), anchor='center')
+        self.front.pack(side=tk.TOP, fill=tk.X, pady=20)
+        self.answer = tk.Text(self, height=15, width=60, wrap=tk.WORD, state=tk.DISABLED)
+        self.answer.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10)
+
+        self.buttons = ttk.Frame(self)
+        self.buttons.pack(side=tk.TOP, pady=10)
+        self.show_button = ttk.Button(self.buttons, text="Show answer", command=self.show_answer)
+        self.grade_buttons = [ttk.Button(self.buttons, text=label, command=lambda g=grade: self.grade(g))
+                              for label, grade in GRADES]
+
+    def start(self):
+        if self.scheduler is None:
+            self.scheduler = ReviewScheduler(self.store.data)
+            self.prefetcher = Prefetcher(self.store.data)
+        if self.current is None:
+            self.show_next()
+
+    def add_concept(self, key):
+        if self.scheduler is not None:
+            self.scheduler.add_concept(key)
+            if self.current is None:
+                self.show_next()
+
+    def concept_changed(self, key):
+        if self.prefetcher is not None:
+            self.prefetcher.forget(key)
+
+    def show_next(self):
+        if self.poll_job is not None:
+            self.after_cancel(self.poll_job)
+            self.poll_job = None
+        now = time.time()
+        upcoming = self.scheduler.upcoming(PREFETCH + 1, now)
+        self.current = upcoming[0] if upcoming else None
+        self.prefetcher.prefetch(upcoming)
+        self.set_answer("")
+        self.show_button.pack_forget()
+        for button in self.grade_buttons:
+            button.pack_forget()
+        self.update_status(now)
+        if self.current is None:
+            self.front.config(text="Nothing to review right now")
+            self.poll_job = self.after(POLL_MS, self.show_next)
+            return
+        self.front.config(text=self.current)
+        self.show_button.pack(side=tk.LEFT, padx=5)
+
+    def update_status(self, now):
+        status = f"Due: {self.scheduler.due_count(now)}   New: {self.scheduler.new_count()}"
+        next_due = self.scheduler.next_due()
+        if next_due is not None and next_due > now:
+            status += f"   Next review: {time.strftime('%Y-%m-%d %H:%M', time.localtime(next_due))}"
+        self.status.config(text=status)
+
+    def show_answer(self):
+        details = self.prefetcher.details(self.current)
+        if details is None:
+            # The concept went away, e.g. a snapshot was written without it
+            self.scheduler.discard(self.current)
+            self.show_next()
+            return
+        next_items, text_items = details
+        lines = []
+        if next_items:
+            lines.append("Related concepts: " + ", ".join(next_items))
+        lines.extend(f"- {text}" for text in text_items)
+        self.set_answer("\n".join(lines) or "(no information yet)")
+        self.show_button.pack_forget()
+        for button in self.grade_buttons:
+            button.pack(side=tk.LEFT, padx=5)
+
+    def set_answer(self, text):
+        self.answer.config(state=tk.NORMAL)
+        self.answer.delete("1.0", tk.END)
+        self.answer.insert(tk.END, text)
+        self.answer.config(state=tk.DISABLED)
+
+    def grade(self, grade):
+        state = self.store.data[self.current].get('review')
+        self.store.set_review(self.current, self.scheduler.grade(self.current, state, grade))
+        self.show_next()
+
+    def close(self):
+        if self.prefetcher is not None:
+            self.prefetcher.close()
@@ -0,0 +1,219 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# SM-2 spaced repetition over the concepts. A concept's 'review' state is
+# {'ease', 'interval', 'reps', 'due', 'last'}: interval in days, due and
+# last as Unix times. Concepts without one are new and are introduced at
+# most NEW_PER_SESSION at a time, in data order.
+
+DAY = 86400
+
+# Answer buttons and the SM-2 quality (0-5) each one stands for
+GRADES = (("Again", 1), ("Hard", 3), ("Good", 4), ("Easy", 5))
+
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+
+# A failed concept comes back after this many seconds
+RELEARN_SECONDS = 600
+
+NEW_PER_SESSION = 20
+
+# Concepts whose details are loaded ahead of the one being shown
+PREFETCH = 5
+
+
+def sm2(state, grade, now=None):
+    # New review state after answering with quality grade (0-5)
+    now = time.time() if now is None else now
+    ease = state['ease'] if state else INITIAL_EASE
+    reps = state['reps'] if state else 0
+    interval = state['interval'] if state else 0
+    if grade < 3:
+        reps = 0
+        interval = 0
+        due = now + RELEARN_SECONDS
+    else:
+        reps += 1
+        if reps == 1:
+            interval = 1
+        elif reps == 2:
+            interval = 6
+        else:
+            interval = round(interval * ease)
+        due = now + interval * DAY
+    ease = max(MIN_EASE, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    return {'ease': round(ease, 4), 'interval': interval, 'reps': reps, 'due': due, 'last': now}
+
+
+class ReviewScheduler:
+    # Due queue over the concepts of one data set. Reviewed concepts sit in a
+    # heap of (due, key); a regraded concept is pushed again and its old
+    # entry is dropped when it surfaces, so next_card() and grade() are
+    # O(log n) however many concepts there are. Building it is one pass over
+    # the data. grade() returns the new state for the caller to store.
+    # due_count() is a running count: concepts are moved over from a second
+    # heap of those not due yet as time passes, so it is amortised O(log n)
+    # too, as long as now does not go backwards.
+
+    def __init__(self, data, new_per_session=NEW_PER_SESSION):
+        self.due = {}
+        self.new = OrderedDict()
+        self.new_left = new_per_session
+        for key, value in data.items():
+            review = value.get('review')
+            if review is None:
+                self.new[key] = None
+            else:
+                self.due[key] = review['due']
+        self.heap = [(due, key) for key, due in self.due.items()]
+        heapq.heapify(self.heap)
+        # Concepts due at counted_until, the rest wait in not_due
+        self.counted_until = float('-inf')
+        self.due_now = 0
+        self.not_due = self.heap[:]
+
+    def __len__(self):
+        return len(self.due) + len(self.new)
+
+    def add_concept(self, key):
+        if key not in self.due and key not in self.new:
+            self.new[key] = None
+
+    def discard(self, key):
+        if key in self.due:
+            self.uncount(key)
+        self.due.pop(key, None)
+        self.new.pop(key, None)
+
+    def drop_stale(self):
+        while self.heap and self.due.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+    def next_card(self, now=None):
+        # Most overdue concept, else the next new one, None when nothing is due
+        now = time.time() if now is None else now
+        self.drop_stale()
+        if self.heap and self.heap[0][0] <= now:
+            return self.heap[0][1]
+        if self.new and self.new_left > 0:
+            return next(iter(self.new))
+        return None
+
+    def upcoming(self, count, now=None):
+        # The next count concepts in the order next_card() will show them,
+        # O(count log n)
+        now = time.time() if now is None else now
+        keys = []
+        popped = []
+        while len(keys) < count:
+            self.drop_stale()
+            if not self.heap or self.heap[0][0] > now:
+                break
+            entry = heapq.heappop(self.heap)
+            popped.append(entry)
+            keys.append(entry[1])
+        for entry in popped:
+            heapq.heappush(self.heap, entry)
+        new_count = min(count - len(keys), len(self.new), max(self.new_left, 0))
+        for key in self.new:
+            if new_count <= 0:
+                break
+            keys.append(key)
+            new_count -= 1
+        return keys
+
+    def due_count(self, now=None):
+        # Reviewed concepts that are due
+        now = time.time() if now is None else now
+        if now < self.counted_until:
+            return sum(1 for due in self.due.values() if due <= now)
+        self.counted_until = now
+        not_due = self.not_due
+        while not_due and not_due[0][0] <= now:
+            due, key = heapq.heappop(not_due)
+            if self.due.get(key) == due:
+                self.due_now += 1
+        return self.due_now
+
+    def uncount(self, key):
+        # key's due time is about to change or go away
+        if self.due[key] <= self.counted_until:
+            self.due_now -= 1
+
+    def new_count(self):
+        return min(len(self.new), max(self.new_left, 0))
+
+    def next_due(self):
+        # When the earliest reviewed concept falls due, None if there is none
+        self.drop_stale()
+        return self.heap[0][0] if self.heap else None
+
+    def grade(self, key, state, grade, now=None):
+        # Applies an answer to key's current state and returns the new state
+        new_state = sm2(state, grade, now)
+        if key in self.new:
+            del self.new[key]
+            self.new_left -= 1
+        elif key in self.due:
+            self.uncount(key)
+        due = self.due[key] = new_state['due']
+        heapq.heappush(self.heap, (due, key))
+        if due <= self.counted_until:
+            self.due_now += 1
+        else:
+            heapq.heappush(self.not_due, (due, key))
+        return new_state
+
+
+class Prefetcher:
+    # Loads the details shown for a concept (its next and text lists) on a
+    # background thread before it comes up, so showing the answer does not
+    # wait on lazy text in the memory map or on SQLite reads.
+
+    def __init__(self, data):
+        self.data = data
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="review-prefetch")
+        self.lock = threading.Lock()
+        self.ready = {}
+        self.pending = set()
+
+    def prefetch(self, keys):
+        with self.lock:
+            keys = [key for key in keys if key not in self.ready and key not in self.pending]
+            self.pending.update(keys)
+        for key in keys:
+            self.executor.submit(self.load, key)
+
+    def load(self, key):
+        try:
+            details = self.read(key)
+        except Exception:
+            details = None
+        with self.lock:
+            self.pending.discard(key)
+            if details is not None:
+                self.ready[key] = details
+
+    def read(self, key):
+        value = self.data.get(key)
+        if value is None:
+            return None
+        return list(value['next']), list(value['text'])
+
+    def details(self, key):
+        # Prefetched (next, text) for key, read now if it was not ready yet
+        with self.lock:
+            details = self.ready.pop(key, None)
+        return details if details is not None else self.read(key)
+
+    def forget(self, key):
+        # key changed, drop what was read before the change
+        with self.lock:
+            self.ready.pop(key, None)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,108 @@
+import re
+
+WORD = re.compile(r"\w+")
+
+# Result order matches the old linear scan: by concept, then Key/Next/Text
+KIND_ORDER = {"Key": 0, "Next": 1, "Text": 2}
+
+
+class SearchIndex:
+    # Inverted index over concept names, related concepts and text items.
+    # Tokens map to the entries containing them, trigrams map to tokens, so a
+    # substring query only verifies the few entries sharing all its trigrams.
+    # With data given, text entries only remember their position and read the
+    # body back from data when a query needs it, so the index never holds a
+    # copy of every text (which may live lazily in a memory map).
+
+    def __init__(self, data=None):
+        self.data = data
+        self.entries = []
+        self.key_rank = {}
+        self.text_count = {}
+        self.postings = {}
+        self.trigrams = {}
+        if data:
+            for key, value in data.items():
+                self.add_value(key, value)
+
+    def add_value(self, key, value):
+        self.add_concept(key)
+        for next_item in value['next']:
+            self.add_next(key, next_item)
+        for text_item in value['text']:
+            self.add_text(key, text_item)
+
+    def add_concept(self, key):
+        if key in self.key_rank:
+            return
+        self.key_rank[key] = len(self.key_rank)
+        self.add_entry(key, "Key", key)
+
+    def add_next(self, key, next_item):
+        self.add_concept(key)
+        self.add_entry(key, "Next", next_item)
+
+    def add_text(self, key, text_item):
+        self.add_concept(key)
+        position = self.text_count.get(key, 0)
+        self.text_count[key] = position + 1
+        if self.data is None:
+            self.add_entry(key, "Text", text_item)
+        else:
+            self.add_entry(key, "Text", position, text_item)
+
+    def add_entry(self, key, kind, content, text=None):
+        # content is the string itself, or a text position with text given
+        entry_id = len(self.entries)
+        lowered = (content if text is None else text).lower()
+        order = (self.key_rank[key], KIND_ORDER[kind], entry_id)
+        self.entries.append((order, key, kind, content))
+        for token in set(WORD.findall(lowered)):
+            if token not in self.postings:
+                self.postings[token] = []
+                for gram in trigrams(token):
+                    self.trigrams.setdefault(gram, set()).add(token)
+            self.postings[token].append(entry_id)
+
+    def search(self, query):
+        query = query.lower()
+        tokens = set(WORD.findall(query))
+        if not tokens:
+            # Punctuation-only queries have nothing to look up
+            candidates = range(len(self.entries))
+        else:
+            candidates = None
+            for token in tokens:
+                ids = set()
+                for match in self.tokens_containing(token):
+                    ids.update(self.postings[match])
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    return []
+
+        matches = []
+        for i in candidates:
+            order, key, kind, content = self.entries[i]
+            content = self.content(key, content)
+            if query in content.lower():
+                matches.append((order, key, kind, content))
+        matches.sort()
+        return [(key, kind, content) for _, key, kind, content in matches]
+
+    def content(self, key, content):
+        if isinstance(content, int):
+            return self.data[key]['text'][content]
+        return content
+
+    def tokens_containing(self, fragment):
+        if len(fragment) < 3:
+            # Too short for trigrams, scan the vocabulary instead of the corpus
+            return [token for token in self.postings if fragment in token]
+        grams = sorted((self.trigrams.get(gram, set()) for gram in trigrams(fragment)), key=len)
+        if not grams[0]:
+            return []
+        return [token for token in grams[0].intersection(*grams[1:]) if fragment in token]
+
+
+def trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
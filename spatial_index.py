@@ -0,0 +1,205 @@
+import numpy as np
+
+# Average number of points per grid cell
+POINTS_PER_CELL = 2
+
+# Past this many cells a nearest query far from every point falls back to
+# one vectorised scan, which is cheaper than widening the rings any further
+MAX_RING_CELLS = 512
+
+# Average number of segments per grid cell of a SegmentIndex, and the most
+# cells one segment is listed under before it is checked on every query
+SEGMENTS_PER_CELL = 2
+MAX_SEGMENT_CELLS = 64
+
+
+class SpatialIndex:
+    # Uniform grid over a snapshot of node positions. Points are sorted by
+    # cell so every cell is a contiguous slice of the arrays, and nearest,
+    # radius and rectangle queries only look at the cells they overlap.
+
+    def __init__(self, keys, points):
+        self.keys = list(keys)
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if not len(points):
+            self.points = points
+            return
+
+        self.origin = points.min(axis=0)
+        extent = points.max(axis=0) - self.origin
+        # A flat axis (e.g. a single chain) would otherwise give near-zero cells
+        span = np.maximum(extent, max(extent.max(), 1e-9) / len(points))
+        area = span[0] * span[1]
+        self.cell = max(np.sqrt(area * POINTS_PER_CELL / len(points)), 1e-9)
+        self.shape = (np.floor(extent / self.cell).astype(int) + 1)
+
+        cells = self.cell_of(points)
+        cell_ids = cells[:, 0] * self.shape[1] + cells[:, 1]
+        order = np.argsort(cell_ids, kind='stable')
+        self.order = order
+        self.points = points[order]
+        self.cell_ids = cell_ids[order]
+
+    def __len__(self):
+        return len(self.points)
+
+    def cell_of(self, points):
+        cells = np.floor((np.asarray(points) - self.origin) / self.cell).astype(int)
+        return np.clip(cells, 0, self.shape - 1)
+
+    def cell_slice(self, cx, cy):
+        cell_id = cx * self.shape[1] + cy
+        start = np.searchsorted(self.cell_ids, cell_id, side='left')
+        end = np.searchsorted(self.cell_ids, cell_id, side='right')
+        return start, end
+
+    def nearest(self, x, y):
+        if not len(self.points):
+            return None
+        cx, cy = self.cell_of((x, y))
+        best = None
+        best_dist = np.inf
+        ring = 0
+        max_ring = max(self.shape)
+        visited = 0
+        # Widen the search one ring of cells at a time until no closer point
+        # can exist outside the rings already searched
+        while ring <= max_ring:
+            if visited > MAX_RING_CELLS:
+                dist = (self.points[:, 0] - x) ** 2 + (self.points[:, 1] - y) ** 2
+                best = int(np.argmin(dist))
+                break
+            for ix, iy in self.ring_cells(cx, cy, ring):
+                visited += 1
+                start, end = self.cell_slice(ix, iy)
+                if start == end:
+                    continue
+                block = self.points[start:end]
+                dist = (block[:, 0] - x) ** 2 + (block[:, 1] - y) ** 2
+                i = int(np.argmin(dist))
+                if dist[i] < best_dist:
+                    best_dist = dist[i]
+                    best = start + i
+            if best is not None and np.sqrt(best_dist) <= ring * self.cell:
+                break
+            ring += 1
+        return self.keys[self.order[best]]
+
+    def ring_cells(self, cx, cy, ring):
+        width, height = self.shape
+        if ring == 0:
+            yield cx, cy
+            return
+        for ix in range(max(cx - ring, 0), min(cx + ring, width - 1) + 1):
+            for iy in (cy - ring, cy + ring):
+                if 0 <= iy < height:
+                    yield ix, iy
+        for ix in (cx - ring, cx + ring):
+            if 0 <= ix < width:
+                for iy in range(max(cy - ring + 1, 0), min(cy + ring - 1, height - 1) + 1):
+                    yield ix, iy
+
+    def within_radius(self, x, y, radius):
+        if not len(self.points):
+            return []
+        x0, y0 = self.cell_of((x - radius, y - radius))
+        x1, y1 = self.cell_of((x + radius, y + radius))
+        hits = []
+        for ix in range(x0, x1 + 1):
+            start, _ = self.cell_slice(ix, y0)
+            _, end = self.cell_slice(ix, y1)
+            block = self.points[start:end]
+            dist = (block[:, 0] - x) ** 2 + (block[:, 1] - y) ** 2
+            hits.extend(start + np.flatnonzero(dist <= radius ** 2))
+        return [self.keys[self.order[i]] for i in hits]
+
+    def in_rect(self, x0, y0, x1, y1):
+        if not len(self.points):
+            return []
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        cx0, cy0 = self.cell_of((x0, y0))
+        cx1, cy1 = self.cell_of((x1, y1))
+        hits = []
+        for ix in range(cx0, cx1 + 1):
+            # Cells of one grid column are contiguous, so a column is one slice
+            start, _ = self.cell_slice(ix, cy0)
+            _, end = self.cell_slice(ix, cy1)
+            block = self.points[start:end]
+            inside = ((block[:, 0] >= x0) & (block[:, 0] <= x1) &
+                      (block[:, 1] >= y0) & (block[:, 1] <= y1))
+            hits.extend(start + np.flatnonzero(inside))
+        return [self.keys[self.order[i]] for i in hits]
+
+
+class SegmentIndex:
+    # Uniform grid over the bounding boxes of line segments, an (n, 2, 2)
+    # array. Every segment is listed under each cell its box overlaps, the
+    # few that would cover more than MAX_SEGMENT_CELLS cells are kept aside
+    # and always checked, so a rectangle query costs the cells it overlaps
+    # instead of a scan of every segment.
+
+    def __init__(self, segments):
+        segments = np.asarray(segments, dtype=float).reshape(-1, 2, 2)
+        self.low = segments.min(axis=1)
+        self.high = segments.max(axis=1)
+        count = len(segments)
+        self.long = np.empty(0, dtype=np.int64)
+        self.cell_ids = np.empty(0, dtype=np.int64)
+        self.segment_ids = np.empty(0, dtype=np.int64)
+        if not count:
+            return
+
+        self.origin = self.low.min(axis=0)
+        extent = self.high.max(axis=0) - self.origin
+        span = np.maximum(extent, max(extent.max(), 1e-9) / count)
+        self.cell = max(np.sqrt(span[0] * span[1] * SEGMENTS_PER_CELL / count), 1e-9)
+        self.shape = (np.floor(extent / self.cell).astype(int) + 1)
+
+        first = self.cell_of(self.low)
+        last = self.cell_of(self.high)
+        widths = last[:, 0] - first[:, 0] + 1
+        cells = widths * (last[:, 1] - first[:, 1] + 1)
+        short = cells <= MAX_SEGMENT_CELLS
+        self.long = np.flatnonzero(~short)
+
+        # One (cell, segment) entry per cell a short segment overlaps
+        ids = np.flatnonzero(short)
+        repeats = cells[ids]
+        entries = np.repeat(ids, repeats)
+        step = np.arange(len(entries)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        ix = first[entries, 0] + step % widths[entries]
+        iy = first[entries, 1] + step // widths[entries]
+        cell_ids = ix * self.shape[1] + iy
+        order = np.argsort(cell_ids, kind='stable')
+        self.cell_ids = cell_ids[order]
+        self.segment_ids = entries[order]
+
+    def __len__(self):
+        return len(self.low)
+
+    def cell_of(self, points):
+        cells = np.floor((np.asarray(points) - self.origin) / self.cell).astype(np.int64)
+        return np.clip(cells, 0, self.shape - 1)
+
+    def in_rect(self, x0, y0, x1, y1):
+        # Indices of the segments whose bounding box overlaps the rectangle,
+        # ascending
+        if not len(self.low):
+            return np.empty(0, dtype=np.int64)
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        cx0, cy0 = self.cell_of((x0, y0))
+        cx1, cy1 = self.cell_of((x1, y1))
+        height = self.shape[1]
+        candidates = [self.long]
+        for ix in range(cx0, cx1 + 1):
+            # Cells of one grid column are contiguous, so a column is one slice
+            start = np.searchsorted(self.cell_ids, ix * height + cy0, side='left')
+            end = np.searchsorted(self.cell_ids, ix * height + cy1, side='right')
+            candidates.append(self.segment_ids[start:end])
+        candidates = np.unique(np.concatenate(candidates))
+        low = self.low[candidates]
+        high = self.high[candidates]
+        inside = (high[:, 0] >= x0) & (low[:, 0] <= x1) & (high[:, 1] >= y0) & (low[:, 1] <= y1)
+        return candidates[inside]
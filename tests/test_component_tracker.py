@@ -0,0 +1,84 @@
+import random
+
+import networkx as nx
+import pytest
+
+from component_tracker import ComponentTracker
+from tree_layout import layout_root
+
+
+def check_against_networkx(components, G):
+    # Same partition as networkx, and the tracked root is layout_root()
+    expected = {frozenset(component) for component in nx.connected_components(G)}
+    ids = {components.component_id(key) for key in G}
+    assert len(components) == len(ids) == len(expected)
+    assert {frozenset(components.component(cid)) for cid in ids} == expected
+    for cid in ids:
+        members = components.component(cid)
+        assert len(members) == len(set(members))
+        assert components.root(cid) == layout_root(G, members)
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_components_match_networkx(seed):
+    rng = random.Random(seed)
+    keys = [f"n{i}" for i in range(rng.randint(1, 30))]
+    components = ComponentTracker()
+    G = nx.Graph()
+    for _ in range(rng.randint(1, 60)):
+        key = rng.choice(keys)
+        if rng.random() < 0.2:
+            components.add(key)
+            G.add_node(key)
+        else:
+            # Callers connect every undirected edge once, as networkx stores it
+            item = rng.choice(keys)
+            if not G.has_edge(key, item):
+                components.connect(key, item)
+                G.add_edge(key, item)
+        check_against_networkx(components, G)
+
+
+def test_merge_keeps_the_larger_id():
+    components = ComponentTracker()
+    big = components.connect("a", "b")
+    components.connect("b", "c")
+    components.add("d")
+    small = components.component_id("d")
+    components.take_changes()
+    assert components.connect("d", "a") == big
+    assert components.component(big) == ["a", "b", "c", "d"]
+    assert components.take_changes() == ({big}, {small})
+    assert components.take_changes() == (set(), set())
+
+
+def test_root_ignores_edge_order():
+    edges = [("a", "b"), ("c", "d"), ("b", "c"), ("e", "e"), ("e", "a")]
+    roots = set()
+    for _ in range(20):
+        random.shuffle(edges)
+        components = ComponentTracker()
+        for key, item in edges:
+            components.connect(key, item)
+        roots.add(components.root(components.component_id("a")))
+    assert roots == {"e"}
+
+
+def test_removed_component_can_be_rebuilt():
+    components = ComponentTracker()
+    cid = components.connect("a", "b")
+    components.connect("b", "c")
+    components.connect("x", "y")
+    components.take_changes()
+    assert sorted(components.remove_component(cid)) == ["a", "b", "c"]
+    assert "a" not in components
+    assert len(components) == 1
+    # The caller adds back what is left, here "b" lost its edge to "a"
+    components.connect("b", "c")
+    components.add("a")
+    changed, retired = components.take_changes()
+    assert cid in retired
+    assert changed == {components.component_id("a"), components.component_id("b")}
+    G = nx.Graph([("b", "c"), ("x", "y")])
+    G.add_node("a")
+    check_against_networkx(components, G)
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from concept_graph import SCAN_LIMIT, ConceptGraph
+
+
+def check_same(graph, model):
+    assert list(graph) == list(model)
+    assert len(graph) == len(model)
+    for key, value in model.items():
+        entry = graph[key]
+        assert list(entry['next']) == value['next']
+        assert entry['next'] == value['next']
+        assert entry['text'] == value['text']
+        assert dict(entry).keys() == value.keys()
+    assert graph.edge_count == sum(len(value['next']) for value in model.values())
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_matches_a_plain_dict(seed):
+    rng = random.Random(seed)
+    names = [f"c{i}" for i in range(rng.randint(1, 12))]
+    graph = ConceptGraph()
+    model = {}
+    for _ in range(200):
+        key = rng.choice(names)
+        choice = rng.random()
+        if key not in model or choice < 0.05:
+            value = {'next': [rng.choice(names) for _ in range(rng.randint(0, 3))], 'text': [str(choice)]}
+            graph[key] = value
+            # Replacing a concept moves nothing, a new one goes last
+            model[key] = {'next': list(value['next']), 'text': list(value['text'])}
+            continue
+        next_items = graph[key]['next']
+        expected = model[key]['next']
+        item = rng.choice(names + ["never-added"])
+        if choice < 0.1:
+            del graph[key]
+            del model[key]
+        elif choice < 0.5:
+            # Long enough lists switch to the id set
+            for _ in range(rng.randint(1, SCAN_LIMIT)):
+                next_items.append(item)
+                expected.append(item)
+        elif choice < 0.6:
+            index = rng.randint(0, len(expected))
+            next_items.insert(index, item)
+            expected.insert(index, item)
+        elif choice < 0.7 and expected:
+            index = rng.randrange(len(expected))
+            next_items[index] = item
+            expected[index] = item
+        elif choice < 0.8 and expected:
+            index = rng.randrange(len(expected))
+            del next_items[index]
+            del expected[index]
+        elif choice < 0.85:
+            del next_items[1:3]
+            del expected[1:3]
+        elif choice < 0.9:
+            graph[key]['review'] = {'due': choice}
+            model[key]['review'] = {'due': choice}
+        elif choice < 0.95:
+            graph[key]['text'].append(item)
+            model[key]['text'].append(item)
+        for name in names + ["never-added"]:
+            if key in model:
+                assert (name in graph[key]['next']) == (name in model[key]['next'])
+                assert graph.has_edge(key, name) == (name in model[key]['next'])
+    check_same(graph, model)
+    assert ConceptGraph(model) == graph
+
+
+def test_missing_keys():
+    graph = ConceptGraph({'a': {'next': ['b'], 'text': []}})
+    # b is only an edge target, not a concept
+    assert 'b' not in graph
+    with pytest.raises(KeyError):
+        graph['b']
+    with pytest.raises(KeyError):
+        graph['a']['review']
+    with pytest.raises(KeyError):
+        graph['a']['next'] = []
+    assert graph.get('b') is None
+    assert not graph.has_edge('a', 'z')
+
+
+def test_names_are_shared():
+    graph = ConceptGraph()
+    name = "".join(["shared ", "name"])
+    graph[name] = {'next': [], 'text': []}
+    graph['other'] = {'next': ["shared name"], 'text': []}
+    assert graph['other']['next'][0] is next(iter(graph))
+
+
+def test_slice_assignment_is_refused():
+    graph = ConceptGraph({'a': {'next': ['b', 'c'], 'text': []}})
+    with pytest.raises(TypeError):
+        graph['a']['next'][0:1] = ['d']
+    assert graph['a']['next'][0:1] == ['b']
@@ -0,0 +1,292 @@
+import json
+import os
+
+import pytest
+
+import concept_store
+from concept_store import JournalStore, SQLiteStore, StorePool, migrate_json, write_json_atomic
+
+
+def open_store(tmp_path, **kwargs):
+    store = JournalStore(str(tmp_path / "nested_dictionary.json"), **kwargs)
+    store.load()
+    return store
+
+
+def read_json(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def journal_lines(store):
+    with open(store.journal_path, encoding='utf-8') as file:
+        return file.readlines()
+
+
+def test_edits_are_appended_and_replayed(tmp_path):
+    store = open_store(tmp_path)
+    assert store.add_concept("a")
+    assert not store.add_concept("a")
+    store.add_edge("a", "b")
+    store.add_text("a", "first")
+    store.set_review("b", {'ease': 2.5, 'interval': 1, 'reps': 1, 'due': 10.0, 'last': 0.0})
+
+    assert len(journal_lines(store)) == 4
+    assert not os.path.exists(store.path)
+
+    reopened = JournalStore(store.path)
+    data = reopened.load()
+    assert list(data) == ["a", "b"]
+    assert list(data["a"]["next"]) == ["b"]
+    assert list(data["a"]["text"]) == ["first"]
+    assert data["b"]["review"]["due"] == 10.0
+    reopened.close()
+    store.close()
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(tmp_path):
+    store = open_store(tmp_path, compact_threshold=3)
+    for key in ("a", "b", "c"):
+        store.add_concept(key)
+    store.wait_for_compaction()
+    store.add_text("a", "after")
+
+    assert read_json(store.path) == {key: {'next': [], 'text': []} for key in "abc"}
+    assert not os.path.exists(store.pending_path)
+    assert len(journal_lines(store)) == 1
+
+    store.close()
+    assert read_json(store.path)["a"]["text"] == ["after"]
+    assert journal_lines(store) == []
+
+
+def test_close_compacts_and_keeps_snapshot_format(tmp_path):
+    store = open_store(tmp_path)
+    store.add_edge("a", "b")
+    store.close()
+
+    expected = tmp_path / "expected.json"
+    write_json_atomic(str(expected), None, {"a": {'next': ["b"], 'text': []}, "b": {'next': [], 'text': []}})
+    assert (tmp_path / "nested_dictionary.json").read_bytes() == expected.read_bytes()
+
+
+def test_torn_last_line_is_skipped(tmp_path):
+    store = open_store(tmp_path)
+    store.add_concept("a")
+    store.add_text("a", "kept")
+    store.journal_file.close()
+    store.journal_file = None
+    with open(store.journal_path, 'a', encoding='utf-8') as file:
+        file.write('{"op": "text", "key": "a", "it')
+
+    data = JournalStore(store.path).load()
+    assert list(data["a"]["text"]) == ["kept"]
+
+
+def test_interrupted_compaction_is_redone(tmp_path):
+    # Died while writing the tmp snapshot: the pending journal is still
+    # there, so the half-written tmp file is thrown away and replayed again
+    store = open_store(tmp_path)
+    store.add_concept("a")
+    store.close()
+    with open(store.pending_path, 'w', encoding='utf-8') as file:
+        file.write(json.dumps({'op': 'text', 'key': 'a', 'item': "pending"}) + "\n")
+    with open(store.tmp_path, 'w', encoding='utf-8') as file:
+        file.write('{"a": {"next": [], "te')
+
+    reopened = JournalStore(store.path)
+    data = reopened.load()
+    assert list(data["a"]["text"]) == ["pending"]
+    assert not os.path.exists(store.tmp_path)
+    reopened.close()
+    assert read_json(store.path)["a"]["text"] == ["pending"]
+    assert not os.path.exists(store.pending_path)
+
+
+def test_finished_compaction_is_renamed_on_load(tmp_path):
+    # Died after the pending journal was removed but before the rename: the
+    # tmp snapshot is complete and becomes the snapshot
+    store = open_store(tmp_path)
+    store.add_concept("old")
+    store.close()
+    write_json_atomic(store.tmp_path, None, {"new": {'next': [], 'text': []}})
+
+    assert list(JournalStore(store.path).peek()) == ["new"]
+    data = JournalStore(store.path).load()
+    assert list(data) == ["new"]
+    assert not os.path.exists(store.tmp_path)
+
+
+def test_streaming_load_replays_the_journal(tmp_path):
+    store = open_store(tmp_path)
+    for key in ("a", "b"):
+        store.add_text(key, key * 2)
+    store.close()
+    store = open_store(tmp_path)
+    store.add_text("a", "journal")
+    store.journal_file.close()
+    store.journal_file = None
+
+    streamed = JournalStore(store.path)
+    steps = list(streamed.load_iter(lazy_text=True, chunk_size=1))
+    assert [len(batch) for _, batch in steps[:-1]] == [1, 1]
+    assert steps[-1] == (1.0, None)
+    assert list(streamed.data["a"]["text"]) == ["aa", "journal"]
+    assert list(streamed.data["b"]["text"]) == ["bb"]
+    streamed.close()
+
+
+REVIEW = {'ease': 2.5, 'interval': 6, 'reps': 2, 'due': 1700000000.5, 'last': 1699990000.0}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "concepts.db")
+
+
+def test_sqlite_edits_read_back_in_order(db_path):
+    store = SQLiteStore(db_path)
+    assert store.add_concept("a")
+    assert not store.add_concept("a")
+    store.add_edge("a", "c")
+    store.add_edge("a", "b")
+    store.add_text("a", "first")
+    store.add_text("a", "second")
+    store.set_review("b", REVIEW)
+
+    data = store.load()
+    assert list(data) == ["a", "c", "b"]
+    assert len(data) == 3 and "c" in data and "x" not in data
+    assert data["a"] == {'next': ["c", "b"], 'text': ["first", "second"]}
+    assert data["b"] == {'next': [], 'text': [], 'review': REVIEW}
+    assert dict(data.items()) == {key: data[key] for key in data}
+    with pytest.raises(KeyError):
+        data["x"]
+    store.close()
+
+
+def test_sqlite_owners_are_separate(db_path):
+    alice = SQLiteStore(db_path, owner="alice")
+    bob = SQLiteStore(db_path, owner="bob")
+    alice.add_edge("shared", "alice only")
+    bob.add_text("shared", "bob's")
+    bob.write_snapshot({"replaced": {'next': [], 'text': ["t"]}})
+    assert list(alice.data) == ["shared", "alice only"]
+    assert alice.data["shared"]['text'] == []
+    assert dict(bob.data.items()) == {"replaced": {'next': [], 'text': ["t"]}}
+    alice.close()
+    bob.close()
+
+
+def test_sqlite_cache_follows_writes_from_other_connections(db_path):
+    reader = SQLiteStore(db_path)
+    writer = SQLiteStore(db_path)
+    writer.add_concept("a")
+    first = reader.cached_data()
+    assert list(first) == ["a"]
+    assert reader.cached_data() is first
+
+    writer.add_text("a", "new")
+    assert reader.cached_data()["a"]['text'] == ["new"]
+
+    # A review patches a current cache in place instead of reading it again
+    current = reader.cached_data()
+    reader.set_review("a", REVIEW)
+    assert reader.cached_data() is current
+    assert current["a"]['review'] == REVIEW
+    reader.close()
+    writer.close()
+
+
+def test_sqlite_transaction_rolls_back_and_nests(db_path):
+    store = SQLiteStore(db_path)
+    store.add_concept("kept")
+    with pytest.raises(RuntimeError):
+        with store.lock, store.transaction():
+            store.add_edge("gone", "also gone")
+            store.add_text("kept", "gone")
+            raise RuntimeError
+    assert dict(store.data.items()) == {"kept": {'next': [], 'text': []}}
+    assert store.revision() == 1
+
+    # Nested writes join the outer transaction and commit with it
+    with store.lock, store.transaction():
+        store.add_edge("kept", "b")
+        assert store.conn.in_transaction
+    assert not store.conn.in_transaction
+    assert store.data["kept"]['next'] == ["b"]
+    store.close()
+
+
+def test_sqlite_write_snapshot_round_trip(db_path):
+    data = {"a": {'next': ["b", "b"], 'text': ["x \" y", "é"], 'review': REVIEW},
+            "b": {'next': [], 'text': []}}
+    store = SQLiteStore(db_path)
+    store.add_concept("old")
+    store.write_snapshot(data)
+    assert dict(store.data.items()) == data
+    store.write_snapshot(store.data)
+    assert dict(store.data.items()) == data
+    store.close()
+
+
+def test_migrate_json_leaves_the_source_alone(tmp_path, db_path):
+    store = open_store(tmp_path)
+    store.add_edge("a", "b")
+    store.close()
+    store = open_store(tmp_path)
+    store.add_text("a", "only in the journal")
+    store.set_review("b", REVIEW)
+    store.journal_file.close()
+    store.journal_file = None
+    before = {path: open(path, 'rb').read() for path in (store.path, store.journal_path)}
+
+    assert migrate_json(store.path, db_path, owner="me") == 2
+    assert {path: open(path, 'rb').read() for path in before} == before
+    migrated = SQLiteStore(db_path, owner="me")
+    assert dict(migrated.data.items()) == {"a": {'next': ["b"], 'text': ["only in the journal"]},
+                                           "b": {'next': [], 'text': [], 'review': REVIEW}}
+    migrated.close()
+
+
+@pytest.fixture
+def pool(db_path, monkeypatch):
+    # Full-strength key hashing only slows the tests down
+    monkeypatch.setattr(concept_store, "KEY_ITERATIONS", 1000)
+    pool = StorePool(db_path, size=2, max_owners=2)
+    yield pool
+    pool.close()
+
+
+def test_accounts_need_their_key(pool):
+    owner, key = pool.create_account("ann")
+    assert pool.create_account("ann") is None
+    assert pool.sign_in("ann", key) == owner
+    assert pool.sign_in("ann", key + "x") is None
+    assert pool.sign_in("bob", key) is None
+
+    other_owner, other_key = pool.create_account("bob")
+    assert other_owner != owner and other_key != key
+    assert pool.sign_in("bob", other_key) == other_owner
+
+    # Only a salted hash of the key is stored
+    rows = pool.connections[0][0].execute("SELECT salt, key_hash FROM accounts").fetchall()
+    assert len({salt for salt, _ in rows}) == 2
+    assert all(key.encode() not in key_hash for _, key_hash in rows)
+
+
+def test_pool_stores_are_per_owner_and_shared(pool):
+    owner, _ = pool.create_account("ann")
+    store = pool.store(owner)
+    assert pool.store(owner) is store
+    store.add_edge("a", "b")
+    assert list(pool.store("someone else").data) == []
+
+    # Evicted from the LRU, the store is rebuilt over the same rows
+    pool.store("x")
+    pool.store("y")
+    assert pool.store(owner) is not store
+    assert list(pool.store(owner).data) == ["a", "b"]
+    # A pooled store leaves the shared connection open
+    store.close()
+    assert list(pool.store(owner).data) == ["a", "b"]
@@ -0,0 +1,147 @@
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from graph_analytics import GraphAnalytics, build_analytics
+
+
+def random_edits(seed, steps=40):
+    rng = random.Random(seed)
+    count = rng.randint(2, 10)
+    for _ in range(steps):
+        key = f"c{rng.randrange(count)}"
+        if rng.random() < 0.2:
+            yield key, None
+        else:
+            yield key, f"c{rng.randrange(count)}"
+
+
+def apply(analytics, edit):
+    key, next_item = edit
+    if next_item is None:
+        analytics.add_concept(key)
+    else:
+        analytics.add_next(key, next_item)
+
+
+def rebuilt(edits):
+    analytics = GraphAnalytics()
+    for edit in edits:
+        apply(analytics, edit)
+    analytics.compute_depth()
+    return analytics
+
+
+def directed(analytics):
+    graph = nx.DiGraph()
+    graph.add_nodes_from(analytics.names)
+    graph.add_edges_from((analytics.names[u], analytics.names[v]) for u, v in analytics.edges)
+    return graph
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_incremental_depth_matches_recompute(seed):
+    # Includes cycles and self-loops; depths are read between edits so the
+    # incremental path is taken and not just a recompute on first use
+    analytics = GraphAnalytics()
+    rng = random.Random(seed)
+    edits = []
+    for edit in random_edits(seed):
+        apply(analytics, edit)
+        edits.append(edit)
+        if rng.random() < 0.5:
+            analytics.depth_of(edit[0])
+        fresh = rebuilt(edits)
+        assert [analytics.depth_of(key) for key in analytics.names] == [fresh.depth_of(key) for key in fresh.names]
+
+
+def test_depth_after_cycle_gets_a_root():
+    analytics = GraphAnalytics()
+    analytics.add_next("c1", "c2")
+    analytics.add_next("c2", "c1")
+    assert analytics.depth_of("c1") == 0
+    analytics.add_next("c0", "c2")
+    assert [analytics.depth_of(key) for key in ("c0", "c2", "c1")] == [0, 1, 2]
+
+
+def test_depth_is_from_the_nearest_root():
+    analytics = GraphAnalytics({"far": {'next': ["mid"]}, "mid": {'next': ["leaf"]},
+                                "near": {'next': ["leaf"]}, "leaf": {'next': []}})
+    assert analytics.depth_of("leaf") == 1
+
+
+def test_self_loop_keeps_a_root():
+    analytics = GraphAnalytics()
+    analytics.add_next("a", "b")
+    analytics.depth_of("a")
+    analytics.add_next("a", "a")
+    assert (analytics.depth_of("a"), analytics.depth_of("b")) == (0, 1)
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_components_and_ancestors_match_networkx(seed):
+    edits = list(random_edits(seed))
+    analytics = rebuilt(edits)
+    graph = directed(analytics)
+    for component in nx.connected_components(graph.to_undirected()):
+        ids = {analytics.component_of(key) for key in component}
+        assert len(ids) == 1
+        assert all(analytics.component_size(key) == len(component) for key in component)
+    assert len({analytics.component_of(key) for key in analytics.names}) == \
+        nx.number_connected_components(graph.to_undirected())
+    for key in analytics.names:
+        ancestors = analytics.ancestors(key)
+        assert set(ancestors) == nx.ancestors(graph, key)
+        lengths = nx.single_source_shortest_path_length(graph.reverse(), key)
+        assert [lengths[a] for a in ancestors] == sorted(lengths[a] for a in ancestors)
+
+
+def test_rank_is_a_distribution_and_favours_targets():
+    data = {f"leaf{i}": {'next': ["hub"]} for i in range(5)}
+    data["hub"] = {'next': []}
+    analytics = GraphAnalytics(data)
+    assert analytics.most_central(1) == ["hub"]
+    assert sum(analytics.importance(key) for key in data) == pytest.approx(1.0)
+    assert analytics.importance("leaf0") == pytest.approx(analytics.importance("leaf4"))
+
+
+def test_rank_matches_power_iteration():
+    rng = np.random.default_rng(0)
+    count = 30
+    edges = {(int(u), int(v)) for u, v in rng.integers(0, count, (80, 2))}
+    analytics = GraphAnalytics()
+    for node in range(count):
+        analytics.add_concept(str(node))
+    for u, v in edges:
+        analytics.add_next(str(u), str(v))
+
+    matrix = np.zeros((count, count))
+    for u, v in edges:
+        matrix[v, u] = 1
+    out_degree = matrix.sum(axis=0)
+    matrix[:, out_degree == 0] = 1
+    matrix /= matrix.sum(axis=0)
+    rank = np.full(count, 1 / count)
+    for _ in range(200):
+        rank = 0.15 / count + 0.85 * matrix @ rank
+    assert [analytics.importance(str(node)) for node in range(count)] == pytest.approx(list(rank), abs=1e-5)
+
+
+def test_build_analytics_matches_incremental():
+    edits = list(random_edits(7, steps=60))
+    incremental = rebuilt(edits)
+    snapshot = {}
+    for key, next_item in edits:
+        snapshot.setdefault(key, [])
+        if next_item is not None:
+            snapshot.setdefault(next_item, [])
+            if next_item not in snapshot[key]:
+                snapshot[key].append(next_item)
+    built = build_analytics({key: tuple(items) for key, items in snapshot.items()})
+    assert built.edges == {(built.ids[incremental.names[u]], built.ids[incremental.names[v]])
+                           for u, v in incremental.edges}
+    from_data = GraphAnalytics({key: {'next': items} for key, items in snapshot.items()})
+    assert [built.depth_of(key) for key in built.names] == [from_data.depth_of(key) for key in built.names]
+    assert build_analytics({"a": ("b",)}, cancelled=lambda: True) is None
@@ -0,0 +1,89 @@
+import json
+import threading
+
+import pytest
+
+from json_stream import ConceptStream, LazyText
+
+DATA = {
+    "plain": {'next': ["quote \" key", "back\\slash"], 'text': ["one", "two"]},
+    "quote \" key": {'next': [], 'text': ["line\nbreak", "tab\t and {braces} [brackets], commas"],
+                     'review': {'ease': 2.36, 'interval': 6, 'reps': 2, 'due': 1700000000.5, 'last': 1699990000.0}},
+    "back\\slash": {'next': ["plain"], 'text': [],
+                    'review': {'ease': 1.3, 'interval': 0, 'reps': 0, 'due': 12.0, 'last': 11.0}},
+    "unicode é 😀": {'next': [], 'text': ["été \\\"  "]},
+}
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / "nested_dictionary.json"
+    path.write_text(json.dumps(DATA, indent=2), encoding='utf-8')
+    return str(path)
+
+
+def plain(value):
+    return {name: list(item) if isinstance(item, LazyText) else item for name, item in value.items()}
+
+
+@pytest.mark.parametrize("lazy_text", [False, True])
+def test_round_trip(snapshot, lazy_text):
+    stream = ConceptStream(snapshot, lazy_text=lazy_text)
+    data = {key: plain(value) for key, value in stream}
+    assert data == DATA
+    assert list(data) == list(DATA)
+    assert stream.progress == 1.0
+    stream.close()
+
+
+def test_round_trip_compact_and_ascii(tmp_path):
+    path = tmp_path / "compact.json"
+    path.write_text(json.dumps(DATA, separators=(',', ':')), encoding='utf-8')
+    stream = ConceptStream(str(path))
+    assert dict(stream) == DATA
+    stream.close()
+
+
+def test_empty_files(tmp_path):
+    for content in ("", "{}"):
+        path = tmp_path / "empty.json"
+        path.write_text(content, encoding='utf-8')
+        stream = ConceptStream(str(path))
+        assert list(stream) == []
+        stream.close()
+
+
+def test_lazy_text_survives_close(snapshot):
+    stream = ConceptStream(snapshot, lazy_text=True)
+    data = dict(stream)
+    texts = data["quote \" key"]['text']
+    assert isinstance(texts, LazyText)
+    texts.append("added")
+    stream.close()
+    assert list(texts) == DATA["quote \" key"]['text'] + ["added"]
+    assert list(data["plain"]['text']) == ["one", "two"]
+
+
+def test_lazy_text_read_while_closed_from_another_thread(snapshot):
+    for _ in range(20):
+        stream = ConceptStream(snapshot, lazy_text=True)
+        texts = [value['text'] for _, value in stream]
+        closer = threading.Thread(target=stream.close)
+        closer.start()
+        for text, (key, value) in zip(texts, DATA.items()):
+            assert list(text) == value['text']
+        closer.join()
+
+
+def test_review_state_is_decoded_whole(tmp_path):
+    # Numbers, literals and nested values only occur in review objects
+    review = {'ease': 2.5, 'interval': 0, 'reps': -1, 'due': 1.7e9, 'last': None,
+              'suspended': False, 'flagged': True, 'history': [{'at': "2024-01-02T03:04:05", 'grade': 4}]}
+    data = {"reviewed": {'next': ["new"], 'text': ["t"], 'review': review},
+            "new": {'next': [], 'text': []}}
+    path = tmp_path / "deck.json"
+    path.write_text(json.dumps(data, indent=2), encoding='utf-8')
+    for lazy_text in (False, True):
+        stream = ConceptStream(str(path), lazy_text=lazy_text)
+        assert {key: plain(value) for key, value in stream} == data
+        stream.close()
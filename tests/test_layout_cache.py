@@ -0,0 +1,98 @@
+import random
+
+import networkx as nx
+import pytest
+
+import layout_cache
+from layout_cache import MIN_CACHED_NODES, LayoutCache, component_digest
+from tree_layout import layout_root, tree_layout
+
+
+def chain(count, prefix="n"):
+    return nx.path_graph([f"{prefix}{i}" for i in range(count)])
+
+
+def test_digest_ignores_insertion_order():
+    rng = random.Random(3)
+    edges = [(f"n{rng.randrange(50)}", f"n{rng.randrange(50)}") for _ in range(80)]
+    forward = nx.Graph(edges)
+    backward = nx.Graph(list(reversed(edges)))
+    for component in nx.connected_components(forward):
+        component = list(component)
+        root = layout_root(forward, component)
+        assert component_digest(forward, component, root) == component_digest(backward, component[::-1], root)
+
+
+def test_digest_includes_edges_and_root():
+    G = chain(MIN_CACHED_NODES)
+    component = list(G)
+    digest = component_digest(G, component, "n0")
+    assert component_digest(G, component, "n1") != digest
+    G.add_edge("n0", "n2")
+    assert component_digest(G, component, "n0") != digest
+
+
+def test_hit_returns_the_stored_layout(monkeypatch):
+    cache = LayoutCache(path=None)
+    G = chain(MIN_CACHED_NODES)
+    first = cache.layout_component(G, list(G))
+    assert cache.dirty
+    monkeypatch.setattr(layout_cache, "layout_component", lambda *args: pytest.fail("laid out again"))
+    assert cache.layout_component(G, list(reversed(list(G)))) is first
+
+
+def test_small_components_are_not_cached():
+    cache = LayoutCache(path=None)
+    G = chain(MIN_CACHED_NODES - 1)
+    cache.layout_component(G, list(G))
+    assert len(cache.entries) == 0
+    assert not cache.dirty
+
+
+def test_least_recently_used_is_evicted():
+    cache = LayoutCache(path=None, max_entries=2)
+    graphs = [chain(MIN_CACHED_NODES, prefix) for prefix in "abc"]
+    for G in graphs[:2]:
+        cache.layout_component(G, list(G))
+    # Touch a, so b is the oldest when c comes in
+    cache.layout_component(graphs[0], list(graphs[0]))
+    cache.layout_component(graphs[2], list(graphs[2]))
+    digests = [component_digest(G, list(G), layout_root(G, list(G))) for G in graphs]
+    assert list(cache.entries.entries) == [digests[0], digests[2]]
+
+
+def test_tree_layout_matches_uncached():
+    rng = random.Random(5)
+    G = nx.disjoint_union_all([chain(rng.randint(1, 3 * MIN_CACHED_NODES)) for _ in range(10)])
+    cache = LayoutCache(path=None)
+    assert cache.tree_layout(G) == tree_layout(G)
+    assert cache.tree_layout(G) == tree_layout(G)
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "layouts.json"
+    cache = LayoutCache(path=str(path))
+    G = chain(MIN_CACHED_NODES)
+    pos = cache.layout_component(G, list(G))
+    cache.save()
+    assert not cache.dirty
+    loaded = LayoutCache(path=str(path))
+    digest = component_digest(G, list(G), layout_root(G, list(G)))
+    assert loaded.entries.get(digest) == pos
+
+
+def test_save_is_throttled(tmp_path):
+    path = tmp_path / "layouts.json"
+    cache = LayoutCache(path=str(path))
+    G = chain(MIN_CACHED_NODES)
+    cache.layout_component(G, list(G))
+    cache.save(min_interval=3600)
+    assert cache.dirty and not path.exists()
+    cache.save()
+    assert path.exists()
+
+
+def test_damaged_file_is_ignored(tmp_path):
+    path = tmp_path / "layouts.json"
+    path.write_text("{not json")
+    assert len(LayoutCache(path=str(path)).entries) == 0
@@ -0,0 +1,110 @@
+import random
+
+import pytest
+
+from level_of_detail import LevelOfDetail, collapse
+
+
+def random_snapshot(rng):
+    keys = [f"n{i}" for i in range(rng.randint(1, 60))]
+    snapshot = {}
+    for i, key in enumerate(keys):
+        # Mostly a forest, with some back edges, cycles and dangling targets
+        items = []
+        if i and rng.random() < 0.8:
+            snapshot[keys[rng.randrange(i)]] += (key,)
+        if rng.random() < 0.1:
+            items.append(rng.choice(keys))
+        if rng.random() < 0.05:
+            items.append("missing")
+        snapshot[key] = snapshot.get(key, ()) + tuple(items)
+    return snapshot
+
+
+def hidden_below(snapshot, view, aggregates):
+    # Concepts reachable from each collapsed concept without passing through
+    # a visible one, a concept may be reachable from several
+    hidden = {}
+    for aggregate, concept in aggregates.items():
+        seen = set()
+        stack = [item for item in snapshot[concept] if item in snapshot]
+        while stack:
+            node = stack.pop()
+            if node in view or node in seen:
+                continue
+            seen.add(node)
+            stack.extend(item for item in snapshot[node] if item in snapshot)
+        hidden[aggregate] = seen
+    return hidden
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_every_concept_is_shown_or_counted(seed):
+    rng = random.Random(seed)
+    snapshot = random_snapshot(rng)
+    settings = (rng.randint(1, 4), rng.randint(1, 20), frozenset())
+    view, aggregates = collapse(snapshot, settings)
+
+    concepts = set(view) - set(aggregates)
+    assert concepts <= set(snapshot)
+    for key in concepts:
+        expected = tuple(item for item in snapshot[key] if item in concepts)
+        assert view[key][:len(expected)] == expected
+        assert set(view[key][len(expected):]) <= set(aggregates)
+    for aggregate, concept in aggregates.items():
+        assert aggregate not in snapshot
+        assert view[aggregate] == ()
+        assert aggregate in view[concept]
+
+    # Collapsed subtrees are disjoint, so the counts add up to the hidden concepts
+    hidden = hidden_below(snapshot, view, aggregates)
+    assert set().union(*hidden.values()) == set(snapshot) - concepts
+    assert all(hidden.values())
+    assert sum(int(aggregate[1:aggregate.index(" ")]) for aggregate in aggregates) == len(snapshot) - len(concepts)
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_expanding_every_aggregate_shows_everything(seed):
+    rng = random.Random(seed)
+    snapshot = random_snapshot(rng)
+    level_of_detail = LevelOfDetail(enabled=True, max_depth=1, max_subtree=3)
+    while True:
+        view, level_of_detail.aggregates = collapse(snapshot, level_of_detail.settings())
+        if not level_of_detail.aggregates:
+            break
+        for aggregate in list(level_of_detail.aggregates):
+            assert level_of_detail.expand(aggregate)
+    assert view == {key: tuple(item for item in items if item in snapshot) for key, items in snapshot.items()}
+
+
+def test_deep_chain_is_cut_at_max_depth():
+    snapshot = {f"a{i}": (f"a{i + 1}",) for i in range(5)}
+    snapshot["a5"] = ()
+    view, aggregates = collapse(snapshot, (3, 50, frozenset()))
+    assert aggregates == {"+2 (a3)": "a3"}
+    assert view == {"a0": ("a1",), "a1": ("a2",), "a2": ("a3",), "a3": ("+2 (a3)",), "+2 (a3)": ()}
+
+
+def test_wide_concept_is_collapsed():
+    snapshot = {"root": tuple(f"c{i}" for i in range(60))}
+    snapshot.update({f"c{i}": () for i in range(60)})
+    view, aggregates = collapse(snapshot, (3, 50, frozenset()))
+    assert view == {"root": ("+60 (root)",), "+60 (root)": ()}
+    view, aggregates = collapse(snapshot, (3, 50, frozenset({"root"})))
+    assert aggregates == {}
+    assert view == snapshot
+
+
+def test_aggregate_never_takes_a_concept_name():
+    snapshot = {"a": ("b",), "b": ("c",), "c": (), "+2 (a)": ()}
+    view, aggregates = collapse(snapshot, (0, 50, frozenset()))
+    assert list(aggregates.values()) == ["a"]
+    assert "+2 (a)" not in aggregates
+    assert view["+2 (a)"] == ()
+
+
+def test_disabled_returns_the_snapshot():
+    snapshot = {"a": ("b",), "b": ()}
+    level_of_detail = LevelOfDetail()
+    assert collapse(snapshot, level_of_detail.settings()) == (snapshot, {})
+    assert not level_of_detail.expand("a")
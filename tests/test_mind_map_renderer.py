@@ -0,0 +1,147 @@
+import random
+
+import numpy as np
+import pytest
+
+from mind_map_renderer import MindMapModel, edge_key, graph_snapshot
+from tree_layout import COMPONENT_SPACING, layout_component, layout_components, tree_layout
+
+
+def random_snapshot(rng, count=None):
+    count = count or rng.randint(1, 25)
+    keys = [f"n{i}" for i in range(count)]
+    rng.shuffle(keys)
+    snapshot = {}
+    for key in keys:
+        snapshot[key] = tuple(rng.choice(keys) for _ in range(rng.choice([0, 0, 1, 1, 2])))
+    return snapshot
+
+
+def edit(rng, snapshot):
+    snapshot = dict(snapshot)
+    keys = list(snapshot)
+    choice = rng.random()
+    if choice < 0.3 and len(keys) > 1:
+        del snapshot[rng.choice(keys)]
+    elif choice < 0.5:
+        key = rng.choice(keys)
+        if snapshot[key]:
+            items = list(snapshot[key])
+            items.pop(rng.randrange(len(items)))
+            snapshot[key] = tuple(items)
+    elif choice < 0.7:
+        new = f"new{rng.randrange(1000)}"
+        snapshot.setdefault(new, ())
+        key = rng.choice(keys)
+        snapshot[key] = snapshot[key] + (new,)
+    else:
+        key = rng.choice(keys)
+        snapshot[key] = snapshot[key] + (rng.choice(keys),)
+    return snapshot
+
+
+def check_consistent(model):
+    # Every component sits in its own slot exactly as layout_component lays
+    # it out, and the draw arrays agree with the positions
+    G = model.G
+    assert set(model.pos) == set(G)
+    slots = set()
+    for cid in component_ids(model):
+        component = model.components.component(cid)
+        slot = model.slot_of[cid]
+        assert slot not in slots
+        slots.add(slot)
+        layout = layout_component(G, component, model.components.root(cid))
+        for node, (x, y) in layout.items():
+            assert model.pos[node] == pytest.approx((x, y - COMPONENT_SPACING * slot))
+    assert list(model.node_order) == sorted(model.node_index, key=model.node_index.get)
+    for node, index in model.node_index.items():
+        assert tuple(model.offsets[index]) == pytest.approx(model.pos[node])
+    assert set(model.edge_index) == {edge_key(u, v) for u, v in G.edges}
+    for (u, v), index in model.edge_index.items():
+        assert model.segments[index].ravel().tolist() == pytest.approx(list(model.pos[u]) + list(model.pos[v]))
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_sync_from_scratch_matches_tree_layout(seed):
+    model = MindMapModel(layout_component)
+    model.sync(random_snapshot(random.Random(seed)))
+    expected = tree_layout(model.G)
+    assert model.pos.keys() == expected.keys()
+    for node, point in expected.items():
+        assert model.pos[node] == pytest.approx(point)
+
+
+def component_ids(model):
+    return {model.components.component_id(node) for node in model.G}
+
+
+def node_sets(model):
+    return {frozenset(model.components.component(cid)) for cid in component_ids(model)}
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_incremental_sync_stays_consistent(seed):
+    rng = random.Random(seed)
+    snapshot = random_snapshot(rng)
+    model = MindMapModel(layout_component)
+    model.sync(snapshot)
+    for _ in range(15):
+        before = dict(model.pos)
+        old_nodes = set(model.G)
+        old_edges = {edge_key(u, v) for u, v in model.G.edges}
+        old_components = node_sets(model)
+        snapshot = edit(rng, snapshot)
+        model.sync(snapshot)
+        check_consistent(model)
+
+        # Components the edit did not reach keep every position
+        new_edges = {edge_key(u, v) for u, v in model.G.edges}
+        changed = old_nodes ^ set(model.G)
+        for edge in old_edges ^ new_edges:
+            changed.update(edge)
+        for component in node_sets(model):
+            if component in old_components and not component & changed:
+                assert all(model.pos[node] == before[node] for node in component)
+
+
+def test_unchanged_snapshot_is_a_no_op():
+    snapshot = {"a": ("b",), "b": ()}
+    model = MindMapModel(layout_component)
+    assert model.sync(snapshot) is True
+    frame = model.frame()
+    assert model.sync(dict(snapshot)) is False
+    assert model.frame() is frame
+
+
+def test_cancelled_sync_is_finished_by_the_next():
+    snapshot = {f"c{i}": () for i in range(5)}
+    model = MindMapModel(layout_component)
+    calls = []
+
+    def cancelled():
+        calls.append(None)
+        return len(calls) > 2
+
+    assert model.sync(snapshot, cancelled) is None
+    assert model.pending
+    assert model.sync(snapshot) is True
+    assert not model.pending
+    check_consistent(model)
+
+
+def test_batch_layout_matches_serial():
+    snapshot = random_snapshot(random.Random(5), count=60)
+    serial = MindMapModel(layout_component)
+    serial.sync(snapshot)
+    batched = MindMapModel(layout_component, lambda G, jobs: layout_components(G, jobs, workers=1))
+    batched.sync(snapshot)
+    assert batched.pos == serial.pos
+    assert np.array_equal(batched.offsets, serial.offsets)
+
+
+def test_graph_snapshot_copies_next_lists():
+    data = {"a": {'next': ["b"], 'text': []}}
+    snapshot = graph_snapshot(data)
+    data["a"]['next'].append("c")
+    assert snapshot == {"a": ("b",)}
@@ -0,0 +1,111 @@
+import queue
+import threading
+
+from render_scheduler import RenderScheduler
+
+TIMEOUT = 5
+
+
+class FakeMaster:
+    # Stands in for Tk: after() callbacks run when the test calls pump(),
+    # on the test's thread, like the Tk main loop would
+
+    def __init__(self):
+        self.calls = queue.Queue()
+
+    def after(self, delay, callback, *args):
+        self.calls.put((callback, args))
+
+    def pump(self):
+        callback, args = self.calls.get(timeout=TIMEOUT)
+        callback(*args)
+
+
+def test_result_is_applied_on_the_master():
+    master = FakeMaster()
+    applied = []
+    scheduler = RenderScheduler(master, lambda snapshot, cancelled: snapshot * 2, applied.append)
+    scheduler.request(21)
+    master.pump()
+    assert applied == [42]
+    scheduler.close()
+
+
+def test_newer_request_cancels_the_running_render():
+    master = FakeMaster()
+    started = threading.Event()
+    release = threading.Event()
+    seen = []
+
+    def render(snapshot, cancelled):
+        if snapshot == "first":
+            started.set()
+            release.wait(TIMEOUT)
+            seen.append(cancelled())
+        return snapshot
+
+    applied = []
+    scheduler = RenderScheduler(master, render, applied.append)
+    scheduler.request("first")
+    assert started.wait(TIMEOUT)
+    scheduler.request("second")
+    scheduler.request("third")
+    release.set()
+    master.pump()
+    # "first" was cancelled, "second" was replaced before the worker got to it
+    assert seen == [True]
+    assert applied == ["third"]
+    assert master.calls.empty()
+    scheduler.close()
+
+
+def test_stale_result_is_dropped_on_delivery():
+    master = FakeMaster()
+    applied = []
+    scheduler = RenderScheduler(master, lambda snapshot, cancelled: snapshot, applied.append)
+    scheduler.request("old")
+    callback, args = master.calls.get(timeout=TIMEOUT)
+    # A request arrives while "old" waits on the Tk loop
+    scheduler.request("new")
+    callback(*args)
+    master.pump()
+    assert applied == ["new"]
+    scheduler.close()
+
+
+def test_cancelled_render_returning_none_is_skipped():
+    master = FakeMaster()
+    applied = []
+    scheduler = RenderScheduler(master, lambda snapshot, cancelled: None if snapshot is None else snapshot,
+                                applied.append)
+    scheduler.request(None)
+    scheduler.request("done")
+    master.pump()
+    assert applied == ["done"]
+    scheduler.close()
+
+
+def test_errors_go_to_on_error():
+    master = FakeMaster()
+    errors = []
+
+    def render(snapshot, cancelled):
+        raise ValueError(snapshot)
+
+    scheduler = RenderScheduler(master, render, lambda result: None, errors.append)
+    scheduler.request("broken")
+    master.pump()
+    assert [str(e) for e in errors] == ["broken"]
+    scheduler.close()
+
+
+def test_close_stops_the_worker():
+    master = FakeMaster()
+    applied = []
+    scheduler = RenderScheduler(master, lambda snapshot, cancelled: snapshot, applied.append)
+    scheduler.close()
+    scheduler.worker.join(TIMEOUT)
+    assert not scheduler.worker.is_alive()
+    scheduler.request("late")
+    assert master.calls.empty()
+    assert applied == []
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from review_scheduler import DAY, INITIAL_EASE, MIN_EASE, RELEARN_SECONDS, Prefetcher, ReviewScheduler, sm2
+
+
+def test_sm2_intervals():
+    state = sm2(None, 4, now=0)
+    assert state == {'ease': INITIAL_EASE, 'interval': 1, 'reps': 1, 'due': DAY, 'last': 0}
+    state = sm2(state, 4, now=DAY)
+    assert (state['interval'], state['reps'], state['due']) == (6, 2, 7 * DAY)
+    state = sm2(state, 5, now=7 * DAY)
+    assert state['interval'] == round(6 * INITIAL_EASE)
+    assert state['ease'] == pytest.approx(INITIAL_EASE + 0.1)
+
+
+def test_sm2_failure_and_ease_floor():
+    state = sm2(None, 4, now=0)
+    state = sm2(state, 1, now=100)
+    assert (state['interval'], state['reps'], state['due']) == (0, 0, 100 + RELEARN_SECONDS)
+    assert state['ease'] < INITIAL_EASE
+    for _ in range(20):
+        state = sm2(state, 1, now=100)
+    assert state['ease'] == MIN_EASE
+
+
+def expected_queue(scheduler, now):
+    # What a scan of every concept would show, in order
+    due = sorted((due, key) for key, due in scheduler.due.items() if due <= now)
+    new = list(scheduler.new)[:max(scheduler.new_left, 0)]
+    return [key for _, key in due] + new
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_queue_and_counts_match_a_scan(seed):
+    rng = random.Random(seed)
+    data = {f"k{i}": ({'review': {'due': rng.uniform(0, 100)}} if rng.random() < 0.7 else {})
+            for i in range(rng.randint(0, 30))}
+    scheduler = ReviewScheduler(data, new_per_session=rng.randint(0, 10))
+    states = {}
+    now = 0.0
+    for step in range(60):
+        choice = rng.random()
+        keys = list(scheduler.due) + list(scheduler.new)
+        if choice < 0.3 and keys:
+            key = rng.choice(keys)
+            states[key] = scheduler.grade(key, states.get(key), rng.choice([1, 3, 4, 5]), now=rng.uniform(-50, 100))
+        elif choice < 0.4 and keys:
+            scheduler.discard(rng.choice(keys))
+        elif choice < 0.5:
+            scheduler.add_concept(f"n{step}")
+        else:
+            # Mostly forwards, now and then backwards
+            now += rng.uniform(0, 10) if rng.random() < 0.9 else -rng.uniform(0, 20)
+        expected = expected_queue(scheduler, now)
+        assert scheduler.next_card(now) == (expected[0] if expected else None)
+        assert scheduler.upcoming(5, now) == expected[:5]
+        assert scheduler.due_count(now) == sum(1 for due in scheduler.due.values() if due <= now)
+        assert scheduler.new_count() == min(len(scheduler.new), max(scheduler.new_left, 0))
+        assert scheduler.next_due() == min(scheduler.due.values(), default=None)
+        assert len(scheduler) == len(scheduler.due) + len(scheduler.new)
+
+
+def test_prefetched_details():
+    data = {'a': {'next': ['b'], 'text': ['x']}}
+    prefetcher = Prefetcher(data)
+    prefetcher.prefetch(['a', 'missing'])
+    prefetcher.executor.shutdown(wait=True)
+    assert prefetcher.ready == {'a': (['b'], ['x'])}
+    data['a']['text'].append('y')
+    prefetcher.forget('a')
+    assert prefetcher.details('a') == (['b'], ['x', 'y'])
+    assert prefetcher.details('missing') is None
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from search_index import SearchIndex
+
+WORDS = ["graph", "Graphs", "tree", "theory", "set", "é-accent", "naïve", "x", "ab", "a.b", "A-B", "0-1"]
+
+
+def linear_search(data, query):
+    # The scan the index replaced
+    query = query.lower()
+    results = []
+    for key, value in data.items():
+        if query in key.lower():
+            results.append((key, "Key", key))
+        for next_item in value['next']:
+            if query in next_item.lower():
+                results.append((key, "Next", next_item))
+        for text_item in value['text']:
+            if query in text_item.lower():
+                results.append((key, "Text", text_item))
+    return results
+
+
+def random_data(rng):
+    def phrase():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+    data = {}
+    for _ in range(rng.randint(1, 12)):
+        data[phrase()] = {'next': [phrase() for _ in range(rng.randint(0, 3))],
+                          'text': [phrase() for _ in range(rng.randint(0, 3))]}
+    return data
+
+
+def queries(rng, data):
+    for _ in range(20):
+        source = rng.choice([key for key in data] + [text for value in data.values() for text in value['text']])
+        start = rng.randrange(len(source))
+        yield source[start:start + rng.randint(1, 8)]
+    yield from ("", " ", "-", "gra", "aph th", "zzz", "GRAPH")
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_matches_linear_scan(seed):
+    rng = random.Random(seed)
+    data = random_data(rng)
+    with_data = SearchIndex(data)
+    standalone = SearchIndex()
+    for key, value in data.items():
+        standalone.add_value(key, value)
+    for query in queries(rng, data):
+        expected = linear_search(data, query)
+        assert with_data.search(query) == expected, query
+        assert standalone.search(query) == expected, query
+
+
+def test_incremental_adds_keep_scan_order():
+    data = {"b": {'next': [], 'text': ["shared text"]}}
+    index = SearchIndex(data)
+    data["a"] = {'next': [], 'text': []}
+    index.add_concept("a")
+    data["b"]['next'].append("shared next")
+    index.add_next("b", "shared next")
+    data["a"]['text'].append("also shared")
+    index.add_text("a", "also shared")
+    assert index.search("shared") == linear_search(data, "shared")
+
+
+def test_text_is_read_back_from_data():
+    # With data given the index keeps positions, not the bodies
+    data = {"k": {'next': [], 'text': ["original body"]}}
+    index = SearchIndex(data)
+    assert all(not isinstance(entry[3], str) or entry[2] != "Text" for entry in index.entries)
+    assert index.search("body") == [("k", "Text", "original body")]
@@ -0,0 +1,105 @@
+import random
+
+import numpy as np
+import pytest
+
+from spatial_index import SegmentIndex, SpatialIndex
+
+
+def random_points(rng):
+    count = rng.randint(1, 200)
+    shape = rng.choice(["uniform", "chain", "clustered", "duplicates"])
+    if shape == "uniform":
+        return [(rng.random(), -rng.random()) for _ in range(count)]
+    if shape == "chain":
+        # One flat axis, like a single deep component
+        return [(0.5, -i / count) for i in range(count)]
+    if shape == "clustered":
+        return [(rng.gauss(0, 0.01) + rng.choice([0, 5]), rng.gauss(0, 0.01)) for _ in range(count)]
+    return [(rng.choice([0, 1]), rng.choice([0, 1])) for _ in range(count)]
+
+
+def query_point(rng, points):
+    if rng.random() < 0.5:
+        x, y = rng.choice(points)
+        return x + rng.uniform(-0.1, 0.1), y + rng.uniform(-0.1, 0.1)
+    # Far outside the points as well
+    return rng.uniform(-20, 20), rng.uniform(-20, 20)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_queries_match_a_scan(seed):
+    rng = random.Random(seed)
+    points = random_points(rng)
+    keys = [f"n{i}" for i in range(len(points))]
+    position = dict(zip(keys, points))
+    index = SpatialIndex(keys, points)
+    assert len(index) == len(points)
+    for _ in range(20):
+        x, y = query_point(rng, points)
+        distances = {key: (px - x) ** 2 + (py - y) ** 2 for key, (px, py) in position.items()}
+
+        nearest = index.nearest(x, y)
+        # Several points may be equally close, any of them will do
+        assert distances[nearest] == pytest.approx(min(distances.values()))
+
+        radius = rng.uniform(0, 0.5)
+        assert sorted(index.within_radius(x, y, radius)) == sorted(
+            key for key, dist in distances.items() if dist <= radius ** 2)
+
+        x1, y1 = query_point(rng, points)
+        assert sorted(index.in_rect(x, y, x1, y1)) == sorted(
+            key for key, (px, py) in position.items()
+            if min(x, x1) <= px <= max(x, x1) and min(y, y1) <= py <= max(y, y1))
+
+
+def test_empty_index():
+    index = SpatialIndex([], [])
+    assert len(index) == 0
+    assert index.nearest(0, 0) is None
+    assert index.within_radius(0, 0, 1) == []
+    assert index.in_rect(0, 0, 1, 1) == []
+
+
+def test_single_point():
+    index = SpatialIndex(["a"], np.array([[0.25, -0.5]]))
+    assert index.nearest(100, 100) == "a"
+    assert index.in_rect(0, 0, 1, -1) == ["a"]
+    assert index.within_radius(0.25, -0.5, 0) == ["a"]
+
+
+def random_segments(rng):
+    count = rng.randint(1, 150)
+    segments = []
+    for _ in range(count):
+        x, y = rng.random() * 10, rng.random() * 10
+        if rng.random() < 0.1:
+            # Long edges, kept aside from the grid
+            segments.append([[x, y], [rng.random() * 10, rng.random() * 10]])
+        elif rng.random() < 0.1:
+            segments.append([[x, y], [x, y]])
+        else:
+            segments.append([[x, y], [x + rng.uniform(-0.5, 0.5), y + rng.uniform(-0.5, 0.5)]])
+    return np.array(segments)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_segments_in_rect_match_a_scan(seed):
+    rng = random.Random(seed)
+    segments = random_segments(rng)
+    index = SegmentIndex(segments)
+    assert len(index) == len(segments)
+    low = segments.min(axis=1)
+    high = segments.max(axis=1)
+    for _ in range(20):
+        x0, x1 = rng.uniform(-1, 11), rng.uniform(-1, 11)
+        y0, y1 = rng.uniform(-1, 11), rng.uniform(-1, 11)
+        expected = np.flatnonzero((high[:, 0] >= min(x0, x1)) & (low[:, 0] <= max(x0, x1)) &
+                                  (high[:, 1] >= min(y0, y1)) & (low[:, 1] <= max(y0, y1)))
+        assert index.in_rect(x0, y0, x1, y1).tolist() == expected.tolist()
+
+
+def test_empty_segment_index():
+    index = SegmentIndex(np.empty((0, 2, 2)))
+    assert len(index) == 0
+    assert index.in_rect(0, 0, 1, 1).tolist() == []
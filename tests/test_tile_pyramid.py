@@ -0,0 +1,47 @@
+import math
+import random
+
+import pytest
+
+from mind_map_renderer import MindMapModel
+from tile_pyramid import TilePyramid, snap_to_grid
+from tree_layout import layout_component
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_snap_to_grid(seed):
+    rng = random.Random(seed)
+    low = rng.uniform(-1000, 1000) * 10 ** rng.randint(-3, 0)
+    high = low + rng.uniform(1e-3, 100)
+    start, extent, scale = snap_to_grid(low, high)
+    assert extent == 2.0 ** scale
+    assert start <= low and start + extent >= high
+    assert start / (extent / 2) == math.floor(start / (extent / 2))
+    # Half the extent would not fit from any aligned start
+    half = extent / 2
+    assert math.floor(low / (half / 2)) * (half / 2) + half < high
+
+
+def frame_of(snapshot):
+    model = MindMapModel(layout_component)
+    model.sync(snapshot)
+    return model.frame()
+
+
+def tiles(pyramid):
+    return {pyramid.tile(key) for key in pyramid.prerender_keys()}
+
+
+def test_edit_keeps_the_tiles_it_does_not_touch(tmp_path):
+    snapshot = {f"a{i}": (f"a{i + 1}",) for i in range(30)}
+    snapshot.update({f"b{i}": (f"b{i + 1}",) for i in range(30)})
+    before = TilePyramid(frame_of(snapshot), str(tmp_path))
+    paths = tiles(before)
+
+    # The same edit twice renders nothing new
+    assert tiles(TilePyramid(frame_of(snapshot), str(tmp_path))) == paths
+
+    snapshot["b30"] = ("b31",)
+    after_paths = tiles(TilePyramid(frame_of(snapshot), str(tmp_path)))
+    assert paths & after_paths
+    assert after_paths - paths
@@ -0,0 +1,100 @@
+import random
+
+import networkx as nx
+import pytest
+
+from tree_layout import (COMPONENT_SPACING, close_pool, connected_components, layout_component,
+                         layout_components, layout_root, tree_layout)
+
+
+def recursive_layout(G, root):
+    # The custom_tree_layout of the original apps, for one component
+    tree = nx.bfs_tree(G, root)
+    pos = {}
+    level_width = {}
+    max_depth = 0
+
+    def dfs(node, depth, order):
+        nonlocal max_depth
+        max_depth = max(max_depth, depth)
+        level_width[depth] = level_width.get(depth, 0) + 1
+        children = list(tree.successors(node))
+        if not children:
+            pos[node] = (order, -depth)
+            return order + 1
+        start = order
+        for child in children:
+            order = dfs(child, depth + 1, order)
+        pos[node] = (start + (order - start - 1) / 2, -depth)
+        return order
+
+    dfs(root, 0, 0)
+    width = max(level_width.values())
+    return {node: (x / width, y / max_depth if max_depth else 0) for node, (x, y) in pos.items()}
+
+
+def random_graph(rng):
+    count = rng.randint(1, 40)
+    G = nx.Graph()
+    G.add_nodes_from(f"n{i}" for i in rng.sample(range(count), count))
+    nodes = list(G)
+    for _ in range(rng.randint(0, 2 * count)):
+        G.add_edge(rng.choice(nodes), rng.choice(nodes))
+    return G
+
+
+def assert_same_positions(actual, expected):
+    assert actual.keys() == expected.keys()
+    for node, (x, y) in expected.items():
+        assert actual[node] == pytest.approx((x, y))
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_layout_matches_recursive_layout(seed):
+    G = random_graph(random.Random(seed))
+    for component in connected_components(G):
+        root = layout_root(G, component)
+        assert_same_positions(layout_component(G, component), recursive_layout(G, root))
+
+
+def test_components_are_stacked():
+    G = nx.Graph([("a", "b"), ("c", "d"), ("d", "e")])
+    G.add_node("f")
+    pos = tree_layout(G)
+    # Roots are b and d, the highest degree sorting last
+    assert pos["b"][1] == 0
+    assert pos["a"][1] == -1
+    assert pos["d"][1] == -COMPONENT_SPACING
+    assert pos["c"][1] == -1 - COMPONENT_SPACING
+    assert pos["f"] == (0, -2 * COMPONENT_SPACING)
+
+
+def test_empty_graph():
+    assert tree_layout(nx.Graph()) == {}
+
+
+def test_deep_chain_does_not_recurse():
+    G = nx.path_graph(20000)
+    pos = layout_component(G, list(G), root=0)
+    assert pos[0] == (0, 0)
+    assert pos[19999] == (0, -1)
+
+
+def test_root_ignores_insertion_order():
+    edges = [("a", "b"), ("c", "d"), ("b", "c"), ("e", "e")]
+    forward = nx.Graph(edges)
+    backward = nx.Graph(list(reversed(edges)))
+    assert layout_root(forward, list(forward)) == layout_root(backward, list(backward))
+    assert layout_root(nx.Graph([("x", "x"), ("x", "y")]), ["x", "y"]) == "x"
+
+
+def test_pool_matches_serial():
+    rng = random.Random(7)
+    G = nx.disjoint_union_all([random_graph(rng) for _ in range(30)])
+    jobs = [(component, None) for component in connected_components(G)]
+    try:
+        parallel = layout_components(G, jobs, workers=2, min_nodes=0)
+    finally:
+        close_pool()
+    for layout, expected in zip(parallel, layout_components(G, jobs, workers=1)):
+        assert_same_positions(layout, expected)
@@ -0,0 +1,223 @@
+import hashlib
+import math
+import os
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from concept_store import STORE_PATH
+from spatial_index import SegmentIndex
+
+# Rendered tiles are kept next to nested_dictionary.json, shared by every
+# version of the map, the least recently used ones are deleted past
+# MAX_CACHED_TILES
+TILE_CACHE_DIR = os.path.splitext(STORE_PATH)[0] + ".tiles"
+MAX_CACHED_TILES = 4096
+
+# Square tiles of TILE_SIZE pixels, level n is 2**n tiles wide and high
+TILE_SIZE = 256
+TILE_DPI = 100
+
+# Levels rendered as soon as a map is shown, deeper ones when first viewed
+PRERENDER_LEVELS = 3
+
+# The deepest level leaves about NODE_SPACING pixels between nodes
+NODE_SPACING = 80
+MAX_LEVELS = 10
+
+# Nodes are NODE_PIXELS wide at the deepest level and half as wide on every
+# level above it, down to MIN_NODE_PIXELS. Labels are only drawn on levels
+# where nodes are full size and reach at most LABEL_PIXELS from their node.
+NODE_PIXELS = 24
+MIN_NODE_PIXELS = 2
+FONT_SIZE = 8
+LABEL_PIXELS = 40
+
+# Tiles holding more nodes than this are drawn without labels
+MAX_TILE_LABELS = 60
+
+
+class TilePyramid:
+    # Image tiles of one RenderFrame at several zoom levels. Level 0 shows the
+    # whole map in a single tile, every level doubles the width and height in
+    # pixels. A tile is rendered with Agg from only the nodes and edges that
+    # overlap it, written to disk once and read from there afterwards, so
+    # panning and zooming cost the same however big the graph is. Tiles are
+    # rendered on a worker thread; the geometry helpers are cheap enough for
+    # the main thread.
+    #
+    # The pyramid sits on a power-of-two grid in world space, so a tile
+    # covers the same region from one frame to the next. A tile's file is
+    # named after that region and a digest of the nodes and edges drawn in
+    # it: an edit only renders the tiles that overlap what it moved, every
+    # other tile of the previous frame is reused.
+
+    def __init__(self, frame, cache_dir=TILE_CACHE_DIR):
+        self.frame = frame
+        self.cache_dir = cache_dir
+        offsets = frame.offsets
+        if len(offsets):
+            low = offsets.min(axis=0)
+            high = offsets.max(axis=0)
+        else:
+            low = np.zeros(2)
+            high = np.ones(2)
+        margin = (high - low) * 0.05
+        margin[margin == 0] = 0.5
+        grid_x = snap_to_grid(low[0] - margin[0], high[0] + margin[0])
+        grid_y = snap_to_grid(low[1] - margin[1], high[1] + margin[1])
+        self.origin = np.array([grid_x[0], grid_y[0]])
+        self.extent = np.array([grid_x[1], grid_y[1]])
+        self.scale = (grid_x[2], grid_y[2])
+        self.levels = levels_for(len(offsets))
+        self.pruned = False
+        self.prerendered = False
+        # Built on the worker thread by the first tile()
+        self.segment_index = None
+
+    def size(self, level):
+        return TILE_SIZE << level
+
+    def node_pixels(self, level):
+        return max(MIN_NODE_PIXELS, NODE_PIXELS >> (self.levels - 1 - level))
+
+    def to_world(self, level, px, py):
+        # Pixel y grows downwards, world y upwards
+        size = self.size(level)
+        return (self.origin[0] + px / size * self.extent[0],
+                self.origin[1] + self.extent[1] - py / size * self.extent[1])
+
+    def to_pixel(self, level, x, y):
+        size = self.size(level)
+        return ((x - self.origin[0]) / self.extent[0] * size,
+                (self.origin[1] + self.extent[1] - y) / self.extent[1] * size)
+
+    def tiles_in(self, level, left, top, right, bottom):
+        count = 1 << level
+        tx0 = max(0, int(left // TILE_SIZE))
+        ty0 = max(0, int(top // TILE_SIZE))
+        tx1 = min(count - 1, int(right // TILE_SIZE))
+        ty1 = min(count - 1, int(bottom // TILE_SIZE))
+        return [(level, tx, ty) for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1)]
+
+    def prerender_keys(self):
+        levels = min(PRERENDER_LEVELS, self.levels)
+        return [(level, tx, ty) for level in range(levels)
+                for ty in range(1 << level) for tx in range(1 << level)]
+
+    def tile(self, key):
+        # Path of the tile's PNG, rendered first if it is not on disk yet
+        if not self.pruned:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            prune(self.cache_dir)
+            self.pruned = True
+        contents = self.contents(key)
+        path = os.path.join(self.cache_dir, f"{self.region(key)}_{tile_digest(self.frame, *contents)}.png")
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            self.render_tile(key, contents, tmp_path)
+            os.replace(tmp_path, path)
+        return path
+
+    def region(self, key):
+        # World-space name of the tile: its size as a power of two on either
+        # axis and its lower left corner in half tiles
+        level = key[0]
+        scale_x = self.scale[0] - level
+        scale_y = self.scale[1] - level
+        x0, y0, _, _ = self.bounds(key)
+        return f"{scale_x}_{scale_y}_{round(x0 / 2.0 ** (scale_x - 1))}_{round(y0 / 2.0 ** (scale_y - 1))}"
+
+    def bounds(self, key):
+        level, tx, ty = key
+        x0, y1 = self.to_world(level, tx * TILE_SIZE, ty * TILE_SIZE)
+        x1, y0 = self.to_world(level, (tx + 1) * TILE_SIZE, (ty + 1) * TILE_SIZE)
+        return x0, y0, x1, y1
+
+    def contents(self, key):
+        # Node indices and segment indices drawn in the tile, nodes and labels
+        # near the border are drawn by both tiles
+        frame = self.frame
+        if self.segment_index is None:
+            self.segment_index = SegmentIndex(frame.segments)
+        x0, y0, x1, y1 = self.bounds(key)
+        pad_x = LABEL_PIXELS * (x1 - x0) / TILE_SIZE
+        pad_y = LABEL_PIXELS * (y1 - y0) / TILE_SIZE
+        keys = frame.spatial_index.in_rect(x0 - pad_x, y0 - pad_y, x1 + pad_x, y1 + pad_y)
+        indices = sorted(frame.node_index[key] for key in keys)
+        return indices, self.segment_index.in_rect(x0, y0, x1, y1), self.node_pixels(key[0])
+
+    def render_tile(self, key, contents, path):
+        frame = self.frame
+        indices, crossing, node_pixels = contents
+        x0, y0, x1, y1 = self.bounds(key)
+        units_y = (y1 - y0) / TILE_SIZE
+
+        figure = Figure(figsize=(TILE_SIZE / TILE_DPI, TILE_SIZE / TILE_DPI), dpi=TILE_DPI)
+        FigureCanvasAgg(figure)
+        ax = figure.add_axes([0, 0, 1, 1])
+        ax.set_xlim(x0, x1)
+        ax.set_ylim(y0, y1)
+        ax.axis('off')
+        ax.add_collection(LineCollection(frame.segments[crossing], colors='gray', linewidths=1, alpha=0.7, zorder=1))
+        if indices:
+            points = frame.offsets[indices]
+            node_points = node_pixels * 72 / TILE_DPI
+            ax.scatter(points[:, 0], points[:, 1], s=node_points ** 2, c='lightblue', alpha=0.8, zorder=2)
+        if node_pixels == NODE_PIXELS and len(indices) <= MAX_TILE_LABELS:
+            line_height = FONT_SIZE * 1.2 * TILE_DPI / 72 * units_y
+            for i in indices:
+                x, y = frame.offsets[i]
+                lines = frame.label_lines[i]
+                start_y = y + (len(lines) - 1) * line_height / 2
+                for j, line in enumerate(lines):
+                    ax.text(x, start_y - j * line_height, line, fontsize=FONT_SIZE, fontweight='bold',
+                            horizontalalignment='center', verticalalignment='center', zorder=3)
+        figure.savefig(path, format='png', dpi=TILE_DPI)
+
+
+def levels_for(node_count):
+    # Enough levels for roughly sqrt(n) nodes side by side NODE_SPACING apart
+    pixels = math.sqrt(max(node_count, 1)) * NODE_SPACING
+    return max(1, min(MAX_LEVELS, math.ceil(math.log2(max(pixels / TILE_SIZE, 1))) + 1))
+
+
+def snap_to_grid(low, high):
+    # Smallest power-of-two extent, starting at a multiple of half of it,
+    # that holds [low, high]; returns the start, the extent and its exponent.
+    # Every tile below the top one then starts at a multiple of its own size.
+    scale = math.ceil(math.log2(high - low))
+    while True:
+        start = math.floor(low / 2.0 ** (scale - 1)) * 2.0 ** (scale - 1)
+        if start + 2.0 ** scale >= high:
+            return start, 2.0 ** scale, scale
+        scale += 1
+
+
+def tile_digest(frame, indices, crossing, node_pixels):
+    # Everything a tile is drawn from, so a tile is rendered again exactly
+    # when a node or edge overlapping it moved, appeared or went away
+    digest = hashlib.sha256(str(node_pixels).encode('ascii'))
+    for i in indices:
+        digest.update('\0'.join(frame.label_lines[i]).encode('utf-8') + b'\1')
+    digest.update(np.ascontiguousarray(frame.offsets[indices]).tobytes())
+    segments = frame.segments[crossing].reshape(-1, 4)
+    # The same edges may be numbered differently in the next frame
+    segments = segments[np.lexsort(segments.T[::-1])] if len(segments) else segments
+    digest.update(np.ascontiguousarray(segments).tobytes())
+    return digest.hexdigest()[:32]
+
+
+def prune(cache_dir, keep=MAX_CACHED_TILES):
+    # Only the most recently used tiles stay on disk
+    tiles = sorted((entry for entry in os.scandir(cache_dir) if entry.name.endswith(".png")),
+                   key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in tiles[keep:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
@@ -0,0 +1,296 @@
+import tkinter as tk
+from collections import OrderedDict
+
+from render_scheduler import RenderScheduler
+from tile_pyramid import TILE_SIZE
+
+# Tile images kept around once they scroll out of view
+MAX_TILE_IMAGES = 96
+
+# A press that moves less than this many pixels is a click, not a drag
+CLICK_PIXELS = 4
+
+# Highlight markers are this much wider than the nodes they cover
+HIGHLIGHT_PIXELS = 4
+
+
+class TileView:
+    # Shows a TilePyramid on an existing canvas in place of the matplotlib
+    # figure window. The scroll region is the size of the current level, the
+    # tiles in view are placed as canvas images and the missing ones are
+    # rendered on a RenderScheduler worker, so a pan or zoom only ever costs
+    # the tiles on screen. Drag or the wheel pans, Ctrl+wheel zooms one level
+    # around the pointer, a click picks the nearest node and a right-drag
+    # selects a rectangle. The highlight is drawn with canvas items on top.
+
+    def __init__(self, master, canvas, window_item, scrollbars, on_click=None, on_select=None):
+        self.master = master
+        self.canvas = canvas
+        self.window_item = window_item
+        self.on_click = on_click
+        self.on_select = on_select
+        self.pyramid = None
+        self.level = 0
+        self.active = False
+        self.images = OrderedDict()
+        self.requested = None
+        self.update_pending = False
+        self.press = None
+        self.rect_item = None
+        self.highlighted = None
+        self.selection = []
+
+        x_scrollbar, y_scrollbar = scrollbars
+        self.canvas.configure(xscrollcommand=lambda *args: self.on_scroll(x_scrollbar, *args),
+                              yscrollcommand=lambda *args: self.on_scroll(y_scrollbar, *args))
+        self.scheduler = RenderScheduler(master, self.render_tiles, self.place_tiles)
+
+        canvas.bind("<Configure>", lambda event: self.schedule_update(), add="+")
+        canvas.bind("<ButtonPress-1>", self.on_press)
+        canvas.bind("<B1-Motion>", self.on_drag)
+        canvas.bind("<ButtonRelease-1>", self.on_release)
+        canvas.bind("<ButtonPress-3>", self.on_rect_press)
+        canvas.bind("<B3-Motion>", self.on_rect_drag)
+        canvas.bind("<ButtonRelease-3>", self.on_rect_release)
+        canvas.bind("<MouseWheel>", self.on_wheel)
+        canvas.bind("<Control-MouseWheel>", lambda event: self.zoom(1 if event.delta > 0 else -1, event.x, event.y))
+        canvas.bind("<Button-4>", lambda event: self.scroll(-3))
+        canvas.bind("<Button-5>", lambda event: self.scroll(3))
+        canvas.bind("<Control-Button-4>", lambda event: self.zoom(1, event.x, event.y))
+        canvas.bind("<Control-Button-5>", lambda event: self.zoom(-1, event.x, event.y))
+
+    def show(self, pyramid):
+        # Swaps in the pyramid of a new frame, keeping level and scroll position
+        first = not self.active
+        view = (self.canvas.xview()[0], self.canvas.yview()[0])
+        self.pyramid = pyramid
+        self.active = True
+        self.clear_tiles()
+        self.canvas.itemconfigure(self.window_item, state="hidden")
+        if first:
+            self.level = self.fit_level()
+        self.level = min(self.level, pyramid.levels - 1)
+        self.set_region()
+        if not first:
+            self.canvas.xview_moveto(view[0])
+            self.canvas.yview_moveto(view[1])
+        self.draw_highlight()
+        self.update_tiles()
+
+    def hide(self):
+        if not self.active:
+            return
+        self.active = False
+        self.pyramid = None
+        self.scheduler.request(None)
+        self.clear_tiles()
+        self.canvas.delete("highlight")
+        self.canvas.itemconfigure(self.window_item, state="normal")
+        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+
+    def close(self):
+        self.scheduler.close()
+
+    def fit_level(self):
+        # Smallest level that fills the canvas
+        fill = max(self.canvas.winfo_width(), self.canvas.winfo_height())
+        level = 0
+        while TILE_SIZE << level < fill and level < self.pyramid.levels - 1:
+            level += 1
+        return level
+
+    def set_region(self):
+        size = self.pyramid.size(self.level)
+        self.canvas.configure(scrollregion=(0, 0, size, size))
+
+    def clear_tiles(self):
+        self.canvas.delete("tile")
+        self.images.clear()
+        self.requested = None
+
+    def visible_tiles(self):
+        left = self.canvas.canvasx(0)
+        top = self.canvas.canvasy(0)
+        return self.pyramid.tiles_in(self.level, left, top,
+                                     left + self.canvas.winfo_width(), top + self.canvas.winfo_height())
+
+    def on_scroll(self, scrollbar, *args):
+        scrollbar.set(*args)
+        self.schedule_update()
+
+    def schedule_update(self):
+        if self.active and not self.update_pending:
+            self.update_pending = True
+            self.master.after_idle(self.update_tiles)
+
+    def update_tiles(self):
+        self.update_pending = False
+        if not self.active:
+            return
+        visible = self.visible_tiles()
+        for key in visible:
+            if key in self.images:
+                self.images.move_to_end(key)
+        missing = tuple(key for key in visible if key not in self.images)
+        if missing:
+            request = missing
+        elif not self.pyramid.prerendered:
+            # Once the view is complete the shallow levels are filled in
+            request = ()
+        else:
+            request = None
+        if request is not None and request != self.requested:
+            self.requested = request
+            self.scheduler.request((self.pyramid, request))
+
+        while len(self.images) > MAX_TILE_IMAGES:
+            key, (image, item) = self.images.popitem(last=False)
+            self.canvas.delete(item)
+
+    def render_tiles(self, request, cancelled):
+        # Worker thread: only paths travel back, images are made on the Tk thread
+        if request is None:
+            return None
+        pyramid, keys = request
+        paths = []
+        for key in keys or pyramid.prerender_keys():
+            if cancelled():
+                return None
+            paths.append((key, pyramid.tile(key)))
+        if not keys:
+            pyramid.prerendered = True
+        return pyramid, paths
+
+    def place_tiles(self, result):
+        pyramid, paths = result
+        if pyramid is not self.pyramid:
+            return
+        self.requested = None
+        for key, path in paths:
+            level, tx, ty = key
+            if level != self.level or key in self.images:
+                continue
+            image = tk.PhotoImage(file=path)
+            item = self.canvas.create_image(tx * TILE_SIZE, ty * TILE_SIZE, image=image, anchor=tk.NW, tags=("tile",))
+            self.images[key] = (image, item)
+        self.canvas.tag_raise("highlight")
+        self.update_tiles()
+
+    def zoom(self, step, x, y):
+        if not self.active:
+            return
+        level = max(0, min(self.pyramid.levels - 1, self.level + step))
+        if level == self.level:
+            return "break"
+        # Keep the point under the pointer in place
+        old_size = self.pyramid.size(self.level)
+        fx = self.canvas.canvasx(x) / old_size
+        fy = self.canvas.canvasy(y) / old_size
+        self.level = level
+        size = self.pyramid.size(level)
+        self.clear_tiles()
+        self.set_region()
+        self.canvas.xview_moveto((fx * size - x) / size)
+        self.canvas.yview_moveto((fy * size - y) / size)
+        self.draw_highlight()
+        self.update_tiles()
+        return "break"
+
+    def scroll(self, units):
+        if not self.active:
+            return
+        self.canvas.yview_scroll(units, "units")
+        return "break"
+
+    def on_wheel(self, event):
+        return self.scroll(-1 if event.delta > 0 else 1)
+
+    def on_press(self, event):
+        if not self.active:
+            return
+        self.press = (event.x, event.y)
+        self.canvas.scan_mark(event.x, event.y)
+
+    def on_drag(self, event):
+        if self.active and self.press is not None:
+            self.canvas.scan_dragto(event.x, event.y, gain=1)
+
+    def on_release(self, event):
+        if not self.active or self.press is None:
+            return
+        x, y = self.press
+        self.press = None
+        if abs(event.x - x) + abs(event.y - y) > CLICK_PIXELS:
+            return
+        node = self.pyramid.frame.spatial_index.nearest(*self.world_at(event.x, event.y))
+        if node is not None and self.on_click is not None:
+            self.on_click(node)
+
+    def on_rect_press(self, event):
+        if not self.active:
+            return
+        x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        self.press = (event.x, event.y)
+        self.rect_item = self.canvas.create_rectangle(x, y, x, y, outline="red", dash=(4, 2), tags=("highlight",))
+
+    def on_rect_drag(self, event):
+        if self.active and self.rect_item is not None:
+            x, y = self.press
+            self.canvas.coords(self.rect_item, self.canvas.canvasx(x), self.canvas.canvasy(y),
+                               self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+
+    def on_rect_release(self, event):
+        if not self.active or self.rect_item is None:
+            return
+        self.canvas.delete(self.rect_item)
+        self.rect_item = None
+        x0, y0 = self.world_at(*self.press)
+        x1, y1 = self.world_at(event.x, event.y)
+        self.press = None
+        nodes = self.pyramid.frame.spatial_index.in_rect(x0, y0, x1, y1)
+        if self.on_select is not None:
+            self.on_select(nodes)
+
+    def world_at(self, x, y):
+        return self.pyramid.to_world(self.level, self.canvas.canvasx(x), self.canvas.canvasy(y))
+
+    def show_node(self, node):
+        self.highlighted = node
+        self.selection = []
+        self.draw_highlight()
+
+    def show_selection(self, nodes):
+        self.highlighted = None
+        self.selection = list(nodes)
+        self.draw_highlight()
+
+    def draw_highlight(self):
+        # Same colours as HighlightOverlay, redrawn at every level change
+        self.canvas.delete("highlight")
+        frame = self.pyramid.frame
+        if self.highlighted is not None and self.highlighted not in frame.node_index:
+            self.highlighted = None
+        self.selection = [node for node in self.selection if node in frame.node_index]
+
+        if self.highlighted is not None:
+            node = self.highlighted
+            cx, cy = self.pixel_of(node)
+            neighbors = [n for n in frame.G[node] if n != node]
+            for neighbor in neighbors:
+                self.canvas.create_line(cx, cy, *self.pixel_of(neighbor), fill="red", width=2, tags=("highlight",))
+            for neighbor in neighbors:
+                self.draw_marker(neighbor, "yellow")
+            self.draw_marker(node, "red")
+        for node in self.selection:
+            self.draw_marker(node, "red")
+
+    def pixel_of(self, node):
+        frame = self.pyramid.frame
+        x, y = frame.offsets[frame.node_index[node]]
+        return self.pyramid.to_pixel(self.level, x, y)
+
+    def draw_marker(self, node, color):
+        x, y = self.pixel_of(node)
+        r = (self.pyramid.node_pixels(self.level) + HIGHLIGHT_PIXELS) / 2
+        self.canvas.create_oval(x - r, y - r, x + r, y + r, fill=color, outline="", stipple="gray50",
+                                tags=("highlight",))
@@ -0,0 +1,183 @@
+# Tree layout shared by the Tk, future and Streamlit apps. Same algorithm as
+# the old recursive custom_tree_layout, with a deterministic child order:
+# every component is turned into a BFS tree from its highest-degree node
+# (ties go to the name sorting last), leaves get consecutive x slots in DFS
+# order, parents sit over the middle of their leaves, and x/y are normalised
+# by the widest level and the deepest level. Everything is iterative and
+# linear in the size of the component, so deep chains cannot hit the
+# recursion limit.
+# Large batches of components are laid out in parallel on a process pool.
+
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Vertical gap between stacked components
+COMPONENT_SPACING = 1.5
+
+# Components are sent to the workers in chunks of about this many nodes
+CHUNK_NODES = 5000
+
+# A batch of components goes to the process pool once it fills two chunks,
+# the least that keeps two workers busy. Laying out costs about 5.5us a node
+# here; with the pool it is 2.7us a node of copying and pickling in this
+# process plus 4.1us a node in the workers, so two workers only start to win
+# once the batch splits in two, and smaller batches stay here.
+# REVISION_LAYOUT_WORKERS=1 keeps every layout in the calling process.
+PARALLEL_MIN_NODES = 2 * CHUNK_NODES
+LAYOUT_WORKERS = int(os.environ.get("REVISION_LAYOUT_WORKERS", 0)) or os.cpu_count() or 1
+
+# All layout_component reads of a graph, cheap to send to a worker
+Adjacency = namedtuple('Adjacency', ['adj'])
+
+pool = None
+
+
+def tree_layout(G, layout_many=None):
+    # layout_many replaces layout_components, e.g. with a cached version
+    layout_many = layout_many or layout_components
+    components = list(connected_components(G))
+    pos = {}
+    y_offset = 0
+    for layout in layout_many(G, [(component, None) for component in components]):
+        for node, (x, y) in layout.items():
+            pos[node] = (x, y + y_offset)
+        y_offset -= COMPONENT_SPACING  # Increase vertical separation between components
+    return pos
+
+
+def layout_components(G, jobs, workers=LAYOUT_WORKERS, min_nodes=PARALLEL_MIN_NODES):
+    # layout_component of every (component, root) job, in job order. Each
+    # worker gets the adjacency of its components only, in G's order, so
+    # the positions are the same as laying them out here.
+    if workers <= 1 or len(jobs) < 2 or sum(len(component) for component, _ in jobs) < min_nodes:
+        return [layout_component(G, component, root) for component, root in jobs]
+    adj = G.adj
+    chunks = []
+    chunk = []
+    size = 0
+    for component, root in jobs:
+        chunk.append((Adjacency({node: list(adj[node]) for node in component}), root))
+        size += len(component)
+        if size >= CHUNK_NODES:
+            chunks.append(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        chunks.append(chunk)
+    layouts = []
+    try:
+        for chunk_layouts in layout_pool(workers).map(layout_chunk, chunks):
+            layouts.extend(chunk_layouts)
+    except BrokenProcessPool:
+        # A worker died (or could not start), the next batch gets a new pool
+        close_pool()
+        return [layout_component(G, component, root) for component, root in jobs]
+    return layouts
+
+
+def layout_root(G, component):
+    # Highest degree (a self-loop counts twice), on a tie the name sorting
+    # last, the same rule as ComponentTracker.root_key, so the root only
+    # depends on the component and not on the order it was built in
+    adj = G.adj
+    return max(component, key=lambda n: (len(adj[n]) + (n in adj[n]), n))
+
+
+def layout_chunk(chunk):
+    # Runs in a pool worker
+    return [layout_component(graph, list(graph.adj), root) for graph, root in chunk]
+
+
+def layout_pool(workers=LAYOUT_WORKERS):
+    # Started once and kept, workers are spawned rather than forked because
+    # the apps call this from a render thread next to Tk
+    global pool
+    if pool is None:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return pool
+
+
+def close_pool():
+    global pool
+    if pool is not None:
+        # Waits for the workers to exit, left running they are torn down during
+        # interpreter shutdown and print "Bad file descriptor" errors
+        pool.shutdown(wait=True, cancel_futures=True)
+        pool = None
+
+
+def connected_components(G):
+    adj = G.adj
+    seen = set()
+    for start in adj:
+        if start in seen:
+            continue
+        seen.add(start)
+        component = [start]
+        for node in component:
+            for neighbor in adj[node]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    component.append(neighbor)
+        yield component
+
+
+def layout_component(G, component, root=None):
+    # root is layout_root(), pass it when it is already known
+    adj = G.adj
+    if root is None:
+        root = layout_root(G, component)
+
+    # BFS tree as flat arrays indexed by discovery order, children of a node
+    # are contiguous in children[] between child_start and child_end
+    nodes = [root]
+    index = {root: 0}
+    depth = [0]
+    children = []
+    child_start = []
+    child_end = []
+    i = 0
+    while i < len(nodes):
+        child_start.append(len(children))
+        for neighbor in adj[nodes[i]]:
+            if neighbor not in index:
+                index[neighbor] = len(nodes)
+                nodes.append(neighbor)
+                depth.append(depth[i] + 1)
+                children.append(index[neighbor])
+        child_end.append(len(children))
+        i += 1
+    count = len(nodes)
+
+    # Leaves per subtree, bottom-up
+    leaves = [0] * count
+    for i in range(count - 1, -1, -1):
+        if child_start[i] == child_end[i]:
+            leaves[i] = 1
+        else:
+            leaves[i] = sum(leaves[c] for c in children[child_start[i]:child_end[i]])
+
+    # First leaf slot of every subtree, top-down
+    start = [0] * count
+    for i in range(count):
+        slot = start[i]
+        for c in children[child_start[i]:child_end[i]]:
+            start[c] = slot
+            slot += leaves[c]
+
+    level_width = {}
+    for d in depth:
+        level_width[d] = level_width.get(d, 0) + 1
+    max_width = max(level_width.values())
+    max_depth = max(level_width)
+
+    # Normalize positions
+    pos = {}
+    for i, node in enumerate(nodes):
+        x = start[i] + (leaves[i] - 1) / 2
+        y = -depth[i]
+        pos[node] = (x / max_width, y / max_depth if max_depth != 0 else 0)
+    return pos
@@ -1,9 +1,43 @@
+import atexit
 import streamlit as st
 import networkx as nx
 import matplotlib.pyplot as plt
 import textwrap
 from io import BytesIO
-import uuid
+import os
+from concept_store import StorePool
+from render_cache import RenderCache, graph_digest
+from layout_cache import LayoutCache
+from review_scheduler import GRADES, ReviewScheduler
+
+# One database shared by every session and every server worker process
+USERS_DB = os.environ.get("REVISION_USERS_DB", "revision_users.db")
+
+# The server's own layout cache, the desktop apps keep theirs next to the
+# journal. Renders save it at most this often, shutdown saves the rest.
+LAYOUT_CACHE_PATH = os.path.splitext(USERS_DB)[0] + ".layouts.json"
+LAYOUT_SAVE_INTERVAL = 60
+
+
+@st.cache_resource
+def user_pool():
+    # Created once per worker process, reused across sessions and reruns
+    return StorePool(USERS_DB)
+
+
+@st.cache_resource
+def mind_map_cache():
+    # Rendered PNGs and layouts per user, shared by the worker's sessions
+    return RenderCache()
+
+
+@st.cache_resource
+def layout_cache():
+    # Component layouts shared by the worker's sessions
+    cache = LayoutCache(LAYOUT_CACHE_PATH)
+    atexit.register(cache.save)
+    return cache
+
 
 class RevisionApp:
     def __init__(self):
@@ -12,42 +46,58 @@ class RevisionApp:
         self.create_ui()
 
     def initialize_session_state(self):
-        if 'users' not in st.session_state:
-            st.session_state.users = {}
         if 'current_user' not in st.session_state:
             st.session_state.current_user = None
-        if 'user_sessions' not in st.session_state:
-            st.session_state.user_sessions = {}
+        if 'display_name' not in st.session_state:
+            st.session_state.display_name = None
 
     def handle_user_selection(self):
+        # The owner key of the concepts comes from the account, never from
+        # the typed name: only the access key handed out when the account
+        # was created signs in to it, on any worker and in any later session
         st.sidebar.title("User Selection")
-        user_name = st.sidebar.text_input("Enter your name:")
-        if st.sidebar.button("Set User"):
-            if user_name:
-                # Check if the username is already in use in this session
-                if user_name in st.session_state.user_sessions:
-                    st.sidebar.error(f"The name '{user_name}' is already in use. Please choose a different name.")
-                else:
-                    # Generate a unique session ID for this user
-                    session_id = str(uuid.uuid4())
-                    st.session_state.current_user = f"{user_name}_{session_id}"
-                    st.session_state.user_sessions[user_name] = session_id
-                    if st.session_state.current_user not in st.session_state.users:
-                        st.session_state.users[st.session_state.current_user] = {}
-                    st.success(f"User set to: {user_name}")
-                    st.experimental_rerun()
+        if st.session_state.current_user:
+            st.sidebar.write(f"Signed in as {st.session_state.display_name}")
+            if st.sidebar.button("Sign out"):
+                st.session_state.current_user = None
+                st.session_state.display_name = None
+                st.experimental_rerun()
+            return
+
+        user_name = st.sidebar.text_input("Enter your name:").strip()
+        access_key = st.sidebar.text_input("Access key:", type="password").strip()
+        if st.sidebar.button("Sign in"):
+            owner = user_pool().sign_in(user_name, access_key) if user_name and access_key else None
+            if owner is None:
+                st.sidebar.error("Unknown name or wrong access key.")
+            else:
+                st.session_state.current_user = owner
+                st.session_state.display_name = user_name
+                st.experimental_rerun()
+        if st.sidebar.button("Create account"):
+            account = user_pool().create_account(user_name) if user_name else None
+            if not user_name:
+                st.sidebar.error("Please enter a name.")
+            elif account is None:
+                st.sidebar.error(f"The name '{user_name}' is already in use. Please choose a different name.")
+            else:
+                st.session_state.current_user, key = account
+                st.session_state.display_name = user_name
+                st.sidebar.success("Account created. Keep this access key, it is shown only once "
+                                   "and is needed to sign in again:")
+                st.sidebar.code(key)
 
     def create_ui(self):
         if st.session_state.current_user:
-            display_name = st.session_state.current_user.split('_')[0]  # Extract the user's name without the session ID
+            display_name = st.session_state.display_name
             st.title(f"Concept Revision App - Welcome, {display_name}!")
             st.write('''Demo app don't have functionality like unlimited tree view expand, touch,expand,export map.
-                No session history - after session your input information will be lost
-                .For full functionality see - 
+                Your concepts are saved under your name.
+                For full functionality see - 
                   https://github.com/shikharyashmaurya/Revision-App''')
             
             # Navigation
-            page = st.sidebar.selectbox("Choose a page", ["Tree View", "Mind Map", "Search"])
+            page = st.sidebar.selectbox("Choose a page", ["Tree View", "Mind Map", "Search", "Review"])
 
             if page == "Tree View":
                 self.show_tree_view()
@@ -55,13 +105,22 @@ class RevisionApp:
                 self.show_mind_map()
             elif page == "Search":
                 self.show_search()
+            elif page == "Review":
+                self.show_review()
         else:
             st.title("Concept Revision App")
-            st.write("Please enter your name in the sidebar to begin.")
+            st.write("Please sign in or create an account in the sidebar to begin.")
 
     # The rest of the methods (show_tree_view, show_concept_details, show_mind_map, show_search, search_data, custom_tree_layout) 
     # remain the same as in the previous version, just ensure you're using st.session_state.current_user
-    # to access the correct user data in st.session_state.users
+    # to access the correct user data through user_store()
+
+    def user_store(self):
+        return user_pool().store(st.session_state.current_user)
+
+    def user_data(self):
+        # Served from the worker's cache until some process writes to this user
+        return self.user_store().cached_data()
 
     # Example of how to modify a method to use the new user identifier:
     def show_tree_view(self):
@@ -70,13 +129,12 @@ class RevisionApp:
         # Input for new concept
         new_key = st.text_input("Enter a new concept:")
         if st.button("Add Concept"):
-            if new_key and new_key not in st.session_state.users[st.session_state.current_user]:
-                st.session_state.users[st.session_state.current_user][new_key] = {'next': [], 'text': []}
+            if new_key and self.user_store().add_concept(new_key):
                 st.success(f"Added new concept: {new_key}")
                 st.experimental_rerun()
 
         # Display concepts
-        user_data = st.session_state.users[st.session_state.current_user]
+        user_data = self.user_data()
         selected_concept = st.selectbox("Select a concept to view details:", 
                                         options=[""] + list(user_data.keys()))
         
@@ -104,12 +162,13 @@ class RevisionApp:
     #         self.show_concept_details(selected_concept)
 
     def show_concept_details(self, key):
-        user_data = st.session_state.users[st.session_state.current_user]
+        store = self.user_store()
+        concept = self.user_data()[key]
         st.subheader(f"Concept: {key}")
 
         # Display related concepts
         st.write("Related Concepts:")
-        for next_item in user_data[key]['next']:
+        for next_item in concept['next']:
             if st.button(f"Go to {next_item}", key=f"goto_{next_item}"):
                 self.show_concept_details(next_item)
                 return
@@ -117,30 +176,79 @@ class RevisionApp:
         # Add related concept
         new_related = st.text_input(f"Add related concept to {key}:", key=f"related_{key}")
         if st.button(f"Add related to {key}", key=f"add_related_{key}"):
-            if new_related and new_related not in user_data[key]['next']:
-                if new_related not in user_data:
-                    user_data[new_related] = {'next': [], 'text': []}
-                user_data[key]['next'].append(new_related)
+            if new_related and new_related not in concept['next']:
+                store.add_edge(key, new_related)
                 st.success(f"Added {new_related} as related to {key}")
                 st.experimental_rerun()
 
         # Display information
         st.write("Information:")
-        for i, text_item in enumerate(user_data[key]['text']):
+        for i, text_item in enumerate(concept['text']):
             st.text_area(f"Info {i+1}", value=text_item, key=f"info_{key}_{i}", height=100, disabled=True)
 
         # Add information
         new_info = st.text_area(f"Add information to {key}:", key=f"new_info_{key}")
         if st.button(f"Add info to {key}", key=f"add_info_{key}"):
             if new_info:
-                user_data[key]['text'].append(new_info)
+                store.add_text(key, new_info)
                 st.success(f"Added new information to {key}")
                 st.experimental_rerun()
 
+    def review_scheduler(self, user_data):
+        # Kept for the session and built again when the user's cached data is
+        # read again after a write elsewhere; grading patches the cache in place
+        review = st.session_state.get('review')
+        if review is None or review[0] is not user_data:
+            review = (user_data, ReviewScheduler(user_data))
+            st.session_state.review = review
+            st.session_state.review_flipped = False
+        return review[1]
+
+    def show_review(self):
+        st.header("Review")
+        user_data = self.user_data()
+        scheduler = self.review_scheduler(user_data)
+        st.write(f"Due: {scheduler.due_count()}   New: {scheduler.new_count()}")
+
+        key = scheduler.next_card()
+        if key is None:
+            st.write("Nothing to review right now.")
+            return
+        st.subheader(key)
+        if not st.session_state.get('review_flipped'):
+            if st.button("Show answer"):
+                st.session_state.review_flipped = True
+                st.experimental_rerun()
+            return
+
+        concept = user_data[key]
+        if concept['next']:
+            st.write("Related concepts: " + ", ".join(concept['next']))
+        for text_item in concept['text']:
+            st.write(f"- {text_item}")
+        for column, (label, grade) in zip(st.columns(len(GRADES)), GRADES):
+            if column.button(label, key=f"grade_{grade}"):
+                self.user_store().set_review(key, scheduler.grade(key, concept.get('review'), grade))
+                st.session_state.review_flipped = False
+                st.experimental_rerun()
+
     def show_mind_map(self):
         st.header("Mind Map")
 
-        user_data = st.session_state.users[st.session_state.current_user]
+        # Reruns that did not change the graph reuse the cached image
+        user_data = self.user_data()
+        digest = graph_digest(user_data)
+        cache = mind_map_cache()
+        cached = cache.get(st.session_state.current_user, digest)
+        if cached is None:
+            cached = self.render_mind_map(user_data)
+            cache.put(st.session_state.current_user, digest, cached)
+            layout_cache().save(min_interval=LAYOUT_SAVE_INTERVAL)
+        image = cached[1]
+
+        st.image(image, caption='Mind Map', use_column_width=True)
+
+    def render_mind_map(self, user_data):
         G = nx.Graph()
         for key, value in user_data.items():
             G.add_node(key)
@@ -150,20 +258,20 @@ class RevisionApp:
 
         pos = self.custom_tree_layout(G)
 
-        plt.figure(figsize=(12, 8))
-        nx.draw(G, pos, with_labels=False, node_color='lightblue', node_size=3000, alpha=0.8)
+        fig, ax = plt.subplots(figsize=(12, 8))
+        nx.draw(G, pos, ax=ax, with_labels=False, node_color='lightblue', node_size=3000, alpha=0.8)
 
         for node, (x, y) in pos.items():
             lines = textwrap.wrap(node, width=10)
-            plt.annotate('\n'.join(lines), (x, y), horizontalalignment='center', verticalalignment='center')
+            ax.annotate('\n'.join(lines), (x, y), horizontalalignment='center', verticalalignment='center')
 
-        plt.axis('off')
+        ax.axis('off')
 
         buf = BytesIO()
-        plt.savefig(buf, format="png")
-        buf.seek(0)
-        
-        st.image(buf, caption='Mind Map', use_column_width=True)
+        fig.savefig(buf, format="png")
+        # Figures are not garbage collected while pyplot tracks them
+        plt.close(fig)
+        return pos, buf.getvalue()
 
     def show_search(self):
         st.header("Search")
@@ -172,20 +280,22 @@ class RevisionApp:
         if st.button("Search"):
             results = self.search_data(query)
             if results:
+                user_data = self.user_data()
                 for key in results:
+                    concept = user_data[key]
                     with st.expander(f"Concept: {key}"):
                         st.write("Related Concepts:")
-                        for related in st.session_state.users[st.session_state.current_user][key]['next']:
+                        for related in concept['next']:
                             st.write(f"- {related}")
                         st.write("Information:")
-                        for info in st.session_state.users[st.session_state.current_user][key]['text']:
+                        for info in concept['text']:
                             st.write(f"- {info}")
             else:
                 st.write("No results found.")
 
     def search_data(self, query):
         query = query.lower()
-        user_data = st.session_state.users[st.session_state.current_user]
+        user_data = self.user_data()
         results = set()
         for key, value in user_data.items():
             if query in key.lower():
@@ -199,65 +309,8 @@ class RevisionApp:
         return list(results)
     
     def custom_tree_layout(self, G):
-        if not G.nodes():
-            return {}
-
-        def bfs_tree(root):
-            tree = nx.bfs_tree(G, root)
-            return tree
-
-        def assign_positions(tree, root):
-            pos = {}
-            level_width = {}
-            max_depth = 0
-
-            def dfs(node, depth, order):
-                nonlocal max_depth
-                max_depth = max(max_depth, depth)
-                if depth not in level_width:
-                    level_width[depth] = 0
-                level_width[depth] += 1
-                children = list(tree.successors(node))
-                if not children:
-                    pos[node] = (order, -depth)
-                    return order + 1
-                
-                start = order
-                for child in children:
-                    order = dfs(child, depth + 1, order)
-                pos[node] = (start + (order - start - 1) / 2, -depth)
-                return order
-
-            dfs(root, 0, 0)
-
-            # Normalize positions
-            max_width = max(level_width.values()) if level_width else 1
-            for node in pos:
-                x, y = pos[node]
-                pos[node] = (x / max_width, y / max_depth if max_depth != 0 else 0)
-
-            return pos
-
-        # Handle disconnected components
-        components = list(nx.connected_components(G))
-        if not components:
-            return {}
-
-        pos = {}
-        y_offset = 0
-        for component in components:
-            subgraph = G.subgraph(component)
-            root = max(subgraph.nodes(), key=lambda n: subgraph.degree(n))
-            tree = bfs_tree(root)
-            component_pos = assign_positions(tree, root)
-            
-            # Adjust y-positions for each component
-            for node, (x, y) in component_pos.items():
-                pos[node] = (x, y + y_offset)
-            
-            y_offset -= 1.5  # Increase vertical separation between components
-
-        return pos
+        # Unchanged components come from the layout cache
+        return layout_cache().tree_layout(G)
 
 if __name__ == "__main__":
     app = RevisionApp()
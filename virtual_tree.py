@@ -0,0 +1,285 @@
+import tkinter as tk
+from tkinter import ttk
+
+# Indentation and expander glyphs of the flattened rows
+INDENT = "    "
+COLLAPSED = "▸"
+EXPANDED = "▾"
+
+# Used until the Treeview style reports its own row height
+DEFAULT_ROW_HEIGHT = 20
+
+
+class Row:
+    __slots__ = ("key", "depth", "expanded", "count")
+
+    def __init__(self, key, depth):
+        self.key = key
+        self.depth = depth
+        self.expanded = False
+        self.count = 0
+
+
+class VirtualTree(ttk.Frame):
+    # Concept tree that only materializes the rows on screen. The hierarchy
+    # is a flat list of Row objects (a concept followed by its expanded
+    # subtree), the Treeview holds a fixed pool of items that are relabelled
+    # as the list scrolls, and refresh() diffs the data against the rows
+    # instead of rebuilding them. A concept's 'next' children are only turned
+    # into rows when it is expanded.
+
+    def __init__(self, master, data, **kwargs):
+        super().__init__(master, **kwargs)
+        self.data = data
+        self.rows = []
+        self.roots = set()
+        self.expanded = []
+        self.top = 0
+        self.visible = 1
+        self.selected = None
+        self.rendering = False
+
+        self.view = ttk.Treeview(self, columns=("toggle", "name"), show="", selectmode="browse")
+        self.view.column("toggle", width=20, minwidth=20, stretch=False, anchor=tk.CENTER)
+        self.view.column("name", stretch=True)
+        self.view.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.view.bind("<Configure>", self.on_configure)
+        self.view.bind("<<TreeviewSelect>>", self.on_select)
+        self.view.bind("<Button-1>", self.on_click)
+        self.view.bind("<MouseWheel>", self.on_wheel)
+        self.view.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.view.bind("<Button-5>", lambda event: self.scroll(3))
+        self.view.bind("<Up>", lambda event: self.move_selection(-1))
+        self.view.bind("<Down>", lambda event: self.move_selection(1))
+        self.view.bind("<Prior>", lambda event: self.move_selection(-self.visible))
+        self.view.bind("<Next>", lambda event: self.move_selection(self.visible))
+        self.view.bind("<Right>", self.on_right)
+        self.view.bind("<Left>", self.on_left)
+
+        self.refresh()
+
+    def selected_key(self):
+        return self.selected.key if self.selected is not None else None
+
+    def refresh(self):
+        # Top-level diff: append concepts that are new, drop those that are gone
+        new_keys = [key for key in self.data if key not in self.roots]
+        if len(self.roots) + len(new_keys) != len(self.data):
+            for index in reversed(range(len(self.rows))):
+                row = self.rows[index]
+                if row.depth == 0 and row.key not in self.data:
+                    self.remove_subtree(index, include_row=True)
+                    self.roots.discard(row.key)
+        for key in new_keys:
+            self.rows.append(Row(key, 0))
+            self.roots.add(key)
+
+        # Expanded concepts that gained related concepts get the new rows
+        # appended to the end of their subtree
+        for row in list(self.expanded):
+            children = self.children_of(row.key)
+            if len(children) == row.count:
+                continue
+            index = self.rows.index(row)
+            if len(children) < row.count:
+                self.collapse(index)
+                self.expand(index)
+                continue
+            end = self.subtree_end(index)
+            self.rows[end:end] = [Row(child, row.depth + 1) for child in children[row.count:]]
+            row.count = len(children)
+
+        self.render()
+
+    def add_roots(self, keys):
+        # Appends concepts known to be new without diffing the whole data set
+        for key in keys:
+            if key not in self.roots:
+                self.rows.append(Row(key, 0))
+                self.roots.add(key)
+        self.render()
+
+    def children_of(self, key):
+        if key not in self.data:
+            return []
+        return list(self.data[key]['next'])
+
+    def subtree_end(self, index):
+        depth = self.rows[index].depth
+        end = index + 1
+        while end < len(self.rows) and self.rows[end].depth > depth:
+            end += 1
+        return end
+
+    def remove_subtree(self, index, include_row=False):
+        start = index if include_row else index + 1
+        end = self.subtree_end(index)
+        for row in self.rows[start:end]:
+            if row.expanded:
+                self.expanded.remove(row)
+            if row is self.selected:
+                self.selected = None if include_row else self.rows[index]
+        del self.rows[start:end]
+
+    def expand(self, index):
+        row = self.rows[index]
+        if row.expanded:
+            return
+        children = self.children_of(row.key)
+        if not children:
+            return
+        self.rows[index + 1:index + 1] = [Row(child, row.depth + 1) for child in children]
+        row.expanded = True
+        row.count = len(children)
+        self.expanded.append(row)
+
+    def collapse(self, index):
+        row = self.rows[index]
+        if not row.expanded:
+            return
+        self.remove_subtree(index)
+        row.expanded = False
+        row.count = 0
+        self.expanded.remove(row)
+
+    def toggle(self, index):
+        if self.rows[index].expanded:
+            self.collapse(index)
+        else:
+            self.expand(index)
+        self.render()
+
+    def glyph(self, row):
+        if row.expanded:
+            return EXPANDED
+        return COLLAPSED if self.children_of(row.key) else ""
+
+    def render(self):
+        # Relabel the pooled items for rows[top:top + visible]
+        self.top = max(0, min(self.top, len(self.rows) - self.visible))
+        window = self.rows[self.top:self.top + self.visible]
+        items = self.view.get_children()
+        self.rendering = True
+        try:
+            for i, row in enumerate(window):
+                values = (self.glyph(row), INDENT * row.depth + row.key)
+                if i < len(items):
+                    self.view.item(items[i], values=values)
+                else:
+                    self.view.insert("", "end", iid=str(i), values=values)
+            if len(items) > len(window):
+                self.view.delete(*items[len(window):])
+
+            selection = ()
+            for i, row in enumerate(window):
+                if row is self.selected:
+                    selection = (str(i),)
+            if self.view.selection() != selection:
+                self.view.selection_set(selection)
+        finally:
+            self.rendering = False
+
+        if self.rows:
+            self.scrollbar.set(self.top / len(self.rows), (self.top + len(window)) / len(self.rows))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def row_at(self, item):
+        if not item:
+            return None
+        index = self.top + int(item)
+        return index if index < len(self.rows) else None
+
+    def on_configure(self, event):
+        style = ttk.Style()
+        row_height = style.lookup("Treeview", "rowheight")
+        row_height = int(row_height) if row_height else DEFAULT_ROW_HEIGHT
+        visible = max(1, event.height // row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def on_select(self, event):
+        if self.rendering:
+            return
+        selection = self.view.selection()
+        index = self.row_at(selection[0]) if selection else None
+        self.selected = self.rows[index] if index is not None else None
+
+    def on_click(self, event):
+        # A click in the glyph column expands or collapses the row
+        if self.view.identify_column(event.x) != "#1":
+            return
+        index = self.row_at(self.view.identify_row(event.y))
+        if index is not None:
+            self.toggle(index)
+
+    def on_right(self, event):
+        index = self.selected_index()
+        if index is not None:
+            self.expand(index)
+            self.render()
+        return "break"
+
+    def on_left(self, event):
+        index = self.selected_index()
+        if index is None:
+            return "break"
+        row = self.rows[index]
+        if row.expanded:
+            self.collapse(index)
+        else:
+            # Jump to the parent row
+            while index > 0 and self.rows[index].depth >= row.depth:
+                index -= 1
+            self.selected = self.rows[index]
+            self.show_row(index)
+        self.render()
+        return "break"
+
+    def on_wheel(self, event):
+        self.scroll(-1 if event.delta > 0 else 1)
+        return "break"
+
+    def selected_index(self):
+        if self.selected is None:
+            return None
+        window = self.rows[self.top:self.top + self.visible]
+        for i, row in enumerate(window):
+            if row is self.selected:
+                return self.top + i
+        return self.rows.index(self.selected)
+
+    def move_selection(self, step):
+        if not self.rows:
+            return "break"
+        index = self.selected_index()
+        index = 0 if index is None else max(0, min(index + step, len(self.rows) - 1))
+        self.selected = self.rows[index]
+        self.show_row(index)
+        self.render()
+        return "break"
+
+    def show_row(self, index):
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.visible:
+            self.top = index - self.visible + 1
+
+    def scroll(self, rows):
+        self.top += rows
+        self.render()
+        return "break"
+
+    def yview(self, *args):
+        # Scrollbar protocol: ('moveto', fraction) or ('scroll', n, 'units' | 'pages')
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            step = self.visible if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self.render()